@@ -0,0 +1,37 @@
+"""
+GET condicional (ETag/Last-Modified) a partir dos dados já obtidos.
+
+Faz o mesmo que o decorator `condition` do Django, mas com a ETag calculada
+junto com os dados que vão na resposta (ver `reporting.cache.get_entry`): a
+ETag sempre corresponde ao conteúdo servido.
+"""
+from datetime import timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def conditional_response(request, respond, etag=None, last_modified=None):
+    """
+    Responde 304 se o cliente já tem esta versão; senão chama `respond()`.
+    `last_modified` é um datetime ou None.
+    """
+    etag = quote_etag(etag) if etag else None
+    timestamp = None
+    if last_modified:
+        # Datetime sem fuso é UTC, como no decorator `condition`
+        if timezone.is_naive(last_modified):
+            last_modified = timezone.make_aware(last_modified, dt_timezone.utc)
+        timestamp = int(last_modified.timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = respond()
+
+    if request.method in ('GET', 'HEAD'):
+        if timestamp and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(timestamp)
+        if etag:
+            response.headers.setdefault('ETag', etag)
+    return response
@@ -0,0 +1,127 @@
+"""
+Widgets do dashboard (home).
+
+Cada widget sabe calcular seus dados, de quais grupos de dados depende e
+quais permissões são necessárias para vê-lo. A ETag e o Last-Modified de
+um widget vêm da versão da entrada do cache de métricas que é servida, então
+é possível responder 304 sem recalcular nada e um valor velho nunca sai com
+a ETag da versão nova.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections
+from ai.models import AIResult
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_PERMISSIONS = ['products.view_product', 'inflows.view_inflow']
+SALES_PERMISSIONS = ['outflows.view_outflow']
+
+
+class Widget:
+
+    def __init__(self, compute, depends_on, permissions, daily=False):
+        self.compute = compute
+        self.depends_on = depends_on
+        self.permissions = permissions
+        # Widgets diários mudam com a data mesmo sem novas escritas
+        self.daily = daily
+
+    def has_permission(self, user):
+        return user.has_perms(self.permissions)
+
+    def entry(self):
+        """Entrada do cache com os dados servidos e a versão deles"""
+        return self.compute.entry()
+
+    def etag(self, name, entry):
+        etag = f'{name}-{entry["version"]}'
+        if self.daily:
+            etag += f'-{datetime.fromtimestamp(entry["computed_at"]).date()}'
+        return etag
+
+    def last_modified(self, entry):
+        if not entry.get('modified'):
+            return None
+        return datetime.fromtimestamp(entry['modified'], tz=dt_timezone.utc)
+
+
+class AIInsightWidget(Widget):
+    """Último resultado do SGE Agent; versionado pelo próprio registro"""
+
+    def __init__(self):
+        super().__init__(self.get_result, depends_on=[], permissions=[])
+
+    def get_result(self):
+        ai_result = AIResult.objects.first()
+        return dict(result=ai_result.result if ai_result else None)
+
+    def entry(self):
+        ai_result = AIResult.objects.first()
+        return dict(
+            data=dict(result=ai_result.result if ai_result else None),
+            version=ai_result.id if ai_result else 0,
+            modified=ai_result.created_at if ai_result else None,
+        )
+
+    def last_modified(self, entry):
+        return entry['modified']
+
+
+WIDGETS = {
+    'product_metrics': Widget(metrics.get_product_metrics, ['products'], PRODUCT_PERMISSIONS),
+    'sales_metrics': Widget(metrics.get_sales_metrics, ['products', 'sales'], SALES_PERMISSIONS),
+    'category_chart': Widget(metrics.get_graphic_product_category_metric, ['products'], ['products.view_product']),
+    'brand_chart': Widget(metrics.get_graphic_product_brand_metric, ['products'], ['products.view_product']),
+    'daily_sales': Widget(metrics.get_daily_sales_data, ['sales'], SALES_PERMISSIONS, daily=True),
+    'daily_quantity': Widget(metrics.get_daily_sales_quantity_data, ['sales'], SALES_PERMISSIONS, daily=True),
+    'ai_insight': AIInsightWidget(),
+}
+
+
+def _setting(name, default):
+    return getattr(settings, 'DASHBOARD', {}).get(name, default)
+
+
+# Pool limitado compartilhado por todas as requisições do processo; cada
+# thread usa sua própria conexão com o banco
+_executor = ThreadPoolExecutor(
+    max_workers=_setting('MAX_WORKERS', 4),
+    thread_name_prefix='dashboard',
+)
+
+
+def widget_timeout(name):
+    return _setting('WIDGET_TIMEOUTS', {}).get(name, _setting('WIDGET_TIMEOUT', 2.0))
+
+
+def _compute_in_thread(name):
+    try:
+        return WIDGETS[name].compute()
+    finally:
+        close_old_connections()
+
+
+async def _compute_widget(name):
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_executor, _compute_in_thread, name)
+    try:
+        return await asyncio.wait_for(future, widget_timeout(name))
+    except asyncio.TimeoutError:
+        # O cálculo continua na thread e alimenta o cache de métricas
+        logger.warning('Widget %s excedeu o tempo limite', name)
+    except Exception:
+        logger.exception('Erro ao calcular o widget %s', name)
+    return None
+
+
+async def compute_widgets(names):
+    """Calcula os widgets em paralelo; os que falharem ou excederem o tempo vêm como None"""
+    results = await asyncio.gather(*(_compute_widget(name) for name in names))
+    return dict(zip(names, results))
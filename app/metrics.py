@@ -1,17 +1,28 @@
-from django.db.models import Sum, F
+from django.db.models import Count, DecimalField, F, Sum
 from django.utils.formats import number_format
 from django.utils import timezone
-from brands.models import Brand
-from categories.models import Category
-from products.models import Product
 from outflows.models import Outflow
+from reporting.cache import cached_metric
+from reporting.distributions import get_distribution
+from reporting.models import InventoryValuation
+from reporting.rollups import daily_summaries
 
 
+# Somas de preço x quantidade; evita misturar inteiro e decimal no banco
+MONEY_FIELD = DecimalField(max_digits=20, decimal_places=2)
+
+
+@cached_metric('product_metrics', depends_on=['products'])
 def get_product_metrics():
-    products = Product.objects.all()
-    total_cost_price = sum(product.cost_price * product.quantity for product in products)
-    total_selling_price = sum(product.selling_price * product.quantity for product in products)
-    total_quantity = sum(product.quantity for product in products)
+    # Soma das poucas linhas do resumo de estoque (categoria x marca)
+    totals = InventoryValuation.objects.aggregate(
+        total_cost_price=Sum('cost_value'),
+        total_selling_price=Sum('selling_value'),
+        total_quantity=Sum('quantity'),
+    )
+    total_cost_price = totals['total_cost_price'] or 0
+    total_selling_price = totals['total_selling_price'] or 0
+    total_quantity = totals['total_quantity'] or 0
     total_profit = total_selling_price - total_cost_price
 
     return dict(
@@ -22,60 +33,60 @@ def get_product_metrics():
     )
 
 
+@cached_metric('sales_metrics', depends_on=['products', 'sales'])
 def get_sales_metrics():
-    total_sales = Outflow.objects.count()
-    total_products_sold = Outflow.objects.aggregate(total_products_sold=Sum('quantity'))['total_products_sold'] or 0
-    total_sales_value = sum(outflow.quantity * outflow.product.selling_price for outflow in Outflow.objects.all())
-    total_sales_cost = sum(outflow.quantity * outflow.product.cost_price for outflow in Outflow.objects.all())
+    totals = Outflow.objects.aggregate(
+        total_sales=Count('id'),
+        total_products_sold=Sum('quantity'),
+        total_sales_value=Sum(F('quantity') * F('product__selling_price'), output_field=MONEY_FIELD),
+        total_sales_cost=Sum(F('quantity') * F('product__cost_price'), output_field=MONEY_FIELD),
+    )
+    total_sales_value = totals['total_sales_value'] or 0
+    total_sales_cost = totals['total_sales_cost'] or 0
     total_sales_profit = total_sales_value - total_sales_cost
 
     return dict(
-        total_sales=total_sales,
-        total_products_sold=total_products_sold,
+        total_sales=totals['total_sales'],
+        total_products_sold=totals['total_products_sold'] or 0,
         total_sales_value=number_format(total_sales_value, decimal_pos=2, force_grouping=True),
         total_sales_profit=number_format(total_sales_profit, decimal_pos=2, force_grouping=True),
     )
 
 
-def get_daily_sales_data():
+def _last_seven_days():
     today = timezone.now().date()
-    dates = [str(today - timezone.timedelta(days=i)) for i in range(6, -1, -1)]
-    values = list()
+    return [today - timezone.timedelta(days=i) for i in range(6, -1, -1)]
 
-    for date in dates:
-        sales_total = Outflow.objects.filter(
-            created_at__date=date
-        ).aggregate(
-            total_sales=Sum(F('product__selling_price') * F('quantity'))
-        )['total_sales'] or 0
-        values.append(float(sales_total))
+
+@cached_metric('daily_sales_data', depends_on=['sales'])
+def get_daily_sales_data():
+    days = _last_seven_days()
+    summaries = daily_summaries(days[0], days[-1])
+    values = [float(summaries[day].outflow_value) if day in summaries else 0.0 for day in days]
 
     return dict(
-        dates=dates,
+        dates=[str(day) for day in days],
         values=values,
     )
 
 
+@cached_metric('daily_sales_quantity_data', depends_on=['sales'])
 def get_daily_sales_quantity_data():
-    today = timezone.now().date()
-    dates = [str(today - timezone.timedelta(days=i)) for i in range(6, -1, -1)]
-    quantities = list()
-
-    for date in dates:
-        sales_quantity = Outflow.objects.filter(created_at__date=date).count()
-        quantities.append(sales_quantity)
+    days = _last_seven_days()
+    summaries = daily_summaries(days[0], days[-1])
+    quantities = [summaries[day].outflow_count if day in summaries else 0 for day in days]
 
     return dict(
-        dates=dates,
+        dates=[str(day) for day in days],
         values=quantities,
     )
 
 
+@cached_metric('category_chart', depends_on=['products'])
 def get_graphic_product_category_metric():
-    categories = Category.objects.all()
-    return {category.name: Product.objects.filter(category=category).count() for category in categories}
+    return {row['name']: row['product_count'] for row in get_distribution('category')}
 
 
+@cached_metric('brand_chart', depends_on=['products'])
 def get_graphic_product_brand_metric():
-    brands = Brand.objects.all()
-    return {brand.name: Product.objects.filter(brand=brand).count() for brand in brands}
+    return {row['name']: row['product_count'] for row in get_distribution('brand')}
@@ -0,0 +1,195 @@
+"""
+Paginação por chave (keyset/seek).
+
+Em vez de OFFSET, cada página continua a partir dos valores de ordenação da
+última linha mostrada (`after`) ou da primeira (`before`). Com um índice na
+mesma ordem, abrir a página 1 ou a página 500 custa o mesmo.
+
+Os campos da ordenação não podem ser nulos e o último deve ser único (ex.: id).
+Como não há número de páginas, o total mostrado pode ser aproximado
+(`estimate_count`), sem um COUNT(*) na tabela inteira.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.http import QueryDict
+
+
+# Até este total a contagem é exata
+EXACT_COUNT_LIMIT = 10_000
+
+
+def encode_cursor(values):
+    data = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Valores do cursor, ou None se ele for inválido"""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class KeysetPage:
+
+    def __init__(self, object_list, paginator, has_next, has_previous, params):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.params = params if params is not None else QueryDict()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _query(self, **cursor):
+        params = self.params.copy()
+        for name in ('after', 'before'):
+            params.pop(name, None)
+        params.update(cursor)
+        return params.urlencode()
+
+    @property
+    def first_query(self):
+        return self._query()
+
+    @property
+    def next_query(self):
+        return self._query(after=self.paginator.cursor_for(self.object_list[-1]))
+
+    @property
+    def previous_query(self):
+        return self._query(before=self.paginator.cursor_for(self.object_list[0]))
+
+
+class KeysetPaginator:
+
+    def __init__(self, queryset, ordering, per_page=50):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.per_page = per_page
+        self.fields = [field.lstrip('-') for field in ordering]
+
+    def cursor_for(self, obj):
+        return encode_cursor([getattr(obj, field) for field in self.fields])
+
+    def _clean(self, values):
+        """
+        Converte os valores do cursor para os tipos dos campos da ordenação.
+        Cursor adulterado (tamanho ou tipo errado) retorna None: primeira página.
+        """
+        if values is None or len(values) != len(self.fields):
+            return None
+        cleaned = []
+        for name, value in zip(self.fields, values):
+            if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                return None
+            field = self.queryset.model._meta.get_field(name)
+            try:
+                value = field.to_python(value)
+                field.run_validators(value)
+            except (ValidationError, TypeError, ValueError, OverflowError):
+                return None
+            cleaned.append(value)
+        return cleaned
+
+    def _seek(self, values, forward):
+        """
+        Filtro "depois de `values`" na ordenação (ou antes, se forward=False):
+        (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z)...
+        """
+        condition = Q()
+        equal = Q()
+        for ordering, field, value in zip(self.ordering, self.fields, values):
+            ascending = not ordering.startswith('-')
+            lookup = 'gt' if ascending == forward else 'lt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+
+        # Repete o limite do primeiro campo fora do OR para o banco usar o índice
+        first_lookup = 'gte' if (not self.ordering[0].startswith('-')) == forward else 'lte'
+        return Q(**{f'{self.fields[0]}__{first_lookup}': values[0]}) & condition
+
+    def page(self, after=None, before=None, params=None):
+        forward = before is None
+        values = self._clean(decode_cursor(after if forward else before)) if (after or before) else None
+
+        queryset = self.queryset
+        ordering = self.ordering
+        if not forward and values is not None:
+            # Página anterior: percorre a ordem inversa e desinverte o resultado
+            ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward))
+
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if values is None:
+            return KeysetPage(rows, self, has_more, False, params)
+        if forward:
+            return KeysetPage(rows, self, has_more, True, params)
+        rows.reverse()
+        return KeysetPage(rows, self, True, has_more, params)
+
+    def page_from_request(self, request):
+        return self.page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            params=request.GET,
+        )
+
+
+def _postgres_estimate(queryset):
+    """Linhas estimadas pelo PostgreSQL: estatísticas da tabela ou plano da consulta"""
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # -1 enquanto a tabela nunca foi analisada
+            return row[0] if row and row[0] >= 0 else None
+
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate_count(queryset, limit=EXACT_COUNT_LIMIT):
+    """
+    Total de `queryset` para mostrar na tela: (total, exato). Conta exatamente
+    até `limit` linhas; acima disso usa a estimativa do PostgreSQL ou, nos
+    outros bancos, retorna (None, False): apenas passa de `limit`.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        estimate = _postgres_estimate(queryset)
+        if estimate is not None and estimate > limit:
+            return estimate, False
+
+    # COUNT limitado: lê no máximo limit + 1 linhas do índice
+    count = queryset.order_by()[:limit + 1].count()
+    if count > limit:
+        return None, False
+    return count, True
@@ -57,6 +57,7 @@ INSTALLED_APPS = [
     'customers',
     'sales',
     'reporting',
+    'idempotency',
 ]
 
 LOGIN_URL = 'login'
@@ -114,6 +115,61 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Em produção com vários processos, prefira um cache compartilhado (Redis/Memcached)
+# para que a invalidação e a proteção contra recálculos simultâneos valham para todos.
+# Com o LocMemCache, os comandos de gerenciamento (rescore_customers, rebuild_rollups)
+# não invalidam as métricas dos servidores em execução (ver reporting.cache).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sge',
+    }
+}
+
+# Cache versionado das métricas do dashboard (reporting.cache)
+METRICS_CACHE = {
+    'FRESH_FOR': 300,           # segundos em que uma entrada é servida sem recálculo
+    'MAX_STALE': 24 * 60 * 60,  # segundos em que uma entrada velha ainda pode ser servida
+    'LOCK_TIMEOUT': 30,         # segundos máximos de um recálculo
+}
+
+# Códigos de barras/SKUs resolvidos pelo scanner (products.barcodes)
+BARCODE_CACHE = {
+    'MAX_SIZE': 10_000,         # códigos no LRU de cada processo
+    'TIMEOUT': 60 * 60,         # segundos de cada código no cache do Django
+    'MISSING_TIMEOUT': 60,      # segundos de um código desconhecido no cache
+}
+
+# Relatórios em segundo plano (reporting.jobs); com IN_PROCESS os jobs rodam
+# em threads do próprio servidor, além do comando run_report_jobs
+REPORT_JOBS = {
+    'IN_PROCESS': True,
+    'WORKERS': 2,
+    'STALE_AFTER': 60 * 60,     # segundos até um job "em execução" ser considerado abandonado
+}
+
+# Chaves Idempotency-Key da venda rápida e das entradas em lote (idempotency)
+IDEMPOTENCY = {
+    'TTL': 24 * 60 * 60,        # segundos em que uma resposta guardada é repetida
+    # Segundos até uma tentativa interrompida liberar a chave; maior que o timeout
+    # das requisições (servidor/proxy). No PostgreSQL a chave de uma requisição
+    # ainda em execução continua travada mesmo depois desse prazo.
+    'LOCK_TIMEOUT': 10 * 60,
+}
+
+# Home com widgets calculados em paralelo (app.views.home_async)
+DASHBOARD = {
+    'MAX_WORKERS': 4,           # threads (e conexões com o banco) por processo
+    'WIDGET_TIMEOUT': 2.0,      # segundos; widgets mais lentos são carregados depois pelo navegador
+    'WIDGET_TIMEOUTS': {
+        'ai_insight': 0.5,
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
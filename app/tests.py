@@ -0,0 +1,215 @@
+"""
+Orçamentos de queries por view.
+
+Cada view é aberta com uma massa de dados pequena e com uma grande; o número
+de queries tem de ser o mesmo nas duas. Uma view cujo número de queries cresce
+com os dados (N+1) falha aqui.
+
+Também os widgets do dashboard calculados em paralelo (app.dashboard).
+"""
+import asyncio
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app import dashboard
+from app.pagination import encode_cursor
+from reporting import benchmarks
+
+
+# Inclui as 2 queries de sessão e usuário das views com login
+VIEW_BUDGETS = {
+    'home': 2,
+    'reporting:dashboard': 2,
+    'reporting:products': 12,
+    'reporting:sales': 6,
+    'reporting:stock': 6,
+    'reporting:customers': 6,
+    'reporting:dashboard_stats_api': 3,
+    'products:product_list': 6,
+    'sales:sale_list': 5,
+    'customers:customer_list': 3,
+}
+
+WIDGET_BUDGETS = {
+    'product_metrics': 3,
+    'sales_metrics': 3,
+    'category_chart': 3,
+    'brand_chart': 3,
+    'daily_sales': 3,
+    'daily_quantity': 3,
+}
+
+# Autenticação por token (force_authenticate): só a query da listagem
+API_BUDGETS = {
+    'brand-create-list-api-view': 1,
+    'category-create-list-api-view': 1,
+    'supplier-create-list-api-view': 1,
+    'inflow-create-list-api-view': 1,
+    'outflow-create-list-api-view': 1,
+}
+
+
+class QueryBudgetMixin:
+    rows = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        products = benchmarks.seed_products(cls.rows)
+        customers = benchmarks.seed_customers(cls.rows)
+        cls.sale = benchmarks.seed_sales(cls.rows, products, customers, cls.user)[-1]
+        benchmarks.seed_outflows(cls.rows, products)
+        benchmarks.seed_inflows(cls.rows, products)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def assertQueryBudget(self, url, budget, client=None):
+        # Sem cache: o orçamento vale para o cálculo completo
+        cache.clear()
+        with self.assertNumQueries(budget):
+            response = (client or self.client).get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+
+    def test_views(self):
+        for name, budget in VIEW_BUDGETS.items():
+            with self.subTest(view=name):
+                self.assertQueryBudget(reverse(name), budget)
+
+    def test_dashboard_widgets(self):
+        for name, budget in WIDGET_BUDGETS.items():
+            with self.subTest(widget=name):
+                self.assertQueryBudget(reverse('dashboard_widget', args=[name]), budget)
+
+    def test_reporting_apis(self):
+        self.assertQueryBudget(reverse('reporting:distribution_api', args=['category']), 3)
+
+    def test_report_exports(self):
+        for report in ['stock', 'sales', 'products', 'customers']:
+            with self.subTest(report=report):
+                self.assertQueryBudget(reverse('reporting:export', args=[report, 'csv']), 3)
+
+    def test_sale_detail(self):
+        self.assertQueryBudget(reverse('sales:sale_detail', args=[self.sale.pk]), 5)
+
+    def test_sale_receipt(self):
+        self.assertQueryBudget(reverse('sales:sale_receipt', args=[self.sale.pk]), 7)
+
+    def test_api_lists(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for name, budget in API_BUDGETS.items():
+            with self.subTest(endpoint=name):
+                self.assertQueryBudget(reverse(name), budget, client)
+
+
+class SmallDatasetQueryBudgetTests(QueryBudgetMixin, TestCase):
+    rows = 10
+
+
+class LargeDatasetQueryBudgetTests(QueryBudgetMixin, TestCase):
+    rows = 10_000
+
+
+class TamperedCursorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        products = benchmarks.seed_products(3)
+        benchmarks.seed_sales(3, products, [], cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # Os relatórios ficam no cache: não deixa estes dados para os outros testes
+        self.addCleanup(cache.clear)
+
+    def test_invalid_cursor_values_fall_back_to_the_first_page(self):
+        cursors = [
+            ['abc', 'x', 1],
+            [{'a': 1}, 'x', 1],
+            [1, ['x'], 1],
+            [1, 'x', 10 ** 30],
+            [1, 'x'],
+            ['abc'],
+            [True],
+            'nao-e-cursor',
+        ]
+        for url in [reverse('reporting:stock'), reverse('sales:sale_list')]:
+            first_page = [obj.pk for obj in self.client.get(url).context['page_obj']]
+            for values in cursors:
+                cursor = encode_cursor(values) if isinstance(values, list) else values
+                for direction in ['after', 'before']:
+                    with self.subTest(url=url, cursor=values, direction=direction):
+                        response = self.client.get(url, {direction: cursor})
+                        self.assertEqual(response.status_code, 200)
+                        self.assertEqual([obj.pk for obj in response.context['page_obj']], first_page)
+
+
+class DashboardWidgetTests(TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+        # A thread do widget lento termina ao fim do teste
+        self.addCleanup(self.release.set)
+        widgets = {
+            'lento': dashboard.Widget(self.slow, [], []),
+            'rapido': dashboard.Widget(lambda: dict(valor=1), [], []),
+            'restrito': dashboard.Widget(lambda: dict(valor=2), [], ['products.view_product']),
+        }
+        patcher = mock.patch.dict(dashboard.WIDGETS, widgets, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def slow(self):
+        self.release.wait(5)
+        return dict(valor=0)
+
+    @override_settings(DASHBOARD={'WIDGET_TIMEOUTS': {'lento': 0.05}})
+    def test_slow_widget_comes_back_as_none(self):
+        widgets = asyncio.run(dashboard.compute_widgets(['lento', 'rapido']))
+        self.assertEqual(widgets, {'lento': None, 'rapido': dict(valor=1)})
+
+    def test_failing_widget_comes_back_as_none(self):
+        dashboard.WIDGETS['erro'] = dashboard.Widget(lambda: 1 / 0, [], [])
+        with self.assertLogs('app.dashboard', 'ERROR'):
+            widgets = asyncio.run(dashboard.compute_widgets(['erro', 'rapido']))
+        self.assertEqual(widgets, {'erro': None, 'rapido': dict(valor=1)})
+
+    @override_settings(DASHBOARD={'WIDGET_TIMEOUT': 2.0})
+    def test_widgets_are_computed_in_parallel(self):
+        def sleepy():
+            time.sleep(0.5)
+            return dict(valor=3)
+
+        dashboard.WIDGETS.update(a=dashboard.Widget(sleepy, [], []), b=dashboard.Widget(sleepy, [], []))
+        started = time.monotonic()
+        widgets = asyncio.run(dashboard.compute_widgets(['a', 'b']))
+        self.assertEqual(widgets, {'a': dict(valor=3), 'b': dict(valor=3)})
+        # Em sequência levariam 1s
+        self.assertLess(time.monotonic() - started, 0.9)
+
+    @override_settings(DASHBOARD={'WIDGET_TIMEOUTS': {'lento': 0.05}})
+    def test_home_leaves_out_slow_widgets_and_widgets_without_permission(self):
+        user = User.objects.create_user('vendedor', password='senha')
+        self.client.force_login(user)
+        response = self.client.get(reverse('home_async'))
+        # O lento fica para o navegador buscar; o restrito não é calculado
+        self.assertEqual(response.context['widgets'], {'rapido': dict(valor=1)})
+
+        user.user_permissions.add(Permission.objects.get(codename='view_product'))
+        response = self.client.get(reverse('home_async'))
+        self.assertEqual(response.context['widgets'], {'rapido': dict(valor=1), 'restrito': dict(valor=2)})
+
+    def test_widget_endpoint_requires_the_permission(self):
+        self.client.force_login(User.objects.create_user('vendedor', password='senha'))
+        self.assertEqual(self.client.get(reverse('dashboard_widget', args=['restrito'])).status_code, 403)
@@ -14,6 +14,8 @@ urlpatterns = [
     path('api/v1/', include('authentication.urls')),
 
     path('', views.home, name='home'),
+    path('dashboard/', views.home_async, name='home_async'),
+    path('dashboard/widgets/<str:name>/', views.dashboard_widget, name='dashboard_widget'),
     path('', include('suppliers.urls')),
     path('', include('brands.urls')),
     path('', include('categories.urls')),
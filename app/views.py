@@ -1,29 +1,68 @@
-import json
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, JsonResponse
 from django.shortcuts import render
-from ai.models import AIResult
-from . import metrics
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+from . import dashboard
+from .conditional import conditional_response
+from .dashboard import WIDGETS
 
 
 @login_required(login_url='login')
 def home(request):
-    product_metrics = metrics.get_product_metrics()
-    sales_metrics = metrics.get_sales_metrics()
-    graphic_product_category_metric = metrics.get_graphic_product_category_metric()
-    graphic_product_brand_metric = metrics.get_graphic_product_brand_metric()
-    daily_sales_data = metrics.get_daily_sales_data()
-    daily_sales_quantity_data = metrics.get_daily_sales_quantity_data()
-    ai_result_obj = AIResult.objects.first()
-    ai_result = ai_result_obj.result if ai_result_obj else None
+    # Os widgets são carregados em paralelo pelo navegador (dashboard_widget)
+    return render(request, 'home.html')
 
+
+async def home_async(request):
+    """Home com os widgets calculados em paralelo no servidor"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path(), 'login')
+
+    names = [
+        name for name, widget in WIDGETS.items()
+        if await sync_to_async(widget.has_permission)(user)
+    ]
+    widgets = await dashboard.compute_widgets(names)
+
+    # Widgets que excederam o tempo ficam de fora e são buscados pelo navegador
     context = {
-        'product_metrics': product_metrics,
-        'sales_metrics': sales_metrics,
-        'product_count_by_category': json.dumps(graphic_product_category_metric),
-        'product_count_by_brand': json.dumps(graphic_product_brand_metric),
-        'daily_sales_data': json.dumps(daily_sales_data),
-        'daily_sales_quantity_data': json.dumps(daily_sales_quantity_data),
-        'ai_result': ai_result,
+        'widgets': {name: data for name, data in widgets.items() if data is not None},
+        'product_metrics': widgets.get('product_metrics'),
+        'sales_metrics': widgets.get('sales_metrics'),
+        'ai_result': (widgets.get('ai_insight') or {}).get('result'),
     }
 
-    return render(request, 'home.html', context)
+    return await sync_to_async(render)(request, 'home.html', context)
+
+
+def _widget_response(request, name):
+    widget = WIDGETS[name]
+    entry = widget.entry()
+
+    def respond():
+        response = JsonResponse(entry['data'])
+        # O navegador pode guardar a resposta, mas deve revalidá-la (ETag) a cada uso
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return conditional_response(
+        request, respond, etag=widget.etag(name, entry), last_modified=widget.last_modified(entry),
+    )
+
+
+@require_GET
+@login_required(login_url='login')
+def dashboard_widget(request, name):
+    """API com os dados de um widget do dashboard, com suporte a GET condicional"""
+    widget = WIDGETS.get(name)
+    if widget is None:
+        raise Http404('Widget não encontrado')
+
+    if not widget.has_permission(request.user):
+        return JsonResponse({'error': 'Permissão negada'}, status=403)
+
+    return _widget_response(request, name)
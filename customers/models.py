@@ -16,6 +16,9 @@ class Customer(models.Model):
         ordering = ['name']
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
+        indexes = [
+            models.Index(fields=['created_at'], name='customers_created_at_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import IdempotencyKey
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'user', 'completed', 'status_code', 'created_at', 'completed_at')
+    list_filter = ('completed',)
+    search_fields = ('key',)
+    exclude = ('response_body',)
+    readonly_fields = ('user', 'key', 'request_hash', 'completed', 'status_code', 'content_type', 'created_at', 'completed_at')
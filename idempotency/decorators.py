@@ -0,0 +1,155 @@
+"""
+Requisições idempotentes pelo cabeçalho `Idempotency-Key`.
+
+O cliente gera uma chave por operação (ex.: um UUID por venda) e a repete em
+todas as tentativas. A primeira requisição reserva a chave e executa a view
+na mesma transação em que grava a resposta; as seguintes recebem a resposta
+guardada sem executar a view de novo. Assim a tela pode repetir o envio com
+timeouts curtos sem duplicar a venda.
+
+Sem o cabeçalho a view funciona como antes.
+
+Enquanto a view executa, a transação dela mantém a linha da chave travada
+(SELECT FOR UPDATE). Uma chave não concluída só é considerada abandonada
+depois de LOCK_TIMEOUT e, nos bancos com SKIP LOCKED, apenas se essa trava
+já foi liberada (o processo que a reservou morreu): uma requisição lenta, mas
+ainda em execução, nunca é repetida. Nos demais bancos (SQLite) vale só o
+LOCK_TIMEOUT, que deve ser maior que o tempo máximo de uma requisição.
+"""
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+
+# Presente nas respostas repetidas a partir do registro
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def _setting(name, default):
+    return getattr(settings, 'IDEMPOTENCY', {}).get(name, default)
+
+
+def _request_hash(request):
+    data = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    data.update(request.body)
+    return data.hexdigest()
+
+
+def _error(message, status):
+    return JsonResponse({'success': False, 'error': message}, status=status)
+
+
+def _replay(record):
+    response = HttpResponse(
+        bytes(record.response_body or b''),
+        status=record.status_code,
+        content_type=record.content_type,
+    )
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _running(record):
+    """True se a transação da requisição que reservou a chave ainda está aberta"""
+    if not connection.features.has_select_for_update_skip_locked:
+        return False
+    with transaction.atomic():
+        return not IdempotencyKey.objects.select_for_update(skip_locked=True).filter(pk=record.pk).exists()
+
+
+def _claim(user, key, request_hash):
+    """Reserva a chave para esta requisição; retorna (registro, None) ou (None, resposta)"""
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(user=user, key=key, request_hash=request_hash, created_at=now), None
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(user=user, key=key).first()
+    expired = record is not None and record.created_at < now - timedelta(seconds=_setting('TTL', 24 * 60 * 60))
+    if record is not None and not expired:
+        if record.request_hash != request_hash:
+            return None, _error('Idempotency-Key já usada em outra requisição', 422)
+        if record.completed:
+            return None, _replay(record)
+
+    # Chave expirada ou abandonada por uma tentativa que parou no meio: reserva de novo
+    abandoned = record is not None and record.created_at < now - timedelta(seconds=_setting('LOCK_TIMEOUT', 10 * 60))
+    reclaim = expired or abandoned
+    if reclaim and not record.completed and _running(record):
+        reclaim = False
+    if reclaim and IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).update(
+        request_hash=request_hash,
+        completed=False,
+        status_code=None,
+        content_type='',
+        response_body=None,
+        created_at=now,
+        completed_at=None,
+    ):
+        return IdempotencyKey.objects.get(pk=record.pk), None
+
+    response = _error('Requisição com esta Idempotency-Key ainda em processamento', 409)
+    response['Retry-After'] = '1'
+    return None, response
+
+
+def idempotent(view):
+    """
+    Decorator para views que recebem `Idempotency-Key`. Respostas com erro de
+    servidor (5xx) não são guardadas e as alterações da view são desfeitas, para
+    a tentativa seguinte executar de novo.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > 255:
+            return _error('Idempotency-Key inválida', 400)
+
+        record, response = _claim(request.user, key, _request_hash(request))
+        if response is not None:
+            return response
+
+        try:
+            with transaction.atomic():
+                # Travada até o fim da transação: mostra às novas tentativas que esta ainda executa
+                list(IdempotencyKey.objects.select_for_update().filter(pk=record.pk).values_list('pk'))
+                response = view(request, *args, **kwargs)
+                if response.status_code >= 500 or response.streaming:
+                    transaction.set_rollback(True)
+                else:
+                    record.completed = True
+                    record.status_code = response.status_code
+                    record.content_type = response.get('Content-Type', '')
+                    record.response_body = response.content
+                    record.completed_at = timezone.now()
+                    record.save(update_fields=[
+                        'completed', 'status_code', 'content_type', 'response_body', 'completed_at',
+                    ])
+        finally:
+            if not record.completed:
+                # Libera a chave para uma nova tentativa
+                IdempotencyKey.objects.filter(pk=record.pk, completed=False).delete()
+
+        return response
+
+    return wrapper
+
+
+def purge_expired():
+    """Remove as chaves mais antigas que o TTL; retorna quantas foram removidas"""
+    cutoff = timezone.now() - timedelta(seconds=_setting('TTL', 24 * 60 * 60))
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
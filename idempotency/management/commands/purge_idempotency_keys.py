@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from idempotency.decorators import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Remove as chaves de idempotência vencidas (executar pelo cron)'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(f'{deleted} chaves removidas')
+
+        self.stdout.write(
+            self.style.SUCCESS('CHAVES DE IDEMPOTÊNCIA REMOVIDAS COM SUCESSO!')
+        )
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """
+    Resposta guardada de uma requisição enviada com o cabeçalho
+    `Idempotency-Key`. Uma nova tentativa com a mesma chave recebe esta
+    resposta em vez de executar a operação de novo.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+', verbose_name='Usuário')
+    key = models.CharField(max_length=255, verbose_name='Chave')
+    # Hash do método, caminho e corpo: a mesma chave não pode ser usada para outra requisição
+    request_hash = models.CharField(max_length=64, verbose_name='Hash da Requisição')
+
+    completed = models.BooleanField(default=False, verbose_name='Concluída')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Status da Resposta')
+    content_type = models.CharField(max_length=100, blank=True, verbose_name='Tipo da Resposta')
+    response_body = models.BinaryField(null=True, blank=True)
+
+    created_at = models.DateTimeField(verbose_name='Criada em')
+    completed_at = models.DateTimeField(null=True, blank=True, verbose_name='Concluída em')
+
+    class Meta:
+        verbose_name = 'Chave de Idempotência'
+        verbose_name_plural = 'Chaves de Idempotência'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.key}"
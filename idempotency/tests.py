@@ -0,0 +1,108 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from inflows.models import Inflow
+from products.models import Product
+from reporting import benchmarks
+from sales.models import Sale
+from suppliers.models import Supplier
+from .decorators import HEADER, REPLAYED_HEADER, _request_hash, purge_expired
+from .models import IdempotencyKey
+
+
+class IdempotentSubmissionTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.force_login(self.user)
+        self.product = benchmarks.seed_products(1, 'idempotencia')[0]
+        self.sale = json.dumps({'items': [{'product_id': self.product.id, 'quantity': 2}]})
+
+    def post(self, url, body, key=None):
+        headers = {HEADER: key} if key else {}
+        return self.client.post(url, body, content_type='application/json', headers=headers)
+
+    def test_retried_sale_replays_the_stored_response(self):
+        url = reverse('sales:process_quick_sale')
+        first = self.post(url, self.sale, 'venda-1')
+        retry = self.post(url, self.sale, 'venda-1')
+
+        self.assertTrue(first.json()['success'])
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry[REPLAYED_HEADER], 'true')
+        self.assertEqual(Sale.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 100 - 2)
+
+        # Outra chave é outra venda
+        self.post(url, self.sale, 'venda-2')
+        self.assertEqual(Sale.objects.count(), 2)
+
+    def test_key_reused_with_another_body_is_rejected(self):
+        url = reverse('sales:process_quick_sale')
+        self.post(url, self.sale, 'venda-1')
+        other = json.dumps({'items': [{'product_id': self.product.id, 'quantity': 5}]})
+
+        self.assertEqual(self.post(url, other, 'venda-1').status_code, 422)
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_without_key_every_request_runs(self):
+        url = reverse('sales:process_quick_sale')
+        self.post(url, self.sale)
+        self.post(url, self.sale)
+
+        self.assertEqual(Sale.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_retried_bulk_inflow_is_applied_once(self):
+        Supplier.objects.create(name='Fornecedor')
+        url = reverse('save_bulk_inflows')
+        body = json.dumps({'products': [{'id': self.product.id, 'quantity': 5}]})
+
+        first = self.post(url, body, 'entrada-1')
+        retry = self.post(url, body, 'entrada-1')
+
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Inflow.objects.count(), 1)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).quantity, 100 + 5)
+
+    def test_purge_removes_expired_keys(self):
+        self.post(reverse('sales:process_quick_sale'), self.sale, 'venda-1')
+        with self.settings(IDEMPOTENCY={'TTL': -1}):
+            self.assertEqual(purge_expired(), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_key_of_an_unfinished_request_is_released_only_after_the_lock_timeout(self):
+        url = reverse('sales:process_quick_sale')
+        # Reservada por uma requisição que ainda não terminou
+        request = RequestFactory().post(url, self.sale, content_type='application/json')
+        record = IdempotencyKey.objects.create(
+            user=self.user, key='venda-1', request_hash=_request_hash(request), created_at=timezone.now(),
+        )
+
+        response = self.post(url, self.sale, 'venda-1')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Sale.objects.exists())
+
+        # Passado o LOCK_TIMEOUT, sem transação segurando a chave: a tentativa executa
+        IdempotencyKey.objects.filter(pk=record.pk).update(created_at=timezone.now() - timedelta(minutes=11))
+        self.assertTrue(self.post(url, self.sale, 'venda-1').json()['success'])
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_cart_resent_with_its_key_after_a_lost_response_is_recorded_once(self):
+        # A tela guarda a chave do carrinho: o novo clique em "Finalizar", depois
+        # de esgotadas as tentativas automáticas, reenvia a mesma chave
+        url = reverse('sales:process_quick_sale')
+        self.post(url, self.sale, 'carrinho-1')  # resposta perdida na rede
+        resent = self.post(url, self.sale, 'carrinho-1')
+
+        self.assertTrue(resent.json()['success'])
+        self.assertEqual(resent[REPLAYED_HEADER], 'true')
+        self.assertEqual(Sale.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 100 - 2)
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inflows', '0001_initial'),
+        ('products', '0003_alter_product_options'),
+        ('suppliers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inflow',
+            index=models.Index(fields=['created_at'], name='inflows_created_at_idx'),
+        ),
+    ]
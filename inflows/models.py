@@ -13,6 +13,10 @@ class Inflow(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Só o B-tree: um BRIN na mesma coluna seria redundante (ver Sale)
+            models.Index(fields=['created_at'], name='inflows_created_at_idx'),
+        ]
 
     def __str__(self):
         return str(self.product)
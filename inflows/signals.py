@@ -1,5 +1,6 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from products import stock
 from .models import Inflow
 
 
@@ -7,6 +8,4 @@ from .models import Inflow
 def update_product_quantity(sender, instance, created, **kwargs):
     if created:
         if instance.quantity > 0:
-            product = instance.product
-            product.quantity += instance.quantity
-            product.save()
+            stock.increment([(instance.product, instance.quantity)])
@@ -0,0 +1,49 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from products import barcodes
+from products.models import Product
+from reporting import benchmarks
+
+
+class ResolveBarcodesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        barcodes.clear_local()
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        self.products = benchmarks.seed_catalog(20)
+        self.url = reverse('resolve_barcodes')
+
+    def resolve(self, codes):
+        return self.client.post(self.url, json.dumps({'codes': codes}), content_type='application/json')
+
+    def test_resolves_all_codes_in_one_query(self):
+        codes = [product.barcode for product in self.products] + [self.products[0].sku, 'desconhecido']
+
+        # Sessão, usuário e uma única query para todos os códigos
+        with self.assertNumQueries(3):
+            data = self.resolve(codes).json()
+
+        self.assertEqual(len(data['products']), 21)
+        self.assertEqual(data['products'][self.products[0].sku]['id'], self.products[0].id)
+        self.assertEqual(data['products'][self.products[5].barcode]['name'], self.products[5].title)
+        self.assertEqual(data['unknown'], ['desconhecido'])
+
+        # Todos já no cache
+        with self.assertNumQueries(2):
+            self.resolve(codes)
+
+    def test_inactive_products_are_unknown(self):
+        Product.objects.filter(pk=self.products[0].pk).update(is_active=False)
+        data = self.resolve([self.products[0].barcode]).json()
+        self.assertEqual(data['unknown'], [self.products[0].barcode])
+
+    def test_invalid_body(self):
+        self.assertEqual(self.client.post(self.url, '{', content_type='application/json').status_code, 400)
+        self.assertEqual(self.resolve('789').status_code, 400)
+        self.assertEqual(self.resolve(['x'] * 501).status_code, 400)
@@ -13,5 +13,6 @@ urlpatterns = [
     
     # API para scanner
     path('api/search-product/<str:barcode>/', views.search_product_for_inflow, name='search_product_for_inflow'),
+    path('api/resolve-barcodes/', views.resolve_barcodes, name='resolve_barcodes'),
     path('api/save-bulk-inflows/', views.save_bulk_inflows, name='save_bulk_inflows'),
 ]
@@ -9,8 +9,10 @@ from django.views.decorators.csrf import csrf_exempt
 from django.db import transaction
 from django.utils import timezone
 import json
+from products import barcodes
 from products.models import Product
 from suppliers.models import Supplier
+from idempotency.decorators import idempotent
 from . import models, forms, serializers
 
 
@@ -55,36 +57,76 @@ class InflowRetrieveAPIView(generics.RetrieveAPIView):
     serializer_class = serializers.InflowSerializer
 
 
+# Limite de códigos por requisição de resolve_barcodes
+MAX_RESOLVE_CODES = 500
+
+
+def _scanner_product(product):
+    """Produto no formato das APIs do scanner de entrada"""
+    return {
+        'id': product['id'],
+        'name': product['title'],
+        'barcode': product['barcode'],
+        'sku': product['sku'],
+        'current_stock': product['quantity'],
+        'brand': product['brand'],
+        'size': product['size'],
+        'color': product['color'],
+        'cost_price': float(product['cost_price']),
+        'selling_price': float(product['selling_price']),
+    }
+
+
 @require_http_methods(["GET"])
 @login_required
 def search_product_for_inflow(request, barcode):
     """API para buscar produto por código de barras para entrada de estoque"""
-    try:
-        product = Product.objects.get(barcode=barcode, is_active=True)
-        return JsonResponse({
-            'success': True,
-            'product': {
-                'id': product.id,
-                'name': product.title,
-                'barcode': product.barcode,
-                'sku': product.sku or '',
-                'current_stock': product.quantity,
-                'brand': product.brand.name if product.brand else '',
-                'size': product.size.name if product.size else '',
-                'color': product.color.name if product.color else '',
-                'cost_price': float(product.cost_price),
-                'selling_price': float(product.selling_price),
-            }
-        })
-    except Product.DoesNotExist:
+    product = barcodes.lookup(barcode)
+    if not product or product['barcode'] != barcode or not product['is_active']:
         return JsonResponse({
             'success': False,
             'error': 'Produto não encontrado'
         })
 
+    return JsonResponse({
+        'success': True,
+        'product': _scanner_product(product)
+    })
+
+
+@require_http_methods(["POST"])
+@login_required
+def resolve_barcodes(request):
+    """
+    API para resolver de uma vez vários códigos de barras ou SKUs lidos pelo
+    scanner: {"codes": [...]} -> produtos encontrados por código e os desconhecidos
+    """
+    try:
+        codes = json.loads(request.body).get('codes')
+    except (json.JSONDecodeError, AttributeError):
+        codes = None
+    if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+        return JsonResponse({'success': False, 'error': 'Informe a lista "codes"'}, status=400)
+    if len(codes) > MAX_RESOLVE_CODES:
+        return JsonResponse({
+            'success': False,
+            'error': f'Envie no máximo {MAX_RESOLVE_CODES} códigos por requisição'
+        }, status=400)
+
+    codes = list(dict.fromkeys(code.strip() for code in codes if code.strip()))
+    # Uma única query (barcode__in/sku__in com select_related) para os códigos fora do cache
+    found = {code: product for code, product in barcodes.lookup_many(codes).items() if product['is_active']}
+
+    return JsonResponse({
+        'success': True,
+        'products': {code: _scanner_product(product) for code, product in found.items()},
+        'unknown': [code for code in codes if code not in found],
+    })
+
 
 @require_http_methods(["POST"])
 @login_required
+@idempotent
 @csrf_exempt
 def save_bulk_inflows(request):
     """API para salvar múltiplas entradas de estoque escaneadas"""
@@ -135,10 +177,7 @@ def save_bulk_inflows(request):
                         description=f"Entrada via scanner - {notes}" if notes else "Entrada via scanner"
                     )
                     
-                    # Atualizar estoque do produto
-                    product.quantity += quantity
-                    product.save()
-                    
+                    # O estoque é somado pelo signal da entrada
                     created_inflows.append({
                         'id': inflow.id,
                         'product_name': product.title,
@@ -173,4 +212,4 @@ def save_bulk_inflows(request):
         return JsonResponse({
             'success': False,
             'error': f'Erro interno: {str(e)}'
-        })
+        }, status=500)
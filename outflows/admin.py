@@ -6,7 +6,7 @@ class OutflowAdmin(admin.ModelAdmin):
     list_display = ('product', 'quantity', 'sale', 'created_at', 'updated_at',)
     search_fields = ('product__title', 'description')
     list_filter = ('created_at', 'sale')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('unit_price', 'created_at', 'updated_at')
 
 
 admin.site.register(models.Outflow, OutflowAdmin)
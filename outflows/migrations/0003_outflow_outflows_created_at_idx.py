@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outflows', '0002_outflow_sale'),
+        ('products', '0003_alter_product_options'),
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outflow',
+            index=models.Index(
+                fields=['created_at'],
+                include=['product', 'quantity'],
+                name='outflows_created_at_idx',
+            ),
+        ),
+    ]
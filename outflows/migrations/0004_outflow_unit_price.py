@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_unit_price(apps, schema_editor):
+    # Saídas de vendas: o preço do item vendido; as demais: o preço atual do produto
+    Outflow = apps.get_model('outflows', 'Outflow')
+    Product = apps.get_model('products', 'Product')
+    SaleItem = apps.get_model('sales', 'SaleItem')
+    sale_price = SaleItem.objects.filter(sale=OuterRef('sale'), product=OuterRef('product')).values('unit_price')[:1]
+    product_price = Product.objects.filter(pk=OuterRef('product')).values('selling_price')[:1]
+    Outflow.objects.update(unit_price=Coalesce(Subquery(sale_price), Subquery(product_price)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('outflows', '0003_outflow_outflows_created_at_idx'),
+        ('sales', '0004_sale_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outflow',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(fill_unit_price, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='outflow',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+    ]
@@ -1,14 +1,29 @@
-from django.db import models
+from django.db import models, transaction
 from products.models import Product
 
 
 class Outflow(models.Model):
     product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='outflows')
     quantity = models.IntegerField()
+    # Preço de venda no momento da saída: o valor das saídas nos resumos não muda com o cadastro
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     description = models.TextField(null=True, blank=True)
     sale = models.ForeignKey('sales.Sale', on_delete=models.SET_NULL, null=True, blank=True, related_name='outflows')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Sem BRIN em created_at, como em Sale: o B-tree cobre os períodos
+            models.Index(fields=['created_at'], include=['product', 'quantity'], name='outflows_created_at_idx'),
+        ]
+
     def __str__(self):
         return str(self.product)
+
+    def save(self, *args, **kwargs):
+        if self.unit_price is None:
+            self.unit_price = self.product.selling_price
+        # A baixa do estoque (signal) pode ser recusada; sem ela a saída não é gravada
+        with transaction.atomic():
+            super().save(*args, **kwargs)
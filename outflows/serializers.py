@@ -7,3 +7,4 @@ class OutflowSerializer(serializers.ModelSerializer):
     class Meta:
         model = Outflow
         fields = '__all__'
+        read_only_fields = ['unit_price']
@@ -1,8 +1,10 @@
 from rest_framework import generics
+from rest_framework.exceptions import ValidationError
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, DetailView
 from app import metrics
+from products import stock
 from . import models, forms, serializers
 
 
@@ -36,6 +38,14 @@ class OutflowCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView)
     success_url = reverse_lazy('outflow_list')
     permission_required = 'outflows.add_outflow'
 
+    def form_valid(self, form):
+        try:
+            return super().form_valid(form)
+        except stock.InsufficientStock as error:
+            # Outra venda baixou o estoque depois da validação do formulário
+            form.add_error('quantity', str(error))
+            return self.form_invalid(form)
+
 
 class OutflowDetailView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
     model = models.Outflow
@@ -47,6 +57,12 @@ class OutflowCreateListAPIView(generics.ListCreateAPIView):
     queryset = models.Outflow.objects.all().order_by('-id')
     serializer_class = serializers.OutflowSerializer
 
+    def perform_create(self, serializer):
+        try:
+            serializer.save()
+        except stock.InsufficientStock as error:
+            raise ValidationError({'quantity': [str(error)]})
+
 
 class OutflowRetrieveAPIView(generics.RetrieveAPIView):
     queryset = models.Outflow.objects.all().order_by('-id')
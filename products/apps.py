@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+from . import fts
+
+
+def ensure_search_index(using, **kwargs):
+    fts.ensure(connections[using])
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        import products.signals  # noqa: F401
+
+        post_migrate.connect(ensure_search_index, sender=self)
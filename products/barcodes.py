@@ -0,0 +1,182 @@
+"""
+Cache dos códigos de barras e SKUs lidos pelo scanner.
+
+Cada código resolvido vira um resumo do produto (`summary`), guardado em dois
+níveis: um LRU limitado em cada processo e o cache do Django, compartilhado
+entre os processos. Um código já conhecido não custa nenhuma query no banco.
+
+Os signals de `products.signals` removem do cache do Django os códigos dos
+produtos alterados (inclusive por movimentações de estoque) e incrementam a
+geração; as entradas do LRU local de gerações anteriores são conferidas de novo
+no cache do Django. Alterações em marcas, tamanhos e cores trocam a versão do
+catálogo, que faz parte das chaves, e invalidam todos os códigos.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import Product
+
+
+GENERATION_KEY = 'barcodes:generation'
+CATALOG_KEY = 'barcodes:catalog'
+ENTRY_KEY = 'barcodes:{}:{}'
+
+# Marca de código sem produto; uma string, para continuar igual depois de passar pelo cache
+MISSING = 'missing'
+
+
+def _setting(name, default):
+    return getattr(settings, 'BARCODE_CACHE', {}).get(name, default)
+
+
+class _LRU:
+    """Resumos do processo: {código: (geração, resumo)}, dos menos aos mais usados"""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, code, generation):
+        with self.lock:
+            entry = self.entries.get(code)
+            if entry is None or entry[0] != generation:
+                return None
+            self.entries.move_to_end(code)
+            return entry[1]
+
+    def put(self, code, generation, summary):
+        with self.lock:
+            self.entries[code] = (generation, summary)
+            self.entries.move_to_end(code)
+            while len(self.entries) > _setting('MAX_SIZE', 10_000):
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+_local = _LRU()
+
+
+def _counters():
+    values = cache.get_many([GENERATION_KEY, CATALOG_KEY])
+    if len(values) < 2:
+        # Valores baseados no relógio para não repetir versões após uma limpeza do cache
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        cache.add(CATALOG_KEY, time.time_ns(), timeout=None)
+        values = cache.get_many([GENERATION_KEY, CATALOG_KEY])
+    return values[GENERATION_KEY], values[CATALOG_KEY]
+
+
+def _key(catalog, code):
+    # Códigos lidos podem ter espaços e outros caracteres inválidos em chaves do memcached
+    return ENTRY_KEY.format(catalog, hashlib.sha1(code.encode()).hexdigest())
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def summary(product):
+    """Dados do produto usados pelas telas de scanner; `brand`, `size` e `color` já carregados"""
+    return {
+        'id': product.id,
+        'title': product.title,
+        'barcode': product.barcode or '',
+        'sku': product.sku or '',
+        'quantity': product.quantity,
+        'is_active': product.is_active,
+        'brand': product.brand.name if product.brand else '',
+        'size': product.size.name if product.size else '',
+        'color': product.color.name if product.color else '',
+        'cost_price': str(product.cost_price),
+        'selling_price': str(product.selling_price),
+        'display_name': str(product),
+    }
+
+
+def _load(codes):
+    products = list(
+        Product.objects.filter(Q(barcode__in=codes) | Q(sku__in=codes))
+        .select_related('brand', 'size', 'color')
+        .order_by()
+    )
+    found = {}
+    for product in products:
+        if product.sku in codes:
+            found.setdefault(product.sku, summary(product))
+    for product in products:
+        # O código de barras tem prioridade sobre um SKU igual de outro produto
+        if product.barcode in codes:
+            found[product.barcode] = summary(product)
+    return found
+
+
+def lookup_many(codes):
+    """Resumos dos produtos com os códigos de barras ou SKUs informados ({código: resumo})"""
+    codes = {code for code in codes if code}
+    if not codes:
+        return {}
+    generation, catalog = _counters()
+
+    # Códigos desconhecidos ficam guardados como MISSING, por menos tempo
+    resolved = {}
+    for code in codes:
+        cached = _local.get(code, generation)
+        if cached is not None:
+            resolved[code] = cached
+
+    pending = codes - set(resolved)
+    if pending:
+        keys = {_key(catalog, code): code for code in pending}
+        shared = {keys[key]: value for key, value in cache.get_many(keys).items()}
+        loaded = _load(pending - set(shared))
+        missing = pending - set(shared) - set(loaded)
+        cache.set_many(
+            {_key(catalog, code): value for code, value in loaded.items()},
+            timeout=_setting('TIMEOUT', 60 * 60),
+        )
+        cache.set_many(
+            {_key(catalog, code): MISSING for code in missing},
+            timeout=_setting('MISSING_TIMEOUT', 60),
+        )
+        for code, value in {**shared, **loaded, **dict.fromkeys(missing, MISSING)}.items():
+            _local.put(code, generation, value)
+            resolved[code] = value
+
+    return {code: value for code, value in resolved.items() if value != MISSING}
+
+
+def lookup(code):
+    """Resumo do produto com o código de barras ou SKU `code`, ou None"""
+    return lookup_many([code]).get(code)
+
+
+def invalidate(codes):
+    """Remove os códigos informados dos caches (depois que a transação é confirmada)"""
+    codes = {code for code in codes if code}
+    if not codes:
+        return
+    _, catalog = _counters()
+    cache.delete_many([_key(catalog, code) for code in codes])
+    _bump(GENERATION_KEY)
+
+
+def invalidate_all():
+    """Invalida todos os códigos, ex.: quando muda o nome de uma marca"""
+    _bump(CATALOG_KEY)
+    _bump(GENERATION_KEY)
+
+
+def clear_local():
+    _local.clear()
@@ -0,0 +1,77 @@
+"""
+Índice de busca por título (`Product.search_title`) de cada banco.
+
+SQLite: tabela FTS5 de conteúdo externo espelhando search_title, mantida por
+triggers, que valem também para bulk_create e update(). Migrações do SQLite que
+recriam a tabela de produtos apagam os triggers; `ensure` os recria no
+post_migrate.
+
+PostgreSQL (alias `prod`): índice GIN de trigramas, usado por LIKE '%...%' e
+LIKE '...%'.
+"""
+TABLE = 'products_product_fts'
+
+SQLITE_TRIGGERS = {
+    'products_product_fts_insert': (
+        f"CREATE TRIGGER IF NOT EXISTS products_product_fts_insert AFTER INSERT ON products_product BEGIN "
+        f"INSERT INTO {TABLE}(rowid, search_title) VALUES (new.id, new.search_title); END"
+    ),
+    'products_product_fts_delete': (
+        f"CREATE TRIGGER IF NOT EXISTS products_product_fts_delete AFTER DELETE ON products_product BEGIN "
+        f"INSERT INTO {TABLE}({TABLE}, rowid, search_title) VALUES ('delete', old.id, old.search_title); END"
+    ),
+    'products_product_fts_update': (
+        f"CREATE TRIGGER IF NOT EXISTS products_product_fts_update AFTER UPDATE OF search_title ON products_product "
+        f"BEGIN INSERT INTO {TABLE}({TABLE}, rowid, search_title) VALUES ('delete', old.id, old.search_title); "
+        f"INSERT INTO {TABLE}(rowid, search_title) VALUES (new.id, new.search_title); END"
+    ),
+}
+
+SQLITE_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    f"search_title, content='products_product', content_rowid='id', tokenize='unicode61', prefix='2 3 4')"
+)
+
+SQLITE_REBUILD = f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')"
+
+POSTGRES_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS products_search_title_trgm_idx ON products_product '
+    'USING gin (search_title gin_trgm_ops)',
+]
+
+
+def install(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(SQLITE_TABLE)
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            cursor.execute(SQLITE_REBUILD)
+        elif connection.vendor == 'postgresql':
+            for sql in POSTGRES_SQL:
+                cursor.execute(sql)
+
+
+def uninstall(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS products_search_title_trgm_idx')
+
+
+def ensure(connection):
+    """Recria os triggers do SQLite (e reindexa) se uma migração os apagou"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND tbl_name = 'products_product')",
+            [TABLE],
+        )
+        existing = {name for name, in cursor.fetchall()}
+    if TABLE in existing and not set(SQLITE_TRIGGERS) <= existing:
+        install(connection)
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products import search
+from products.models import Product
+from reporting import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Mede queries e tempo da busca de produtos (tela de venda) em um catálogo sintético'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=200_000,
+            help='Produtos no catálogo sintético',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Buscas por termo (o tempo mostrado é a mediana)',
+        )
+
+    def handle(self, *args, **options):
+        # Tudo é desfeito ao final, o banco não é alterado
+        with transaction.atomic():
+            benchmarks.seed_catalog(options['products'])
+            products = Product.objects.filter(is_active=True, quantity__gt=0)
+
+            for query in ['7890000012345', 'CAT-4321', 'ca', 'cami', 'calça jea', 'vestido slim seda', 'inexistente']:
+                runs = [
+                    benchmarks.measure(lambda: list(search.search(products, query)[:10]))
+                    for _ in range(options['repeat'])
+                ]
+                found = len(runs[0][0])
+                queries = max(run[1] for run in runs)
+                elapsed = sorted(run[2] for run in runs)[len(runs) // 2]
+                self.stdout.write(
+                    f'busca={query!r:<22} resultados={found:<3} queries={queries:<2} tempo={elapsed:.2f}ms'
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            self.style.SUCCESS('BENCHMARK FINALIZADO!')
+        )
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brands', '0001_initial'),
+        ('categories', '0001_initial'),
+        ('colors', '0001_initial'),
+        ('products', '0003_alter_product_options'),
+        ('sizes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['quantity', 'title', 'id'], name='products_stock_order_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.1 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+from products import fts
+from products.normalize import normalize
+
+
+def fill_search_title(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    products = list(Product.objects.only('pk', 'title'))
+    for product in products:
+        product.search_title = normalize(product.title)
+    Product.objects.bulk_update(products, ['search_title'], batch_size=1000)
+
+
+# FTS5 no SQLite, trigramas no PostgreSQL (products.fts)
+def create_search_index(apps, schema_editor):
+    fts.install(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    fts.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_stock_order_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_title',
+            field=models.CharField(default='', editable=False, max_length=500),
+        ),
+        migrations.RunPython(fill_search_title, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+
+from .normalize import normalize
 from categories.models import Category
 from brands.models import Brand
 from sizes.models import Size
@@ -8,6 +10,8 @@ from colors.models import Color
 class Product(models.Model):
     # Informações básicas
     title = models.CharField(max_length=500, verbose_name='Nome do Produto')
+    # Título em minúsculas e sem acentos, indexado para a busca (products.search)
+    search_title = models.CharField(max_length=500, default='', editable=False)
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='products', verbose_name='Categoria')
     brand = models.ForeignKey(Brand, on_delete=models.PROTECT, related_name='products', verbose_name='Marca')
     description = models.TextField(null=True, blank=True, verbose_name='Descrição')
@@ -44,9 +48,20 @@ class Product(models.Model):
         verbose_name_plural = 'Produtos'
         # Garante que não haverá duplicação de produto com mesmo tamanho e cor
         unique_together = ['title', 'brand', 'size', 'color']
+        indexes = [
+            # Ordem do relatório de estoque (paginação por chave)
+            models.Index(fields=['quantity', 'title', 'id'], name='products_stock_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.size} - {self.color}"
+
+    def save(self, *args, **kwargs):
+        self.search_title = normalize(self.title)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_title'}
+        super().save(*args, **kwargs)
     
     @property
     def is_low_stock(self):
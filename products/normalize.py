@@ -0,0 +1,9 @@
+import re
+import unicodedata
+
+
+def normalize(text):
+    """Texto em minúsculas, sem acentos e com espaços simples ('Camisa  Pólo' -> 'camisa polo')"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r'\s+', ' ', text).strip().lower()
@@ -0,0 +1,88 @@
+"""
+Busca de produtos por código de barras, SKU e título.
+
+Código de barras e SKU são procurados por igualdade, nos índices únicos. O
+título é buscado em `search_title` (minúsculas, sem acentos) pelo prefixo de
+cada palavra digitada ('cam azu' acha 'Camisa Azul'), usando o índice de cada
+banco (products.fts) em vez de varrer a tabela com icontains.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from . import fts
+from .normalize import normalize
+
+
+def _words(query):
+    return re.findall(r'\w+', normalize(query))
+
+
+def _match(words):
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def by_code(queryset, code):
+    """Produtos com o código de barras ou o SKU exato"""
+    return queryset.filter(Q(barcode=code) | Q(sku=code))
+
+
+def by_title(queryset, query):
+    """Produtos cujo título tem palavras começando com cada palavra de `query`"""
+    words = _words(query)
+    if not words:
+        return queryset.none()
+
+    if connections[queryset.db].vendor == 'sqlite':
+        return queryset.filter(pk__in=RawSQL(f'SELECT rowid FROM {fts.TABLE} WHERE {fts.TABLE} MATCH %s', [_match(words)]))
+
+    # No PostgreSQL os LIKE usam o índice de trigramas
+    for word in words:
+        queryset = queryset.filter(Q(search_title__startswith=word) | Q(search_title__contains=f' {word}'))
+    return queryset
+
+
+def _first_ids(queryset, words, limit):
+    """
+    Ids dos primeiros `limit` produtos de `queryset` que batem no FTS5. O índice
+    é lido em páginas crescentes e a leitura para assim que houver produtos
+    suficientes: com um prefixo curto ('ca') o IN com todas as ocorrências
+    custaria mais que a própria busca.
+    """
+    found = []
+    last, size = 0, limit * 10
+    with connections[queryset.db].cursor() as cursor:
+        while len(found) < limit:
+            cursor.execute(
+                f'SELECT rowid FROM {fts.TABLE} WHERE {fts.TABLE} MATCH %s AND rowid > %s ORDER BY rowid LIMIT %s',
+                [_match(words), last, size],
+            )
+            ids = [rowid for rowid, in cursor.fetchall()]
+            if not ids:
+                break
+            found += queryset.filter(pk__in=ids).order_by('pk').values_list('pk', flat=True)[:limit - len(found)]
+            # Limite de parâmetros do SQLite
+            last, size = ids[-1], min(size * 4, 900)
+    return found
+
+
+def search(queryset, query, limit=10):
+    """
+    Busca das telas com digitação: código exato (leitura do scanner) ou, se
+    nenhum produto tiver o código, até `limit` produtos pelo título
+    """
+    query = query.strip()
+    products = by_code(queryset, query)
+    if products.exists():
+        return products
+    return first_by_title(queryset, query, limit)
+
+
+def first_by_title(queryset, query, limit=10):
+    """Até `limit` produtos de `by_title`, sem ler todas as ocorrências no SQLite"""
+    words = _words(query)
+    if words and connections[queryset.db].vendor == 'sqlite':
+        return queryset.filter(pk__in=_first_ids(queryset, words, limit))
+    return by_title(queryset, query)
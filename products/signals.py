@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from brands.models import Brand
+from colors.models import Color
+from sizes.models import Size
+from . import barcodes
+from .models import Product
+from .stock import stock_changed
+
+
+def _invalidate_on_commit(codes):
+    codes = set(codes)
+    transaction.on_commit(lambda: barcodes.invalidate(codes))
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_codes(sender, instance, **kwargs):
+    """Guarda os códigos atuais: se mudarem, os antigos também saem do cache"""
+    instance._previous_codes = ()
+    if instance.pk:
+        instance._previous_codes = Product.objects.filter(pk=instance.pk).values_list('barcode', 'sku').first() or ()
+
+
+@receiver(post_save, sender=Product)
+def invalidate_barcodes_on_save(sender, instance, **kwargs):
+    _invalidate_on_commit([instance.barcode, instance.sku, *getattr(instance, '_previous_codes', ())])
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_barcodes_on_delete(sender, instance, **kwargs):
+    _invalidate_on_commit([instance.barcode, instance.sku])
+
+
+@receiver(stock_changed, sender=Product)
+def invalidate_barcodes_on_stock_change(sender, changes, **kwargs):
+    _invalidate_on_commit(code for product, _ in changes for code in (product.barcode, product.sku))
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Size)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Size)
+@receiver(post_delete, sender=Color)
+def invalidate_barcodes_on_catalog_change(sender, **kwargs):
+    transaction.on_commit(barcodes.invalidate_all)
@@ -0,0 +1,103 @@
+"""
+Movimentações de estoque.
+
+O estoque nunca é alterado por ler-modificar-gravar (`product.quantity -= n;
+product.save()`), que perde atualizações quando dois caixas vendem o mesmo
+produto ao mesmo tempo. Cada movimentação é um UPDATE atômico e as baixas são
+condicionais (`quantity = quantity - n WHERE quantity >= n`), então o estoque
+nunca fica negativo.
+
+Vendas com vários produtos travam as linhas em ordem de id (`lock`) antes da
+baixa: duas vendas nunca esperam uma pela outra em ordens opostas (deadlock).
+
+update() não dispara os signals do Product; cada movimentação envia
+`stock_changed` com a lista de (produto, variação).
+"""
+from collections import defaultdict
+
+from django.db import connections, transaction
+from django.db.models import Case, F, Q, When
+from django.dispatch import Signal
+
+from .models import Product
+
+
+stock_changed = Signal()
+
+
+class InsufficientStock(Exception):
+
+    def __init__(self, product, requested):
+        self.product = product
+        self.requested = requested
+        super().__init__(f'Estoque insuficiente para {product.title}. Disponível: {product.quantity}')
+
+
+def lock(product_ids):
+    """Produtos travados até o fim da transação (SELECT ... FOR UPDATE em ordem de id)"""
+    products = Product.objects.filter(pk__in=product_ids).order_by('pk')
+    if not connections[products.db].features.has_select_for_update:
+        # SQLite não tem FOR UPDATE: uma escrita vazia reserva o banco para esta
+        # transação logo no início, em vez de a leitura abaixo virar escrita
+        # depois e falhar com "database is locked" quando outro caixa já escreve
+        products.update(quantity=F('quantity'))
+    return {product.pk: product for product in products.select_for_update()}
+
+
+def _by_product(changes):
+    products = {}
+    quantities = defaultdict(int)
+    for product, quantity in changes:
+        products[product.pk] = product
+        quantities[product.pk] += quantity
+    return products, quantities
+
+
+def _apply(products, deltas):
+    """Soma `deltas` ({id: variação}) no estoque em um único UPDATE"""
+    updated = Product.objects.filter(pk__in=deltas).filter(
+        # Baixas só se houver estoque suficiente
+        *[~Q(pk=product_id) | Q(quantity__gte=-delta) for product_id, delta in deltas.items() if delta < 0],
+    ).update(quantity=Case(
+        *[When(pk=product_id, then=F('quantity') + delta) for product_id, delta in deltas.items()],
+        default=F('quantity'),
+    ))
+    if updated == len(deltas):
+        return True
+
+    # Atualiza a quantidade dos produtos para a mensagem de erro
+    current = dict(Product.objects.filter(pk__in=deltas).values_list('pk', 'quantity'))
+    for product_id, delta in deltas.items():
+        product = products[product_id]
+        product.quantity = current.get(product_id, 0)
+        if product.quantity + delta < 0:
+            raise InsufficientStock(product, -delta)
+    raise Product.DoesNotExist('Produto não encontrado')
+
+
+def _move(changes, sign):
+    products, quantities = _by_product(changes)
+    deltas = {product_id: sign * quantity for product_id, quantity in quantities.items() if quantity}
+    if not deltas:
+        return
+
+    # Em caso de erro, nenhuma das linhas fica alterada
+    with transaction.atomic():
+        _apply(products, deltas)
+        # Valor em memória; é o do banco quando os produtos foram travados com `lock`
+        for product_id, delta in deltas.items():
+            products[product_id].quantity += delta
+        stock_changed.send(Product, changes=[(products[product_id], delta) for product_id, delta in deltas.items()])
+
+
+def decrement(changes):
+    """
+    Baixa do estoque [(produto, quantidade), ...]; levanta InsufficientStock
+    (sem baixar nada) se faltar algum produto
+    """
+    _move(changes, -1)
+
+
+def increment(changes):
+    """Soma ao estoque [(produto, quantidade), ...]"""
+    _move(changes, 1)
@@ -0,0 +1,128 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from reporting import benchmarks
+from . import barcodes, fts, search, stock
+from .models import Product
+
+
+class ProductSearchTests(TestCase):
+
+    def setUp(self):
+        self.products = benchmarks.seed_catalog(30)
+        self.regata = self.products[10]
+        self.regata.title = 'Regata Ribana Único'
+        self.regata.save()
+
+    def titles(self, query):
+        return {product.title for product in search.by_title(Product.objects.all(), query)}
+
+    def test_title_prefixes_ignore_case_accents_and_word_order(self):
+        self.assertEqual(self.titles('ÚNICO reg'), {'Regata Ribana Único'})
+        self.assertEqual(self.titles('unic riba'), {'Regata Ribana Único'})
+        self.assertEqual(self.titles('amisa'), set())
+
+    def test_index_follows_updates_and_deletes(self):
+        self.regata.title = 'Vestido Longo'
+        self.regata.save(update_fields=['title'])
+        self.assertEqual(self.titles('longo'), {'Vestido Longo'})
+        self.assertEqual(self.titles('ribana'), set())
+
+        self.regata.delete()
+        self.assertEqual(self.titles('longo'), set())
+
+    def test_codes_are_matched_exactly(self):
+        product = self.products[3]
+        self.assertEqual(list(search.search(Product.objects.all(), product.barcode)), [product])
+        self.assertEqual(list(search.search(Product.objects.all(), product.sku)), [product])
+        self.assertFalse(search.by_code(Product.objects.all(), product.barcode[:-1]).exists())
+
+    def test_bulk_seeded_products_are_searchable(self):
+        seeded = benchmarks.seed_products(3, prefix='lote')
+        self.assertEqual(self.titles('lote produto 2'), {seeded[2].title})
+
+    def test_search_stops_at_the_limit(self):
+        found = search.search(Product.objects.all(), 'algodao', limit=2)
+        self.assertEqual(len(found), 2)
+
+    def test_search_api(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        response = self.client.get(reverse('sales:product_search_api'), {'q': 'regata unico'})
+        self.assertEqual([item['id'] for item in response.json()['products']], [self.regata.id])
+
+    def test_missing_sqlite_triggers_are_recreated(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('índice FTS5 só existe no SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER products_product_fts_update')
+        fts.ensure(connection)
+
+        self.regata.title = 'Jaqueta Couro'
+        self.regata.save()
+        self.assertEqual(self.titles('jaqueta couro'), {'Jaqueta Couro'})
+
+
+class BarcodeCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        barcodes.clear_local()
+        self.product = benchmarks.seed_catalog(3)[1]
+
+    def test_known_codes_cost_no_queries(self):
+        self.assertEqual(barcodes.lookup(self.product.barcode)['id'], self.product.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(barcodes.lookup(self.product.barcode)['title'], self.product.title)
+
+        # Outro processo: só o cache do Django
+        barcodes.clear_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(barcodes.lookup(self.product.barcode)['id'], self.product.id)
+
+    def test_product_changes_invalidate_the_cache(self):
+        old_barcode = self.product.barcode
+        barcodes.lookup(old_barcode)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.barcode = '123'
+            self.product.selling_price = 99
+            self.product.save()
+        self.assertIsNone(barcodes.lookup(old_barcode))
+        self.assertEqual(barcodes.lookup('123')['selling_price'], '99.00')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stock.increment([(self.product, 5)])
+        self.assertEqual(barcodes.lookup('123')['quantity'], self.product.quantity)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.brand.name = 'Nova marca'
+            self.product.brand.save()
+        self.assertEqual(barcodes.lookup('123')['brand'], 'Nova marca')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertIsNone(barcodes.lookup('123'))
+
+    def test_unknown_code_is_found_once_registered(self):
+        self.assertIsNone(barcodes.lookup('novo'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(barcodes.lookup('novo'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.barcode = 'novo'
+            self.product.save()
+        self.assertEqual(barcodes.lookup('novo')['id'], self.product.id)
+
+    def test_scanner_endpoint(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        url = reverse('search_product_for_inflow', args=[self.product.barcode])
+        self.client.get(url)
+
+        # Só as queries de sessão e usuário
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.json()['product']['id'], self.product.id)
+        self.assertFalse(self.client.get(reverse('search_product_for_inflow', args=[self.product.sku])).json()['success'])
@@ -2,11 +2,11 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from django.db.models import Q
 from django.core.paginator import Paginator
 from django.views.decorators.http import require_http_methods
 from django.urls import reverse
 
+from . import barcodes, search
 from .models import Product
 from .forms import ProductForm, ProductSearchForm
 from categories.models import Category
@@ -26,13 +26,10 @@ def product_list(request):
     brand_id = request.GET.get('brand', '').strip()
     
     if search_title:
-        products = products.filter(title__icontains=search_title)
+        products = search.by_title(products, search_title)
     
     if search_serie:
-        products = products.filter(
-            Q(barcode__icontains=search_serie) | 
-            Q(sku__icontains=search_serie)
-        )
+        products = search.by_code(products, search_serie)
     
     if category_id:
         products = products.filter(category_id=category_id)
@@ -125,14 +122,14 @@ def product_delete(request, pk):
 @require_http_methods(["GET"])
 def check_barcode_api(request, barcode):
     """API para verificar se código de barras já existe"""
-    try:
-        product = Product.objects.get(barcode=barcode)
-        return JsonResponse({
-            'exists': True,
-            'product_id': product.id,
-            'product_name': product.title,
-            'edit_url': reverse('products:product_update', args=[product.id]),
-            'detail_url': reverse('products:product_detail', args=[product.id])
-        })
-    except Product.DoesNotExist:
-        return JsonResponse({'exists': False})
\ No newline at end of file
+    product = barcodes.lookup(barcode)
+    if not product or product['barcode'] != barcode:
+        return JsonResponse({'exists': False})
+
+    return JsonResponse({
+        'exists': True,
+        'product_id': product['id'],
+        'product_name': product['title'],
+        'edit_url': reverse('products:product_update', args=[product['id']]),
+        'detail_url': reverse('products:product_detail', args=[product['id']])
+    })
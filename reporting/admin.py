@@ -1,3 +1,47 @@
 from django.contrib import admin
+from . import models
 
-# Register your models here.
+
+@admin.register(models.DailySalesSummary)
+class DailySalesSummaryAdmin(admin.ModelAdmin):
+    list_display = ('date', 'sales_count', 'revenue', 'discount', 'outflow_count', 'quantity', 'outflow_value', 'updated_at')
+    date_hierarchy = 'date'
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(models.InventoryValuation)
+class InventoryValuationAdmin(admin.ModelAdmin):
+    list_display = ('category', 'brand', 'is_active', 'product_count', 'quantity', 'cost_value', 'selling_value', 'updated_at')
+    list_filter = ('is_active', 'category', 'brand')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(models.ProductDailySales)
+class ProductDailySalesAdmin(admin.ModelAdmin):
+    list_display = ('date', 'product', 'units', 'revenue', 'cost', 'sale_count', 'updated_at')
+    date_hierarchy = 'date'
+    list_select_related = ('product',)
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(models.CustomerStats)
+class CustomerStatsAdmin(admin.ModelAdmin):
+    list_display = ('customer', 'frequency', 'monetary', 'last_purchase', 'recency_score', 'frequency_score', 'monetary_score', 'segment')
+    list_filter = ('segment',)
+    list_select_related = ('customer',)
+    readonly_fields = ('updated_at', 'scored_at')
+
+
+@admin.register(models.ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'report', 'file_format', 'status', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'report', 'file_format')
+    readonly_fields = ('dedup_key', 'created_at', 'started_at', 'finished_at')
+
+
+@admin.register(models.ReportSnapshot)
+class ReportSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('report', 'period', 'start_date', 'end_date', 'computed_at')
+    list_filter = ('report', 'period')
+    exclude = ('data',)
+    readonly_fields = ('report', 'period', 'start_date', 'end_date', 'computed_at')
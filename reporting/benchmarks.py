@@ -0,0 +1,156 @@
+"""Massa de dados sintética usada pelos comandos de benchmark."""
+import time
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from brands.models import Brand
+from categories.models import Category
+from colors.models import Color
+from customers.models import Customer
+from inflows.models import Inflow
+from outflows.models import Outflow
+from products.models import Product
+from products.normalize import normalize
+from sales.models import Sale, SaleItem
+from sizes.models import Size
+from suppliers.models import Supplier
+from . import rfm, rollups
+
+
+BATCH_SIZE = 1000
+
+
+def seed_products(count, prefix='bench'):
+    """Cria `count` produtos com categoria, marca, tamanho e cor fixos"""
+    category, _ = Category.objects.get_or_create(name=f'{prefix}-categoria')
+    brand, _ = Brand.objects.get_or_create(name=f'{prefix}-marca')
+    size, _ = Size.objects.get_or_create(name=prefix[:10])
+    color, _ = Color.objects.get_or_create(name=f'{prefix}-cor')
+
+    products = [
+        Product(
+            title=f'{prefix} produto {i}',
+            search_title=normalize(f'{prefix} produto {i}'),
+            category=category,
+            brand=brand,
+            size=size,
+            color=color,
+            cost_price=Decimal('10.00') + i % 50,
+            selling_price=Decimal('20.00') + i % 50,
+            quantity=100 + i % 10,
+        )
+        for i in range(count)
+    ]
+    products = Product.objects.bulk_create(products, batch_size=BATCH_SIZE)
+    # bulk_create não dispara signals: os resumos são recalculados por completo
+    rollups.rebuild_inventory_valuation()
+    return products
+
+
+CATALOG_WORDS = [
+    ['Camisa', 'Camiseta', 'Calça', 'Bermuda', 'Vestido', 'Saia', 'Jaqueta', 'Blusa', 'Moletom', 'Short'],
+    ['Polo', 'Básica', 'Estampada', 'Listrada', 'Slim', 'Oversized', 'Cropped', 'Jeans', 'Social', 'Esportiva'],
+    ['Algodão', 'Linho', 'Malha', 'Viscose', 'Poliéster', 'Sarja', 'Couro', 'Tricô', 'Seda', 'Dry-fit'],
+]
+
+
+def seed_catalog(count, prefix='catalogo'):
+    """Cria `count` produtos com títulos variados, código de barras e SKU"""
+    category, _ = Category.objects.get_or_create(name=f'{prefix}-categoria')
+    brand, _ = Brand.objects.get_or_create(name=f'{prefix}-marca')
+    size, _ = Size.objects.get_or_create(name=prefix[:10])
+    color, _ = Color.objects.get_or_create(name=f'{prefix}-cor')
+
+    products = []
+    for i in range(count):
+        kind, style, fabric = (words[i // 10 ** position % 10] for position, words in enumerate(CATALOG_WORDS))
+        title = f'{kind} {style} {fabric} {i}'
+        products.append(Product(
+            title=title,
+            search_title=normalize(title),
+            barcode=f'789{i:010d}',
+            sku=f'{prefix[:3].upper()}-{i}',
+            category=category,
+            brand=brand,
+            size=size,
+            color=color,
+            cost_price=Decimal('10.00') + i % 50,
+            selling_price=Decimal('20.00') + i % 50,
+            quantity=i % 20,
+        ))
+    return Product.objects.bulk_create(products, batch_size=BATCH_SIZE)
+
+
+def seed_outflows(count, products):
+    """Cria `count` saídas distribuídas entre os produtos informados"""
+    outflows = [
+        Outflow(
+            product=products[i % len(products)],
+            quantity=1 + i % 3,
+            unit_price=products[i % len(products)].selling_price,
+        )
+        for i in range(count)
+    ]
+    outflows = Outflow.objects.bulk_create(outflows, batch_size=BATCH_SIZE)
+    rollups.rebuild_daily_sales()
+    return outflows
+
+
+def seed_customers(count, prefix='bench'):
+    """Cria `count` clientes"""
+    customers = [
+        Customer(name=f'{prefix} cliente {i}', email=f'{prefix}{i}@example.com', phone=f'11{i:09d}')
+        for i in range(count)
+    ]
+    return Customer.objects.bulk_create(customers, batch_size=BATCH_SIZE)
+
+
+def seed_sales(count, products, customers, seller):
+    """Cria `count` vendas de um item cada, com os resumos e as estatísticas de clientes"""
+    sales = Sale.objects.bulk_create([
+        Sale(
+            customer=customers[i % len(customers)] if customers and i % 3 else None,
+            seller=seller,
+            total_amount=Decimal('20.00') + i % 50,
+            final_amount=Decimal('20.00') + i % 50,
+            payment_method=[code for code, _ in Sale.PAYMENT_METHODS][i % len(Sale.PAYMENT_METHODS)],
+        )
+        for i in range(count)
+    ], batch_size=BATCH_SIZE)
+    SaleItem.objects.bulk_create([
+        SaleItem(
+            sale=sale,
+            product=products[i % len(products)],
+            quantity=1,
+            unit_price=sale.total_amount,
+            total_price=sale.total_amount,
+        )
+        for i, sale in enumerate(sales)
+    ], batch_size=BATCH_SIZE)
+
+    rollups.rebuild_daily_sales()
+    rollups.rebuild_product_daily_sales()
+    rfm.rebuild_customer_stats()
+    rfm.rescore_customers()
+    return sales
+
+
+def seed_inflows(count, products, prefix='bench'):
+    """Cria `count` entradas de um fornecedor fixo"""
+    supplier, _ = Supplier.objects.get_or_create(name=f'{prefix}-fornecedor')
+    inflows = [
+        Inflow(supplier=supplier, product=products[i % len(products)], quantity=1 + i % 5)
+        for i in range(count)
+    ]
+    return Inflow.objects.bulk_create(inflows, batch_size=BATCH_SIZE)
+
+
+def measure(func, *args, **kwargs):
+    """Executa `func` e retorna (resultado, nº de queries, tempo em ms)"""
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+    return result, len(queries), elapsed
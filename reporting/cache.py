@@ -0,0 +1,151 @@
+"""
+Cache versionado das métricas do dashboard.
+
+Cada grupo de dados ("products", "sales") tem um contador de versão que é
+incrementado pelos signals de escrita (ver `reporting.signals`). Uma entrada
+do cache guarda a versão com que foi calculada; quando a versão muda ela
+passa a ser considerada velha.
+
+Entradas velhas continuam sendo servidas enquanto um único processo
+recalcula o valor (stale-while-revalidate), evitando que vários caixas
+recarregando o dashboard disparem o mesmo cálculo ao mesmo tempo. Por isso
+ETags e Last-Modified devem vir da entrada servida (`get_entry`), e não das
+versões atuais: um valor velho nunca sai com a ETag da versão nova.
+
+As versões ficam no cache `default`. Com um cache local a cada processo
+(LocMemCache, o padrão) uma versão incrementada por um comando de
+gerenciamento (`rescore_customers`, `rebuild_rollups`...) não chega aos
+servidores em execução: eles só recalculam quando a entrada passa de
+FRESH_FOR. Para a invalidação valer na hora, use um cache compartilhado
+(Redis, Memcached ou DatabaseCache).
+"""
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+VERSION_KEY = 'metrics:version:{}'
+MODIFIED_KEY = 'metrics:modified:{}'
+ENTRY_KEY = 'metrics:entry:{}'
+LOCK_KEY = 'metrics:lock:{}'
+
+# Intervalo entre consultas ao cache enquanto outro processo recalcula
+WAIT_INTERVAL = 0.05
+
+
+def _setting(name, default):
+    return getattr(settings, 'METRICS_CACHE', {}).get(name, default)
+
+
+def get_version(namespace):
+    """Versão atual dos dados de `namespace`"""
+    key = VERSION_KEY.format(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Começa em um valor baseado no relógio para não repetir versões após
+        # uma limpeza do cache
+        cache.add(key, time.time_ns(), timeout=None)
+        cache.add(MODIFIED_KEY.format(namespace), time.time(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """Invalida todas as entradas que dependem de `namespace`"""
+    key = VERSION_KEY.format(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+    cache.set(MODIFIED_KEY.format(namespace), time.time(), timeout=None)
+
+
+def is_process_local():
+    """True se as versões ficam só neste processo (não invalidam os servidores)"""
+    return isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+PROCESS_LOCAL_WARNING = (
+    'O cache de métricas é local a cada processo: os servidores em execução só '
+    'mostram estes dados quando suas entradas passarem de FRESH_FOR.'
+)
+
+
+def get_last_modified(namespace):
+    """Momento (timestamp) da última alteração em `namespace`"""
+    get_version(namespace)
+    return cache.get(MODIFIED_KEY.format(namespace)) or time.time()
+
+
+def get_versions(namespaces):
+    return '.'.join(str(get_version(namespace)) for namespace in namespaces)
+
+
+def _last_modified(namespaces):
+    return max((get_last_modified(namespace) for namespace in namespaces), default=0)
+
+
+def get_entry(name, namespaces, compute, fresh_for=None):
+    """
+    Entrada servida para `name`: {'data', 'version', 'modified', 'computed_at'}.
+    `version` e `modified` são os dos dados retornados, mesmo quando uma
+    entrada velha é servida enquanto outro processo recalcula.
+    """
+    if fresh_for is None:
+        fresh_for = _setting('FRESH_FOR', 300)
+    lock_timeout = _setting('LOCK_TIMEOUT', 30)
+    entry_key = ENTRY_KEY.format(name)
+    lock_key = LOCK_KEY.format(name)
+
+    # Lido antes da versão: nunca é mais novo que os dados calculados com ela
+    modified = _last_modified(namespaces)
+    version = get_versions(namespaces)
+    entry = cache.get(entry_key)
+    if entry and entry['version'] == version and time.time() - entry['computed_at'] < fresh_for:
+        return entry
+
+    def computed():
+        return dict(version=version, modified=modified, computed_at=time.time(), data=compute())
+
+    if cache.add(lock_key, True, timeout=lock_timeout):
+        try:
+            entry = computed()
+            cache.set(entry_key, entry, timeout=_setting('MAX_STALE', 24 * 60 * 60))
+            return entry
+        finally:
+            cache.delete(lock_key)
+
+    # Outro processo já está recalculando: serve o valor antigo
+    if entry:
+        return entry
+
+    # Primeiro cálculo em andamento: espera por ele em vez de repeti-lo
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(entry_key)
+        if entry:
+            return entry
+
+    return computed()
+
+
+def get_or_compute(name, namespaces, compute, fresh_for=None):
+    """Retorna o valor de `name` do cache, recalculando com `compute` se preciso"""
+    return get_entry(name, namespaces, compute, fresh_for)['data']
+
+
+def cached_metric(name, depends_on):
+    """Decorator que guarda o resultado da função no cache versionado"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper():
+            return get_or_compute(name, depends_on, func)
+        wrapper.uncached = func
+        wrapper.entry = lambda: get_entry(name, depends_on, func)
+        return wrapper
+    return decorator
@@ -0,0 +1,56 @@
+"""
+Distribuição do catálogo por categoria, marca, tamanho e cor.
+
+Cada dimensão é respondida por uma única query agrupada (incluindo valores
+sem produtos) e fica no cache versionado pelo grupo "products".
+"""
+from django.db.models import Count, DecimalField, F, Sum
+from brands.models import Brand
+from categories.models import Category
+from colors.models import Color
+from sizes.models import Size
+from . import cache
+
+
+DIMENSIONS = {
+    'category': Category,
+    'brand': Brand,
+    'size': Size,
+    'color': Color,
+}
+
+MONEY_FIELD = DecimalField(max_digits=16, decimal_places=2)
+
+
+def _compute(dimension):
+    model = DIMENSIONS[dimension]
+    rows = model.objects.annotate(
+        product_count=Count('products'),
+        units=Sum('products__quantity'),
+        cost_value=Sum(F('products__quantity') * F('products__cost_price'), output_field=MONEY_FIELD),
+        selling_value=Sum(F('products__quantity') * F('products__selling_price'), output_field=MONEY_FIELD),
+    ).values('id', 'name', 'product_count', 'units', 'cost_value', 'selling_value')
+
+    return [
+        dict(
+            id=row['id'],
+            name=row['name'],
+            product_count=row['product_count'],
+            quantity=row['units'] or 0,
+            cost_value=float(row['cost_value'] or 0),
+            selling_value=float(row['selling_value'] or 0),
+        )
+        for row in rows
+    ]
+
+
+def get_distribution_entry(dimension):
+    """Entrada do cache com as linhas da dimensão e a versão delas (para a ETag)"""
+    if dimension not in DIMENSIONS:
+        raise ValueError(f'Dimensão inválida: {dimension}')
+    return cache.get_entry(f'distribution:{dimension}', ['products'], lambda: _compute(dimension))
+
+
+def get_distribution(dimension):
+    """Linhas {id, name, product_count, quantity, cost_value, selling_value} da dimensão"""
+    return get_distribution_entry(dimension)['data']
@@ -0,0 +1,520 @@
+"""
+Motor de consultas dos relatórios.
+
+Interpreta o período uma única vez (`Period`) e calcula cada relatório com o
+menor número possível de queries, usando os resumos diários e agregação
+condicional. Os resultados são dados simples (dicts/listas) guardados no
+cache versionado por (relatório, período, filtros, versão dos dados).
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models import CharField, Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from brands.models import Brand
+from categories.models import Category
+from colors.models import Color
+from customers.models import Customer
+from products.models import Product
+from sales.models import Sale
+from sizes.models import Size
+from . import cache, precompute, rollups
+from .models import CustomerStats
+
+
+PRESETS = {
+    '7': 7,
+    '30': 30,
+    '90': 90,
+}
+DEFAULT_PERIOD = '30'
+CUSTOM_PERIOD = 'custom'
+
+TOP_LIMIT = 20
+
+# Dimensões do produto com vendas agrupadas no relatório de produtos
+BREAKDOWNS = {
+    'category': 'Categoria',
+    'brand': 'Marca',
+    'size': 'Tamanho',
+    'color': 'Cor',
+}
+
+BREAKDOWN_MODELS = {
+    'category': Category,
+    'brand': Brand,
+    'size': Size,
+    'color': Color,
+}
+
+
+class Period:
+    """Intervalo de datas (inclusive) analisado por um relatório"""
+
+    def __init__(self, key, start_date, end_date):
+        self.key = key
+        self.start_date = start_date
+        self.end_date = end_date
+
+    @classmethod
+    def preset(cls, key):
+        end_date = timezone.now().date()
+        return cls(key, end_date - timedelta(days=PRESETS[key]), end_date)
+
+    @classmethod
+    def from_request(cls, request):
+        return cls.from_params(request.GET)
+
+    @classmethod
+    def from_params(cls, params):
+        """Lê `period` (7, 30, 90 ou custom) e, para custom, `start`/`end` (AAAA-MM-DD)"""
+        key = params.get('period', DEFAULT_PERIOD)
+
+        if key == CUSTOM_PERIOD:
+            try:
+                start_date = date.fromisoformat(params.get('start', ''))
+                end_date = date.fromisoformat(params.get('end', ''))
+            except ValueError:
+                return cls.preset(DEFAULT_PERIOD)
+            if start_date > end_date:
+                start_date, end_date = end_date, start_date
+            return cls(key, start_date, end_date)
+
+        if key not in PRESETS:
+            # Mantém o valor recebido no contexto, como os relatórios já faziam
+            period = cls.preset(DEFAULT_PERIOD)
+            period.key = key
+            return period
+
+        return cls.preset(key)
+
+    @property
+    def start(self):
+        return datetime.combine(self.start_date, time.min)
+
+    @property
+    def end(self):
+        """Início do dia seguinte ao fim do período (limite aberto)"""
+        return datetime.combine(self.end_date + timedelta(days=1), time.min)
+
+    def range_filter(self, field):
+        """
+        Filtro `start <= field < end` sobre o datetime, sem converter a coluna
+        para data, para que o banco possa usar o índice de `field`.
+        """
+        return {f'{field}__gte': self.start, f'{field}__lt': self.end}
+
+    @property
+    def days(self):
+        return (self.end_date - self.start_date).days + 1
+
+    def context(self):
+        return {
+            'period': self.key,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+        }
+
+
+def _cached_entry(report, period, namespaces, compute, fresh_for=None, **filters):
+    name = f'report:{report}:{period.start_date}:{period.end_date}'
+    if filters:
+        name += ':' + urlencode(sorted(filters.items()))
+    return cache.get_entry(name, namespaces, compute, fresh_for)
+
+
+def _cached(report, period, namespaces, compute, fresh_for=None, **filters):
+    return _cached_entry(report, period, namespaces, compute, fresh_for, **filters)['data']
+
+
+def _scalar(queryset, aggregate):
+    """Subconsulta que devolve um único valor agregado de `queryset`"""
+    # Agrupar por uma constante não gera GROUP BY: sempre há uma linha, mesmo sem dados
+    return queryset.order_by().annotate(
+        _all=Value(1),
+    ).values('_all').annotate(value=aggregate).values('value')
+
+
+def _select_scalars(**subqueries):
+    """Executa várias subconsultas de um valor em uma única ida ao banco"""
+    selects = []
+    params = []
+    for subquery in subqueries.values():
+        sql, subquery_params = subquery.query.sql_with_params()
+        selects.append(f'({sql})')
+        params.extend(subquery_params)
+
+    database = next(iter(subqueries.values())).db
+    with connections[database].cursor() as cursor:
+        cursor.execute('SELECT ' + ', '.join(selects), params)
+        row = cursor.fetchone()
+    return dict(zip(subqueries, row))
+
+
+def _sales_in(period):
+    return Sale.objects.filter(**period.range_filter('created_at'))
+
+
+SUMMARY_FIELDS = ['sales_count', 'revenue', 'discount'] + [
+    f'{method}_{field}' for method in rollups.PAYMENT_METHODS for field in ('count', 'revenue')
+]
+
+SELLER_FIELDS = ['seller__username', 'seller__first_name', 'seller__last_name']
+
+PRODUCT_FIELDS = ['product__title', 'product__size__name', 'product__color__name', 'product__brand__name']
+
+PRODUCT_TOTALS = ['total_quantity', 'total_revenue', 'total_cost', 'sales_count']
+
+
+def _sales_partial(start_date, end_date):
+    """
+    Somas do relatório de vendas entre as datas, por dia e por id do vendedor
+    (2 queries); os nomes são lidos ao montar o relatório
+    """
+    days = {
+        str(summary.date): {field: getattr(summary, field) for field in SUMMARY_FIELDS}
+        for summary in rollups.daily_summaries_in(start_date, end_date)
+    }
+    sellers = Sale.objects.filter(
+        **Period(CUSTOM_PERIOD, start_date, end_date).range_filter('created_at'),
+    ).order_by().values('seller').annotate(
+        count=Count('id'),
+        revenue=Sum('final_amount'),
+    )
+    return dict(
+        days=days,
+        sellers={str(row['seller']): dict(count=row['count'], revenue=row['revenue']) for row in sellers},
+    )
+
+
+def _sales_result(partial):
+    """Relatório de vendas a partir das somas do período (1 query, para os nomes dos vendedores)"""
+    days = sorted(partial['days'].items())
+
+    daily_sales = {
+        date.fromisoformat(day): {
+            'count': summary['sales_count'],
+            'revenue': summary['revenue'],
+            'average_ticket': summary['revenue'] / summary['sales_count'],
+        }
+        for day, summary in days
+        if summary['sales_count'] > 0
+    }
+
+    payment_stats = []
+    for method in rollups.PAYMENT_METHODS:
+        count = sum(summary[f'{method}_count'] for _, summary in days)
+        if count > 0:
+            payment_stats.append({
+                'payment_method': method,
+                'count': count,
+                'revenue': sum(summary[f'{method}_revenue'] for _, summary in days),
+            })
+    payment_stats.sort(key=lambda payment: -payment['count'])
+
+    names = {
+        str(seller['id']): seller
+        for seller in User.objects.filter(pk__in=partial['sellers']).values('id', 'username', 'first_name', 'last_name')
+    } if partial['sellers'] else {}
+    seller_stats = sorted(
+        (
+            dict({field: names.get(seller_id, {}).get(field.removeprefix('seller__')) for field in SELLER_FIELDS}, **totals)
+            for seller_id, totals in partial['sellers'].items()
+        ),
+        key=lambda seller: -seller['revenue'],
+    )
+
+    total_sales = sum(summary['sales_count'] for _, summary in days)
+    total_revenue = sum(summary['revenue'] for _, summary in days)
+    return dict(
+        total_sales=total_sales,
+        total_revenue=total_revenue,
+        total_discount=sum(summary['discount'] for _, summary in days),
+        average_ticket=total_revenue / total_sales if total_sales > 0 else 0,
+        daily_sales=daily_sales,
+        payment_stats=payment_stats,
+        seller_stats=seller_stats,
+    )
+
+
+def _partial(report, period):
+    """
+    Somas do período: para os períodos padrão, a parte fechada pré-calculada
+    mais o dia de hoje; senão o período inteiro
+    """
+    partial_for = PARTIALS[report]
+    if period.key in PRESETS:
+        today = period.end_date
+        closed = precompute.load(report, period.key, PRESETS[period.key], today)
+        if closed is not None:
+            return precompute.add(closed, partial_for(today, today))
+    return partial_for(period.start_date, period.end_date)
+
+
+def sales_report(period):
+    """
+    Totais, série diária e vendas por forma de pagamento e vendedor
+    (3 queries, ou 4 com a parte pré-calculada)
+    """
+    return _cached('sales', period, ['sales'], lambda: _sales_result(_partial('sales', period)))
+
+
+def product_sales(period, *dimensions):
+    """
+    Vendas do período agrupadas por `dimensions` (campos do produto), lidas do
+    cubo de vendas diárias por produto
+    """
+    return _product_sales(period.start_date, period.end_date, *dimensions)
+
+
+def _product_sales(start_date, end_date, *dimensions):
+    return rollups.product_daily_sales(start_date, end_date).values(
+        *dimensions,
+    ).annotate(
+        total_quantity=Sum('units'),
+        total_revenue=Sum('revenue'),
+        total_cost=Sum('cost'),
+        sales_count=Sum('sale_count'),
+    ).filter(
+        # Células zeradas (itens excluídos) não são vendas
+        total_quantity__gt=0,
+    ).order_by('-total_quantity')
+
+
+def _products_partial(start_date, end_date):
+    """
+    Somas do relatório de produtos entre as datas, por id do produto e de cada
+    dimensão (5 queries); os nomes são lidos ao montar o relatório
+    """
+    def grouped(field):
+        return {
+            str(row[field]): {total: row[total] for total in PRODUCT_TOTALS}
+            for row in _product_sales(start_date, end_date, field)
+        }
+
+    partial = dict(products=grouped('product'))
+    for dimension in BREAKDOWNS:
+        partial[dimension] = grouped(f'product__{dimension}')
+    return partial
+
+
+def _ranked(rows, field):
+    return sorted(
+        (dict({field: key}, **totals) for key, totals in rows.items()),
+        key=lambda row: -row['total_quantity'],
+    )
+
+
+def _product_names(product_ids):
+    """Campos de PRODUCT_FIELDS dos produtos informados (1 query)"""
+    fields = [field.removeprefix('product__') for field in PRODUCT_FIELDS]
+    return {
+        str(row['id']): {f'product__{field}': row[field] for field in fields}
+        for row in Product.objects.filter(pk__in=product_ids).values('id', *fields)
+    }
+
+
+def _dimension_names(partial):
+    """Nomes das categorias, marcas, tamanhos e cores do relatório (1 query)"""
+    queries = [
+        model.objects.filter(pk__in=partial[dimension]).annotate(
+            dimension=Value(dimension, output_field=CharField()),
+        ).order_by().values_list('dimension', 'id', 'name')
+        for dimension, model in BREAKDOWN_MODELS.items()
+        if partial[dimension]
+    ]
+    names = {dimension: {} for dimension in BREAKDOWNS}
+    if queries:
+        for dimension, pk, name in queries[0].union(*queries[1:], all=True):
+            names[dimension][str(pk)] = name
+    return names
+
+
+def products_report(period):
+    """
+    Produtos mais vendidos, vendas por dimensão e situação do estoque
+    (9 queries, ou 10 com a parte pré-calculada)
+    """
+    def compute():
+        partial = _partial('products', period)
+        top_products = _ranked(partial['products'], 'product')[:TOP_LIMIT]
+        products = _product_names([row['product'] for row in top_products])
+        top_products = [dict(row, **products.get(row['product'], {})) for row in top_products]
+
+        names = _dimension_names(partial)
+        breakdowns = []
+        for dimension, label in BREAKDOWNS.items():
+            breakdowns.append(dict(
+                dimension=dimension,
+                label=label,
+                rows=[
+                    dict(row, name=names[dimension].get(row[dimension]))
+                    for row in _ranked(partial[dimension], dimension)
+                ],
+            ))
+
+        active_products = Product.objects.filter(is_active=True)
+
+        low_stock_products = list(active_products.filter(
+            quantity__lte=F('min_stock'),
+        ).values(
+            'title',
+            'brand__name',
+            'size__name',
+            'color__name',
+            'quantity',
+            'min_stock',
+        )[:TOP_LIMIT])
+
+        out_of_stock_count = active_products.aggregate(
+            total=Count('id', filter=Q(quantity=0)),
+        )['total']
+
+        return dict(
+            top_products=top_products,
+            breakdowns=breakdowns,
+            low_stock_products=low_stock_products,
+            out_of_stock_count=out_of_stock_count,
+        )
+
+    return _cached('products', period, ['sales', 'products'], compute)
+
+
+# Relatórios por período montados a partir de somas por dia (ver reporting.precompute)
+PARTIALS = {
+    'sales': _sales_partial,
+    'products': _products_partial,
+}
+
+
+def stock_products(category=None, brand=None, low_stock_only=False):
+    """Produtos ativos do relatório de estoque, com os filtros da tela"""
+    products = Product.objects.filter(is_active=True).select_related(
+        'brand', 'category', 'size', 'color'
+    )
+    if category:
+        products = products.filter(category_id=category)
+    if brand:
+        products = products.filter(brand_id=brand)
+    if low_stock_only:
+        products = products.filter(quantity__lte=F('min_stock'))
+    return products.order_by('quantity', 'title', 'id')
+
+
+def stock_summary(category=None, brand=None, low_stock_only=False):
+    """Totais do relatório de estoque em uma única agregação condicional"""
+    def compute():
+        return stock_products(category, brand, low_stock_only).aggregate(
+            total_products=Count('id'),
+            total_value=Coalesce(
+                Sum(F('quantity') * F('cost_price'), output_field=rollups.MONEY_FIELD),
+                Value(0, output_field=rollups.MONEY_FIELD),
+            ),
+            low_stock_count=Count('id', filter=Q(quantity__lte=F('min_stock'))),
+            out_of_stock_count=Count('id', filter=Q(quantity=0)),
+        )
+
+    filters = dict(category=category or '', brand=brand or '', low_stock_only=low_stock_only or '')
+    name = 'report:stock:' + urlencode(sorted(filters.items()))
+    return cache.get_or_compute(name, ['products'], compute)
+
+
+def customers_report(period, segment=None):
+    """
+    Clientes que mais compraram no período (opcionalmente de um segmento RFM),
+    resumo dos segmentos e totais de clientes (4 queries)
+    """
+    def compute():
+        sales = _sales_in(period).exclude(customer=None)
+        if segment:
+            sales = sales.filter(customer__stats__segment=segment)
+
+        # Totais do período; notas e segmento vêm das estatísticas de todo o histórico
+        top_customers = list(sales.values(
+            'customer_id',
+            name=F('customer__name'),
+            email=F('customer__email'),
+            phone=F('customer__phone'),
+            segment=F('customer__stats__segment'),
+            recency_score=F('customer__stats__recency_score'),
+            frequency_score=F('customer__stats__frequency_score'),
+            monetary_score=F('customer__stats__monetary_score'),
+        ).annotate(
+            total_sales=Count('id'),
+            total_spent=Sum('final_amount'),
+            last_purchase=Max('created_at'),
+        ).order_by('-total_spent', 'customer_id')[:TOP_LIMIT])
+
+        segment_names = dict(CustomerStats.SEGMENTS)
+        for customer in top_customers:
+            customer['id'] = customer.pop('customer_id')
+            customer['segment_name'] = segment_names.get(customer['segment'])
+
+        segments = [
+            dict(row, name=segment_names[row['segment']])
+            for row in CustomerStats.objects.exclude(segment=None).values('segment').annotate(
+                customers=Count('customer_id'),
+                monetary=Sum('monetary'),
+            ).order_by('-monetary')
+        ]
+
+        totals = Customer.objects.aggregate(
+            total_customers=Count('id'),
+            new_customers=Count('id', filter=Q(**period.range_filter('created_at'))),
+        )
+        active_customers = _sales_in(period).exclude(customer=None).aggregate(
+            total=Count('customer', distinct=True),
+        )['total']
+
+        return dict(
+            top_customers=top_customers,
+            segments=segments,
+            active_customers=active_customers,
+            **totals,
+        )
+
+    filters = dict(segment=segment) if segment else {}
+    return _cached('customers', period, ['sales', 'customers'], compute, **filters)
+
+
+DASHBOARD_NAMESPACES = ['sales', 'products', 'customers']
+
+# Segundos em que os indicadores do dashboard são servidos do cache sem recálculo
+DASHBOARD_FRESH_FOR = 30
+
+
+def dashboard_stats_entry(period):
+    """Indicadores rápidos do dashboard de relatórios (1 query), com a versão do cache"""
+    def compute():
+        summaries = rollups.daily_summaries_in(period.start_date, period.end_date)
+        stats = _select_scalars(
+            total_sales=_scalar(summaries, Sum('sales_count')),
+            total_revenue=_scalar(summaries, Sum('revenue')),
+            low_stock=_scalar(
+                Product.objects.filter(is_active=True, quantity__lte=F('min_stock')),
+                Count('id'),
+            ),
+            total_customers=_scalar(Customer.objects.all(), Count('id')),
+        )
+        return dict(
+            total_sales=stats['total_sales'] or 0,
+            total_revenue=Decimal(str(stats['total_revenue'] or 0)).quantize(Decimal('0.01')),
+            low_stock=stats['low_stock'],
+            total_customers=stats['total_customers'],
+        )
+
+    return _cached_entry('dashboard', period, DASHBOARD_NAMESPACES, compute, DASHBOARD_FRESH_FOR)
+
+
+def dashboard_stats(period):
+    return dashboard_stats_entry(period)['data']
+
+
+def dashboard_stats_etag(period, entry):
+    """ETag dos indicadores: muda com o período ou com a versão dos dados servidos"""
+    return f'dashboard-{period.start_date}-{period.end_date}-{entry["version"]}'
@@ -0,0 +1,262 @@
+"""
+Exportação dos relatórios em CSV e XLSX.
+
+As linhas são lidas do banco em blocos (`iterator(chunk_size)` sobre
+`values_list`) e escritas conforme chegam, então a memória usada não depende
+do tamanho do relatório e o primeiro byte sai antes do fim da consulta.
+"""
+import csv
+import io
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.db.models import F
+
+from customers.models import Customer
+from . import engine
+
+
+CHUNK_SIZE = 2000
+
+# Linhas agrupadas por pedaço enviado ao cliente
+ROWS_PER_WRITE = 500
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class Export:
+    """Cabeçalho e linhas (tuplas) de um relatório exportado"""
+
+    def __init__(self, name, header, rows):
+        self.name = name
+        self.header = header
+        self.rows = rows
+
+    def filename(self, file_format):
+        return f'{self.name}.{file_format}'
+
+    def stream(self, file_format):
+        if file_format == 'xlsx':
+            return stream_xlsx(self.header, self.rows)
+        return stream_csv(self.header, self.rows)
+
+
+def _iterate(queryset, *fields):
+    return queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def stock_export(params):
+    products = engine.stock_products(
+        category=params.get('category'),
+        brand=params.get('brand'),
+        low_stock_only=params.get('low_stock_only'),
+    ).annotate(
+        stock_value=F('quantity') * F('cost_price'),
+    )
+    return Export(
+        'estoque',
+        ['Produto', 'Marca', 'Categoria', 'Tamanho', 'Cor', 'Código de Barras',
+         'Quantidade', 'Estoque Mínimo', 'Preço de Custo', 'Preço de Venda', 'Valor em Estoque'],
+        _iterate(
+            products,
+            'title', 'brand__name', 'category__name', 'size__name', 'color__name', 'barcode',
+            'quantity', 'min_stock', 'cost_price', 'selling_price', 'stock_value',
+        ),
+    )
+
+
+def sales_export(params):
+    period = engine.Period.from_params(params)
+    sales = engine._sales_in(period).order_by('created_at', 'id')
+    return Export(
+        f'vendas_{period.start_date}_{period.end_date}',
+        ['Venda', 'Data', 'Cliente', 'Vendedor', 'Forma de Pagamento',
+         'Parcelas', 'Valor Total', 'Desconto', 'Valor Final'],
+        _iterate(
+            sales,
+            'id', 'created_at', 'customer__name', 'seller__username', 'payment_method',
+            'installments', 'total_amount', 'discount', 'final_amount',
+        ),
+    )
+
+
+def products_export(params):
+    period = engine.Period.from_params(params)
+    items = engine.product_sales(
+        period,
+        'product__title',
+        'product__brand__name',
+        'product__size__name',
+        'product__color__name',
+    )
+    return Export(
+        f'produtos_vendidos_{period.start_date}_{period.end_date}',
+        ['Produto', 'Marca', 'Tamanho', 'Cor', 'Quantidade Vendida', 'Receita', 'Custo', 'Vendas'],
+        _iterate(
+            items,
+            'product__title', 'product__brand__name', 'product__size__name', 'product__color__name',
+            'total_quantity', 'total_revenue', 'total_cost', 'sales_count',
+        ),
+    )
+
+
+def customers_export(params):
+    customers = Customer.objects.order_by('name', 'id')
+    return Export(
+        'clientes',
+        ['Cliente', 'E-mail', 'Telefone', 'CPF', 'Ativo', 'Cadastro',
+         'Compras', 'Total Gasto', 'Última Compra', 'Segmento'],
+        _iterate(
+            customers,
+            'name', 'email', 'phone', 'cpf', 'is_active', 'created_at',
+            'stats__frequency', 'stats__monetary', 'stats__last_purchase', 'stats__segment',
+        ),
+    )
+
+
+EXPORTS = {
+    'stock': stock_export,
+    'sales': sales_export,
+    'products': products_export,
+    'customers': customers_export,
+}
+
+
+def _format(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Sim' if value else 'Não'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    """Pseudo-arquivo que devolve o que o csv.writer escreve"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(_Echo(), delimiter=';')
+    # BOM para o Excel reconhecer o UTF-8
+    yield '\ufeff' + writer.writerow(header)
+
+    lines = []
+    for row in rows:
+        lines.append(writer.writerow([_format(value) for value in row]))
+        if len(lines) >= ROWS_PER_WRITE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+class _ZipStream(io.RawIOBase):
+    """Destino não pesquisável do zipfile; os bytes são repassados ao cliente"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Relatório" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    value = _format(value)
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    # Caracteres de controle não são permitidos em XML
+    text = ''.join(char for char in str(value) if char >= ' ' or char in '\t\n')
+    return f'<c t="inlineStr"><is><t>{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>'
+
+
+def stream_xlsx(header, rows):
+    """
+    Planilha XLSX gerada em fluxo: o zip é escrito sem voltar atrás no arquivo
+    (tamanhos em data descriptors) e as células usam strings inline, sem a
+    tabela de strings compartilhadas que exigiria guardar tudo em memória.
+    """
+    output = _ZipStream()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in XLSX_PARTS.items():
+            workbook.writestr(name, content)
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetData>' + _xlsx_row(header)
+            ).encode())
+            yield output.pop()
+
+            lines = []
+            for row in rows:
+                lines.append(_xlsx_row(row))
+                if len(lines) >= ROWS_PER_WRITE:
+                    sheet.write(''.join(lines).encode())
+                    lines = []
+                    yield output.pop()
+            sheet.write((''.join(lines) + '</sheetData></worksheet>').encode())
+
+    yield output.pop()
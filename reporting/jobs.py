@@ -0,0 +1,239 @@
+"""
+Relatórios calculados em segundo plano (`ReportJob`).
+
+Um pedido vira um job pendente; o job é executado por um pool de threads do
+próprio processo web (REPORT_JOBS['IN_PROCESS']) e/ou pelo comando
+`run_report_jobs`. Quem executa primeiro "reserva" o job com um UPDATE
+condicional, então o mesmo job nunca roda duas vezes. O resultado fica em
+um arquivo JSON, CSV ou XLSX em MEDIA_ROOT/reports/.
+"""
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import engine, exports, rollups
+from .models import ReportJob
+
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros aceitos pelos relatórios; os demais são ignorados
+PARAMS = ['period', 'start', 'end', 'category', 'brand', 'low_stock_only', 'segment']
+
+
+def _stock_report(params):
+    filters = dict(
+        category=params.get('category'),
+        brand=params.get('brand'),
+        low_stock_only=params.get('low_stock_only'),
+    )
+    return dict(
+        summary=engine.stock_summary(**filters),
+        valuation=[
+            dict(category_id=category_id, brand_id=brand_id, is_active=is_active, **values)
+            for (category_id, brand_id, is_active), values in rollups.stored_inventory_valuation().items()
+        ],
+    )
+
+
+# Relatórios em JSON (mesmos dados das telas)
+REPORTS = {
+    'sales': lambda params: engine.sales_report(engine.Period.from_params(params)),
+    'products': lambda params: engine.products_report(engine.Period.from_params(params)),
+    'customers': lambda params: engine.customers_report(
+        engine.Period.from_params(params), params.get('segment') or None,
+    ),
+    'stock': _stock_report,
+}
+
+
+def _setting(name, default):
+    return getattr(settings, 'REPORT_JOBS', {}).get(name, default)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Pool de threads do processo, criado no primeiro job (não na importação)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_setting('WORKERS', 2),
+                thread_name_prefix='report-jobs',
+            )
+        return _executor
+
+
+def is_supported(report, file_format):
+    if file_format == 'json':
+        return report in REPORTS
+    return report in exports.EXPORTS and file_format in exports.FORMATS
+
+
+def clean_params(params):
+    return {name: params.get(name) for name in PARAMS if params.get(name)}
+
+
+def dedup_key(report, file_format, params, user=None):
+    """Identifica pedidos iguais do mesmo usuário, inclusive o período já resolvido em datas"""
+    period = engine.Period.from_params(params)
+    data = json.dumps(
+        [report, file_format, params, str(period.start_date), str(period.end_date), user.pk if user else None],
+        sort_keys=True,
+    )
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _active_job(key):
+    return ReportJob.objects.filter(dedup_key=key, status__in=ReportJob.ACTIVE_STATUSES).first()
+
+
+def enqueue(report, file_format, params, user=None):
+    """
+    Cria o job do pedido ou devolve o job ativo de um pedido igual.
+    Retorna (job, created).
+    """
+    if not is_supported(report, file_format):
+        raise ValueError(f'Relatório não suportado: {report} ({file_format})')
+
+    params = clean_params(params)
+    user = user if user and user.is_authenticated else None
+    key = dedup_key(report, file_format, params, user)
+
+    for _ in range(3):
+        job = _active_job(key)
+        if job:
+            return job, False
+        try:
+            with transaction.atomic():
+                job = ReportJob.objects.create(
+                    report=report,
+                    file_format=file_format,
+                    params=params,
+                    dedup_key=key,
+                    requested_by=user,
+                )
+        except IntegrityError:
+            # Um pedido igual foi criado ao mesmo tempo; tenta reaproveitá-lo
+            continue
+
+        if _setting('IN_PROCESS', True):
+            transaction.on_commit(lambda: _get_executor().submit(process_job, job.pk))
+        return job, True
+
+    raise RuntimeError('Não foi possível criar o job do relatório')
+
+
+def _claimable():
+    stale = timezone.now() - timedelta(seconds=_setting('STALE_AFTER', 60 * 60))
+    # Jobs "em execução" há muito tempo são de um worker que parou
+    return Q(status=ReportJob.PENDING) | Q(status=ReportJob.RUNNING, started_at__lt=stale)
+
+
+def claim(job_id):
+    """Reserva o job para este worker; False se outro já o reservou"""
+    return ReportJob.objects.filter(_claimable(), pk=job_id).update(
+        status=ReportJob.RUNNING,
+        started_at=timezone.now(),
+    ) == 1
+
+
+def pending_job_ids(limit):
+    return list(ReportJob.objects.filter(_claimable()).order_by('created_at').values_list('pk', flat=True)[:limit])
+
+
+def _jsonable(value):
+    """Converte chaves de dicionários (ex.: datas) em texto para o JSON"""
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def _write_result(job):
+    if job.file_format == 'json':
+        data = _jsonable(REPORTS[job.report](job.params))
+        content = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+        job.result.save(job.filename, ContentFile(content.encode()), save=False)
+        return
+
+    export = exports.EXPORTS[job.report](job.params)
+    with tempfile.TemporaryFile() as output:
+        for chunk in export.stream(job.file_format):
+            output.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        output.seek(0)
+        job.result.save(job.filename, File(output), save=False)
+
+
+def run_job(job):
+    try:
+        _write_result(job)
+    except Exception:
+        logger.exception('Erro ao executar o relatório em segundo plano #%s', job.pk)
+        job.status = ReportJob.FAILED
+        job.error = traceback.format_exc()
+    else:
+        job.status = ReportJob.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+
+
+def process_job(job_id):
+    """Executa o job se ainda estiver disponível (chamado pelas threads do pool)"""
+    try:
+        if claim(job_id):
+            run_job(ReportJob.objects.get(pk=job_id))
+    finally:
+        close_old_connections()
+
+
+def purge_jobs(days):
+    """Remove jobs finalizados há mais de `days` dias, com seus arquivos"""
+    cutoff = timezone.now() - timedelta(days=days)
+    jobs = ReportJob.objects.filter(status__in=[ReportJob.DONE, ReportJob.FAILED], finished_at__lt=cutoff)
+    count = 0
+    for job in jobs.iterator():
+        if job.result:
+            job.result.delete(save=False)
+        job.delete()
+        count += 1
+    return count
+
+
+def visible_to(user):
+    """Jobs que o usuário pode consultar: os próprios ou, para a equipe, todos"""
+    if user.is_staff:
+        return ReportJob.objects.all()
+    return ReportJob.objects.filter(requested_by=user)
+
+
+def as_dict(job):
+    return dict(
+        id=job.pk,
+        report=job.report,
+        format=job.file_format,
+        params=job.params,
+        status=job.status,
+        status_display=job.get_status_display(),
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        # O traceback completo fica no admin
+        error='Não foi possível gerar o relatório' if job.status == ReportJob.FAILED else None,
+    )
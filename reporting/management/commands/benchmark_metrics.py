@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from app import metrics
+from reporting import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Mede queries e tempo das métricas do dashboard para volumes crescentes de dados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            default=[100, 1000, 10000],
+            help='Quantidades de produtos a testar (as saídas são 5x o número de produtos)',
+        )
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            # Tudo é desfeito ao final, o banco não é alterado
+            with transaction.atomic():
+                products = benchmarks.seed_products(size)
+                benchmarks.seed_outflows(size * 5, products)
+
+                for name in ('get_product_metrics', 'get_sales_metrics'):
+                    _, queries, elapsed = benchmarks.measure(getattr(metrics, name).uncached)
+                    self.stdout.write(
+                        f'{name:<22} produtos={size:<8} queries={queries:<3} tempo={elapsed:.1f}ms'
+                    )
+
+                transaction.set_rollback(True)
+
+        self.stdout.write(
+            self.style.SUCCESS('BENCHMARK FINALIZADO!')
+        )
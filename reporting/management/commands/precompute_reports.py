@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reporting import engine, precompute
+
+
+class Command(BaseCommand):
+    help = 'Pré-calcula os relatórios de vendas e de produtos dos períodos padrão (executar pelo cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recalcula os períodos inteiros em vez de atualizar apenas os dias que mudaram',
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+
+        for report, partial_for in engine.PARTIALS.items():
+            for period_key, days in engine.PRESETS.items():
+                mode = precompute.precompute(report, period_key, days, partial_for, today, full=options['full'])
+                self.stdout.write(f'{report} ({days} dias): {mode}')
+
+        self.stdout.write(
+            self.style.SUCCESS('RELATÓRIOS PRÉ-CALCULADOS COM SUCESSO!')
+        )
@@ -0,0 +1,41 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from reporting import cache, rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as tabelas de resumo de relatórios a partir dos dados brutos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Recalcula apenas a partir desta data (AAAA-MM-DD)',
+        )
+
+    def handle(self, *args, **options):
+        start = None
+        if options['since']:
+            try:
+                start = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('Data inválida, use o formato AAAA-MM-DD')
+
+        days = rollups.rebuild_daily_sales(start)
+        self.stdout.write(f'Resumos diários de vendas: {days} dias')
+
+        cells = rollups.rebuild_product_daily_sales(start)
+        self.stdout.write(f'Vendas diárias por produto: {cells} linhas')
+
+        valuations = rollups.rebuild_inventory_valuation()
+        self.stdout.write(f'Valor do estoque: {valuations} linhas')
+
+        # Os relatórios em cache foram calculados com os resumos antigos
+        cache.bump_version('sales')
+        cache.bump_version('products')
+        if cache.is_process_local():
+            self.stderr.write(self.style.WARNING(cache.PROCESS_LOCAL_WARNING))
+
+        self.stdout.write(
+            self.style.SUCCESS('ROLLUPS RECALCULADOS COM SUCESSO!')
+        )
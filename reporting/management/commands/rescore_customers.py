@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from reporting import cache, rfm
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as notas RFM e os segmentos dos clientes (executar diariamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recalcula também os totais de compras de todos os clientes',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            customers = rfm.rebuild_customer_stats()
+            self.stdout.write(f'Totais recalculados: {customers} clientes')
+
+        scored = rfm.rescore_customers()
+        self.stdout.write(f'Clientes classificados: {scored}')
+
+        # As notas são gravadas em lote, sem signals
+        cache.bump_version('customers')
+        if cache.is_process_local():
+            self.stderr.write(self.style.WARNING(cache.PROCESS_LOCAL_WARNING))
+
+        self.stdout.write(
+            self.style.SUCCESS('CLIENTES CLASSIFICADOS COM SUCESSO!')
+        )
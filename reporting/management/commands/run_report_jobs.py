@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from reporting import jobs
+
+
+class Command(BaseCommand):
+    help = 'Executa os relatórios pedidos em segundo plano (ReportJob)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Threads de execução')
+        parser.add_argument('--interval', type=float, default=2.0, help='Segundos entre consultas à fila')
+        parser.add_argument('--once', action='store_true', help='Executa os jobs pendentes e termina')
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            help='Remove antes os jobs finalizados há mais de N dias (e seus arquivos)',
+        )
+
+    def handle(self, *args, **options):
+        if options['purge_days'] is not None:
+            purged = jobs.purge_jobs(options['purge_days'])
+            self.stdout.write(f'Jobs removidos: {purged}')
+
+        processed = 0
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='report-worker') as pool:
+            while True:
+                job_ids = jobs.pending_job_ids(options['workers'] * 2)
+                if job_ids:
+                    list(pool.map(jobs.process_job, job_ids))
+                    processed += len(job_ids)
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{processed} RELATÓRIOS PROCESSADOS COM SUCESSO!')
+        )
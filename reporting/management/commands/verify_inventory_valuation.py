@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from reporting import cache, rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o valor do estoque do zero e informa divergências com a tabela de resumo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Reconstrói a tabela de resumo quando houver divergência',
+        )
+
+    def handle(self, *args, **options):
+        expected = rollups.compute_inventory_valuation()
+        stored = rollups.stored_inventory_valuation()
+        empty = dict.fromkeys(rollups.VALUATION_FIELDS, 0)
+
+        drifts = 0
+        for key in sorted(set(expected) | set(stored), key=str):
+            expected_values = expected.get(key, empty)
+            stored_values = stored.get(key, empty)
+            for field in rollups.VALUATION_FIELDS:
+                if expected_values[field] != stored_values[field]:
+                    drifts += 1
+                    category_id, brand_id, is_active = key
+                    self.stdout.write(
+                        f'categoria={category_id} marca={brand_id} ativo={is_active} '
+                        f'{field}: esperado {expected_values[field]}, encontrado {stored_values[field]}'
+                    )
+
+        if not drifts:
+            self.stdout.write(self.style.SUCCESS('VALOR DO ESTOQUE CONSISTENTE!'))
+            return
+
+        self.stdout.write(self.style.WARNING(f'{drifts} divergência(s) encontrada(s)'))
+        if options['fix']:
+            rollups.rebuild_inventory_valuation()
+            cache.bump_version('products')
+            if cache.is_process_local():
+                self.stderr.write(self.style.WARNING(cache.PROCESS_LOCAL_WARNING))
+            self.stdout.write(self.style.SUCCESS('VALOR DO ESTOQUE RECONSTRUÍDO!'))
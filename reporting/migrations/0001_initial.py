@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Data')),
+                ('sales_count', models.IntegerField(default=0, verbose_name='Quantidade de Vendas')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Faturamento')),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Descontos')),
+                ('cash_count', models.IntegerField(default=0)),
+                ('cash_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('card_count', models.IntegerField(default=0)),
+                ('card_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pix_count', models.IntegerField(default=0)),
+                ('pix_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('installment_count', models.IntegerField(default=0)),
+                ('installment_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('outflow_count', models.IntegerField(default=0, verbose_name='Quantidade de Saídas')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Unidades Vendidas')),
+                ('outflow_value', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor das Saídas')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Vendas',
+                'verbose_name_plural': 'Resumos Diários de Vendas',
+                'ordering': ['date'],
+            },
+        ),
+    ]
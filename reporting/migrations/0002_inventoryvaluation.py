@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('brands', '0001_initial'),
+        ('categories', '0001_initial'),
+        ('reporting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryValuation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_active', models.BooleanField(verbose_name='Ativo')),
+                ('product_count', models.IntegerField(default=0, verbose_name='Produtos')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Unidades em Estoque')),
+                ('cost_value', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Custo do Estoque')),
+                ('selling_value', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Valor do Estoque')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('brand', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='brands.brand', verbose_name='Marca')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='categories.category', verbose_name='Categoria')),
+            ],
+            options={
+                'verbose_name': 'Valor do Estoque',
+                'verbose_name_plural': 'Valores do Estoque',
+                'unique_together': {('category', 'brand', 'is_active')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_stock_order_index'),
+        ('reporting', '0002_inventoryvaluation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('units', models.IntegerField(default=0, verbose_name='Unidades Vendidas')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Receita')),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Custo')),
+                ('sale_count', models.IntegerField(default=0, verbose_name='Vendas')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Venda Diária por Produto',
+                'verbose_name_plural': 'Vendas Diárias por Produto',
+                'unique_together': {('date', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_customers_created_at_idx'),
+        ('reporting', '0003_productdailysales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='customers.customer', verbose_name='Cliente')),
+                ('first_purchase', models.DateTimeField(blank=True, null=True, verbose_name='Primeira Compra')),
+                ('last_purchase', models.DateTimeField(blank=True, null=True, verbose_name='Última Compra')),
+                ('frequency', models.IntegerField(default=0, verbose_name='Compras')),
+                ('monetary', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total Gasto')),
+                ('recency_score', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Nota de Recência')),
+                ('frequency_score', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Nota de Frequência')),
+                ('monetary_score', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Nota de Valor')),
+                ('segment', models.CharField(blank=True, choices=[('champions', 'Campeões'), ('loyal', 'Fiéis'), ('promising', 'Promissores'), ('at_risk', 'Em Risco'), ('hibernating', 'Hibernando'), ('lost', 'Perdidos')], max_length=20, null=True, verbose_name='Segmento')),
+                ('scored_at', models.DateTimeField(blank=True, null=True, verbose_name='Classificado em')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estatística de Cliente',
+                'verbose_name_plural': 'Estatísticas de Clientes',
+                'indexes': [models.Index(fields=['-monetary'], name='customer_stats_monetary_idx'), models.Index(fields=['segment', '-monetary'], name='customer_stats_segment_idx')],
+            },
+        ),
+    ]
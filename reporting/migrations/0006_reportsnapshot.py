@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_stock_order_index'),
+        ('reporting', '0005_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report', models.CharField(max_length=30, verbose_name='Relatório')),
+                ('period', models.CharField(max_length=10, verbose_name='Período')),
+                ('start_date', models.DateField(verbose_name='Data Inicial')),
+                ('end_date', models.DateField(verbose_name='Data Final')),
+                ('data', models.BinaryField()),
+                ('computed_at', models.DateTimeField(verbose_name='Calculado em')),
+            ],
+            options={
+                'verbose_name': 'Relatório Pré-calculado',
+                'verbose_name_plural': 'Relatórios Pré-calculados',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='productdailysales',
+            index=models.Index(fields=['updated_at'], name='product_daily_updated_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reportsnapshot',
+            unique_together={('report', 'period')},
+        ),
+    ]
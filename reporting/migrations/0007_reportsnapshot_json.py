@@ -0,0 +1,28 @@
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+def delete_snapshots(apps, schema_editor):
+    # As partes gravadas com pickle não são convertidas: o próximo
+    # `precompute_reports` as recalcula; até lá os relatórios somam o período todo
+    apps.get_model('reporting', 'ReportSnapshot').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0006_reportsnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_snapshots, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='reportsnapshot',
+            name='data',
+        ),
+        migrations.AddField(
+            model_name='reportsnapshot',
+            name='data',
+            field=models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder),
+        ),
+    ]
@@ -1,3 +1,233 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from brands.models import Brand
+from categories.models import Category
+from customers.models import Customer
+from products.models import Product
 
-# Create your models here.
+
+class DailySalesSummary(models.Model):
+    """Totais diários de vendas e saídas, mantidos pelos signals de Sale e Outflow"""
+
+    date = models.DateField(unique=True, verbose_name='Data')
+
+    # Vendas (Sale)
+    sales_count = models.IntegerField(default=0, verbose_name='Quantidade de Vendas')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Faturamento')
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Descontos')
+
+    # Vendas por forma de pagamento
+    cash_count = models.IntegerField(default=0)
+    cash_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    card_count = models.IntegerField(default=0)
+    card_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pix_count = models.IntegerField(default=0)
+    pix_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    installment_count = models.IntegerField(default=0)
+    installment_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Saídas de estoque (Outflow)
+    outflow_count = models.IntegerField(default=0, verbose_name='Quantidade de Saídas')
+    quantity = models.IntegerField(default=0, verbose_name='Unidades Vendidas')
+    outflow_value = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Valor das Saídas')
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+        verbose_name = 'Resumo Diário de Vendas'
+        verbose_name_plural = 'Resumos Diários de Vendas'
+
+    def __str__(self):
+        return f"{self.date} - {self.sales_count} vendas"
+
+
+class InventoryValuation(models.Model):
+    """
+    Valor do estoque por categoria, marca e situação (ativo/inativo).
+
+    Os totais gerais, por categoria ou por marca são somas destas linhas. É
+    mantido pelos signals de Product com a diferença exata de cada alteração.
+    """
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+', verbose_name='Categoria')
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE, related_name='+', verbose_name='Marca')
+    is_active = models.BooleanField(verbose_name='Ativo')
+
+    product_count = models.IntegerField(default=0, verbose_name='Produtos')
+    quantity = models.IntegerField(default=0, verbose_name='Unidades em Estoque')
+    cost_value = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name='Custo do Estoque')
+    selling_value = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name='Valor do Estoque')
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Valor do Estoque'
+        verbose_name_plural = 'Valores do Estoque'
+        unique_together = ['category', 'brand', 'is_active']
+
+    def __str__(self):
+        return f"{self.category} / {self.brand} - {self.quantity} unidades"
+
+
+class ProductDailySales(models.Model):
+    """
+    Cubo de vendas por (dia, produto), mantido pelos signals de SaleItem.
+
+    Relatórios de qualquer intervalo e os agrupamentos por marca, categoria,
+    tamanho e cor somam estas linhas em vez de percorrer os itens de venda.
+    """
+
+    date = models.DateField(verbose_name='Data')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', verbose_name='Produto')
+
+    units = models.IntegerField(default=0, verbose_name='Unidades Vendidas')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Receita')
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Custo')
+    sale_count = models.IntegerField(default=0, verbose_name='Vendas')
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Venda Diária por Produto'
+        verbose_name_plural = 'Vendas Diárias por Produto'
+        unique_together = ['date', 'product']
+        indexes = [
+            # Dias já fechados alterados depois de um pré-cálculo (reporting.precompute)
+            models.Index(fields=['updated_at'], name='product_daily_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.product} - {self.units} unidades"
+
+
+class CustomerStats(models.Model):
+    """
+    Totais de compras e classificação RFM (recência, frequência, valor) de
+    cada cliente.
+
+    Os totais são atualizados quando uma venda do cliente é confirmada; as
+    notas (1 a 5) e o segmento são recalculados pelo comando `rescore_customers`.
+    """
+
+    SEGMENTS = [
+        ('champions', 'Campeões'),
+        ('loyal', 'Fiéis'),
+        ('promising', 'Promissores'),
+        ('at_risk', 'Em Risco'),
+        ('hibernating', 'Hibernando'),
+        ('lost', 'Perdidos'),
+    ]
+
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name='Cliente',
+    )
+
+    first_purchase = models.DateTimeField(null=True, blank=True, verbose_name='Primeira Compra')
+    last_purchase = models.DateTimeField(null=True, blank=True, verbose_name='Última Compra')
+    frequency = models.IntegerField(default=0, verbose_name='Compras')
+    monetary = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Total Gasto')
+
+    recency_score = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Nota de Recência')
+    frequency_score = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Nota de Frequência')
+    monetary_score = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Nota de Valor')
+    segment = models.CharField(max_length=20, choices=SEGMENTS, null=True, blank=True, verbose_name='Segmento')
+    scored_at = models.DateTimeField(null=True, blank=True, verbose_name='Classificado em')
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Estatística de Cliente'
+        verbose_name_plural = 'Estatísticas de Clientes'
+        indexes = [
+            models.Index(fields=['-monetary'], name='customer_stats_monetary_idx'),
+            models.Index(fields=['segment', '-monetary'], name='customer_stats_segment_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer} - {self.frequency} compras"
+
+
+class ReportJob(models.Model):
+    """
+    Relatório calculado em segundo plano, com o resultado salvo em arquivo.
+
+    Pedidos iguais do mesmo usuário (relatório, formato e parâmetros) enquanto um job
+    está pendente ou em execução reaproveitam esse job (`dedup_key`).
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (PENDING, 'Pendente'),
+        (RUNNING, 'Em Execução'),
+        (DONE, 'Concluído'),
+        (FAILED, 'Falhou'),
+    ]
+    ACTIVE_STATUSES = [PENDING, RUNNING]
+
+    report = models.CharField(max_length=30, verbose_name='Relatório')
+    file_format = models.CharField(max_length=10, verbose_name='Formato')
+    params = models.JSONField(default=dict, blank=True, verbose_name='Parâmetros')
+    dedup_key = models.CharField(max_length=64, verbose_name='Chave de Deduplicação')
+
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING, verbose_name='Situação')
+    result = models.FileField(upload_to='reports/', null=True, blank=True, verbose_name='Resultado')
+    error = models.TextField(null=True, blank=True, verbose_name='Erro')
+
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+', verbose_name='Solicitado por',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Relatório em Segundo Plano'
+        verbose_name_plural = 'Relatórios em Segundo Plano'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='report_job_queue_idx'),
+        ]
+        constraints = [
+            # Um único job ativo por pedido
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='report_job_active_dedup',
+            ),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.report} ({self.file_format}) - {self.get_status_display()}"
+
+    @property
+    def filename(self):
+        return f'{self.report}_{self.pk}.{self.file_format}'
+
+
+class ReportSnapshot(models.Model):
+    """
+    Parte já fechada (do início do período até ontem) de um relatório de
+    período padrão, gravada pelo comando `precompute_reports`.
+    """
+
+    report = models.CharField(max_length=30, verbose_name='Relatório')
+    period = models.CharField(max_length=10, verbose_name='Período')
+    start_date = models.DateField(verbose_name='Data Inicial')
+    end_date = models.DateField(verbose_name='Data Final')
+    # Somas por dia/produto/vendedor (ver reporting.precompute)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    computed_at = models.DateTimeField(verbose_name='Calculado em')
+
+    class Meta:
+        verbose_name = 'Relatório Pré-calculado'
+        verbose_name_plural = 'Relatórios Pré-calculados'
+        unique_together = ['report', 'period']
+
+    def __str__(self):
+        return f"{self.report} ({self.period} dias) - {self.start_date} a {self.end_date}"
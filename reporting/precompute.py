@@ -0,0 +1,126 @@
+"""
+Relatórios pré-calculados dos períodos padrão (7, 30 e 90 dias).
+
+Os relatórios de vendas e de produtos são somas de linhas por dia. O comando
+`precompute_reports` grava a parte já fechada de cada período padrão (do
+início até ontem) em `ReportSnapshot`; ao abrir o relatório, só o dia de hoje
+é calculado na hora e somado a ela. Na virada do dia a parte gravada é
+atualizada de forma incremental: entra o dia que fechou e sai o dia que
+deixou o período.
+
+Os dados de um relatório são "partes": {grupo: {chave: {campo: valor}}},
+com valores numéricos que podem ser somados e subtraídos (`add`). As chaves
+são textos estáveis (data ISO, id do produto ou do vendedor), nunca nomes,
+para que renomear um produto não separe suas somas; os valores são int ou
+Decimal. As partes são gravadas em JSON.
+
+Uma parte gravada deixa de ser usada se os resumos de dias já fechados forem
+alterados depois do cálculo (ex.: venda retroativa, excluída ou que trocou
+de vendedor); a tela volta a calcular o período inteiro até o próximo
+pré-cálculo.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import DailySalesSummary, ProductDailySales, ReportSnapshot
+
+
+# Resumos cujas alterações invalidam a parte gravada de cada relatório
+SOURCES = {
+    'sales': DailySalesSummary,
+    'products': ProductDailySales,
+}
+
+
+def add(target, partial, sign=1):
+    """Soma (ou subtrai, com sign=-1) `partial` em `target`, removendo as linhas zeradas"""
+    for group, rows in partial.items():
+        totals = target.setdefault(group, {})
+        for key, values in rows.items():
+            row = totals.setdefault(key, dict.fromkeys(values, 0))
+            for field, value in values.items():
+                row[field] = row.get(field, 0) + sign * value
+            if not any(row.values()):
+                del totals[key]
+    return target
+
+
+def _decode(data):
+    """Parte lida do JSON: os Decimal foram gravados como texto"""
+    return {
+        group: {
+            key: {field: Decimal(value) if isinstance(value, str) else value for field, value in values.items()}
+            for key, values in rows.items()
+        }
+        for group, rows in data.items()
+    }
+
+
+def closed_range(days, today):
+    """Datas (inclusive) da parte fechada de um período padrão de `days` dias"""
+    return today - timedelta(days=days), today - timedelta(days=1)
+
+
+def _snapshots(report):
+    source = SOURCES[report].objects.filter(
+        date__gte=OuterRef('start_date'),
+        date__lte=OuterRef('end_date'),
+        updated_at__gt=OuterRef('computed_at'),
+    )
+    return ReportSnapshot.objects.filter(report=report).annotate(changed=Exists(source))
+
+
+def load(report, period_key, days, today):
+    """Parte fechada gravada do período, ou None se não houver uma atual (1 query)"""
+    start_date, end_date = closed_range(days, today)
+    snapshot = _snapshots(report).filter(
+        period=period_key,
+        start_date=start_date,
+        end_date=end_date,
+        changed=False,
+    ).first()
+    return _decode(snapshot.data) if snapshot else None
+
+
+def precompute(report, period_key, days, partial_for, today, full=False):
+    """
+    Atualiza a parte fechada gravada de um relatório/período.
+    Retorna 'skipped', 'incremental' ou 'full'.
+    """
+    # Alterações feitas durante o cálculo invalidam a parte gravada
+    computed_at = timezone.now()
+    start_date, end_date = closed_range(days, today)
+    snapshot = None if full else _snapshots(report).filter(period=period_key).first()
+    # Só aproveita uma parte atual que se sobrepõe ao novo período
+    reusable = snapshot is not None and not snapshot.changed and (
+        snapshot.start_date <= start_date <= snapshot.end_date + timedelta(days=1) and snapshot.end_date <= end_date
+    )
+
+    if reusable:
+        if (snapshot.start_date, snapshot.end_date) == (start_date, end_date):
+            return 'skipped'
+        # Períodos sobrepostos: soma os dias que entraram e subtrai os que saíram
+        partial = _decode(snapshot.data)
+        if snapshot.end_date < end_date:
+            add(partial, partial_for(snapshot.end_date + timedelta(days=1), end_date))
+        if snapshot.start_date < start_date:
+            add(partial, partial_for(snapshot.start_date, start_date - timedelta(days=1)), sign=-1)
+        mode = 'incremental'
+    else:
+        partial = partial_for(start_date, end_date)
+        mode = 'full'
+
+    ReportSnapshot.objects.update_or_create(
+        report=report,
+        period=period_key,
+        defaults=dict(
+            start_date=start_date,
+            end_date=end_date,
+            data=partial,
+            computed_at=computed_at,
+        ),
+    )
+    return mode
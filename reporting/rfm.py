@@ -0,0 +1,121 @@
+"""
+Estatísticas de compras e classificação RFM dos clientes.
+
+Os totais de cada cliente (`CustomerStats`) são recalculados a partir das suas
+vendas quando uma venda é confirmada. As notas de recência, frequência e
+valor (1 a 5, quintis) são dadas pelo banco em uma única consulta com NTILE
+e gravadas em lote pelo comando `rescore_customers`.
+"""
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max, Min, Sum, Window
+from django.db.models.functions import Cast, Ntile
+from django.utils import timezone
+
+from sales.models import Sale
+from .models import CustomerStats
+
+
+SCORES = 5
+
+BATCH_SIZE = 1000
+
+STATS_FIELDS = ['first_purchase', 'last_purchase', 'frequency', 'monetary']
+
+SCORE_FIELDS = ['recency_score', 'frequency_score', 'monetary_score', 'segment', 'scored_at']
+
+
+def segment_for(recency, frequency, monetary):
+    """Segmento do cliente a partir das notas RFM"""
+    if recency >= 4 and frequency >= 4:
+        return 'champions'
+    if recency >= 3 and frequency >= 3:
+        return 'loyal'
+    if recency >= 4:
+        return 'promising'
+    if recency <= 2 and (frequency >= 3 or monetary >= 4):
+        return 'at_risk'
+    if recency == 1:
+        return 'lost'
+    return 'hibernating'
+
+
+def _customer_totals(sales):
+    return sales.exclude(customer=None).order_by().values('customer_id').annotate(
+        first_purchase=Min('created_at'),
+        last_purchase=Max('created_at'),
+        frequency=Count('id'),
+        monetary=Sum('final_amount'),
+    )
+
+
+def refresh_customer_stats(customer_ids):
+    """Recalcula os totais dos clientes informados (as notas ficam para o rescore)"""
+    customer_ids = {customer_id for customer_id in customer_ids if customer_id}
+    if not customer_ids:
+        return
+
+    totals = {
+        row.pop('customer_id'): row
+        for row in _customer_totals(Sale.objects.filter(customer_id__in=customer_ids))
+    }
+
+    with transaction.atomic():
+        for customer_id in customer_ids:
+            if customer_id in totals:
+                CustomerStats.objects.update_or_create(customer_id=customer_id, defaults=totals[customer_id])
+            else:
+                CustomerStats.objects.filter(customer_id=customer_id).delete()
+
+
+def rebuild_customer_stats():
+    """Recalcula os totais de todos os clientes a partir das vendas"""
+    stats = {
+        row['customer_id']: CustomerStats(**row)
+        for row in _customer_totals(Sale.objects.all())
+    }
+    existing = set(CustomerStats.objects.values_list('customer_id', flat=True))
+
+    removed = list(existing - set(stats))
+
+    with transaction.atomic():
+        for start in range(0, len(removed), BATCH_SIZE):
+            CustomerStats.objects.filter(customer_id__in=removed[start:start + BATCH_SIZE]).delete()
+        CustomerStats.objects.bulk_update(
+            [stat for customer_id, stat in stats.items() if customer_id in existing],
+            STATS_FIELDS,
+            batch_size=BATCH_SIZE,
+        )
+        CustomerStats.objects.bulk_create(
+            [stat for customer_id, stat in stats.items() if customer_id not in existing],
+            batch_size=BATCH_SIZE,
+        )
+
+    return len(stats)
+
+
+def rescore_customers():
+    """Dá as notas RFM por quintis e o segmento de todos os clientes com compras"""
+    scores = CustomerStats.objects.filter(frequency__gt=0).annotate(
+        r=Window(Ntile(SCORES), order_by=F('last_purchase').asc()),
+        f=Window(Ntile(SCORES), order_by=F('frequency').asc()),
+        # Cast: no SQLite o Django gera SQL inválido ao ordenar a janela por um DecimalField
+        m=Window(Ntile(SCORES), order_by=Cast('monetary', FloatField()).asc()),
+    ).values_list('customer_id', 'r', 'f', 'm')
+
+    now = timezone.now()
+    stats = [
+        CustomerStats(
+            customer_id=customer_id,
+            recency_score=recency,
+            frequency_score=frequency,
+            monetary_score=monetary,
+            segment=segment_for(recency, frequency, monetary),
+            scored_at=now,
+        )
+        for customer_id, recency, frequency, monetary in scores.iterator(chunk_size=BATCH_SIZE)
+    ]
+
+    with transaction.atomic():
+        CustomerStats.objects.bulk_update(stats, SCORE_FIELDS, batch_size=BATCH_SIZE)
+
+    return len(stats)
@@ -0,0 +1,440 @@
+"""
+Manutenção incremental das tabelas de resumo (rollups) de relatórios.
+
+Cada escrita em Sale/SaleItem/Outflow/Product aplica apenas a diferença (delta) no
+resumo correspondente, dentro da mesma transação da escrita original. O
+comando `rebuild_rollups` recalcula tudo a partir dos dados brutos.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from outflows.models import Outflow
+from products.models import Product
+from sales.models import Sale, SaleItem
+from .models import DailySalesSummary, InventoryValuation, ProductDailySales
+
+
+PAYMENT_METHODS = [code for code, _ in Sale.PAYMENT_METHODS]
+
+MONEY_FIELD = DecimalField(max_digits=16, decimal_places=2)
+
+VALUATION_FIELDS = ['product_count', 'quantity', 'cost_value', 'selling_value']
+
+
+def _to_decimal(value):
+    return Decimal(str(value or 0))
+
+
+def _bump(model, lookup, deltas):
+    """Soma `deltas` na linha identificada por `lookup`, criando-a se necessário"""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    # update() não aplica o auto_now; o pré-cálculo usa updated_at para saber o que mudou
+    updates['updated_at'] = timezone.now()
+    if model.objects.filter(**lookup).update(**updates):
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Outra transação criou a linha primeiro
+        model.objects.filter(**lookup).update(**updates)
+
+
+def _bump_many(model, rows):
+    """
+    `_bump` de várias linhas em poucas queries: `rows` é uma lista de
+    (lookup, deltas). Um UPDATE com CASE soma nas linhas existentes e as que
+    faltam são criadas em um único INSERT.
+    """
+    rows = [(lookup, {field: value for field, value in deltas.items() if value}) for lookup, deltas in rows]
+    rows = [(lookup, deltas) for lookup, deltas in rows if deltas]
+    if not rows:
+        return
+
+    matches = Q()
+    for lookup, _ in rows:
+        matches |= Q(**lookup)
+    fields = list(rows[0][0])
+    existing = {tuple(values) for values in model.objects.filter(matches).values_list(*fields)}
+
+    updated = [(lookup, deltas) for lookup, deltas in rows if tuple(lookup.values()) in existing]
+    if updated:
+        updates = {}
+        for field in {field for _, deltas in updated for field in deltas}:
+            updates[field] = Case(
+                *[When(Q(**lookup), then=F(field) + deltas[field]) for lookup, deltas in updated if field in deltas],
+                default=F(field),
+                output_field=model._meta.get_field(field),
+            )
+        model.objects.filter(matches).update(updated_at=timezone.now(), **updates)
+
+    created = [(lookup, deltas) for lookup, deltas in rows if tuple(lookup.values()) not in existing]
+    if not created:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create([model(**lookup, **deltas) for lookup, deltas in created])
+    except IntegrityError:
+        # Outra transação criou alguma das linhas primeiro
+        for lookup, deltas in created:
+            _bump(model, lookup, deltas)
+
+
+def _merge(target, deltas):
+    for field, value in deltas.items():
+        target[field] = target.get(field, 0) + value
+
+
+def sale_snapshot(sale):
+    """Valores de uma venda que afetam o resumo diário"""
+    return dict(
+        customer_id=sale.customer_id,
+        seller_id=sale.seller_id,
+        date=sale.created_at.date(),
+        payment_method=sale.payment_method,
+        final_amount=_to_decimal(sale.final_amount),
+        discount=_to_decimal(sale.discount),
+    )
+
+
+def _sale_deltas(snapshot, sign):
+    deltas = dict(
+        sales_count=sign,
+        revenue=sign * snapshot['final_amount'],
+        discount=sign * snapshot['discount'],
+    )
+    if snapshot['payment_method'] in PAYMENT_METHODS:
+        deltas[f"{snapshot['payment_method']}_count"] = sign
+        deltas[f"{snapshot['payment_method']}_revenue"] = sign * snapshot['final_amount']
+    return deltas
+
+
+def record_sale_change(old, new):
+    """Aplica a troca de `old` por `new` (snapshots; qualquer um pode ser None)"""
+    by_date = defaultdict(dict)
+    if old:
+        _merge(by_date[old['date']], _sale_deltas(old, -1))
+    if new:
+        _merge(by_date[new['date']], _sale_deltas(new, 1))
+
+    for day, deltas in by_date.items():
+        _bump(DailySalesSummary, dict(date=day), deltas)
+
+    # Trocar o vendedor não muda as somas do dia, mas muda as vendas por
+    # vendedor: marca o dia como alterado para o pré-cálculo refazê-lo
+    if old and new and old['seller_id'] != new['seller_id']:
+        DailySalesSummary.objects.filter(date__in={old['date'], new['date']}).update(updated_at=timezone.now())
+
+
+def record_outflows(outflows, sign=1):
+    """Soma (ou subtrai, com sign=-1) as saídas informadas nos resumos diários"""
+    by_date = defaultdict(dict)
+    for outflow in outflows:
+        created_at = outflow.created_at or timezone.now()
+        _merge(by_date[created_at.date()], dict(
+            outflow_count=sign,
+            quantity=sign * outflow.quantity,
+            outflow_value=sign * outflow.quantity * _to_decimal(outflow.unit_price),
+        ))
+
+    for day, deltas in by_date.items():
+        _bump(DailySalesSummary, dict(date=day), deltas)
+
+
+def rebuild_daily_sales(start=None):
+    """Recalcula os resumos diários a partir de `start` (ou de todo o histórico)"""
+    sales = Sale.objects.all()
+    outflows = Outflow.objects.all()
+    if start:
+        start_at = datetime.combine(start, time.min)
+        sales = sales.filter(created_at__gte=start_at)
+        outflows = outflows.filter(created_at__gte=start_at)
+
+    payment_aggregates = {}
+    for method in PAYMENT_METHODS:
+        payment_aggregates[f'{method}_count'] = Count('id', filter=Q(payment_method=method))
+        payment_aggregates[f'{method}_revenue'] = Sum('final_amount', filter=Q(payment_method=method))
+
+    rows = defaultdict(dict)
+    for row in sales.order_by().values(day=TruncDate('created_at')).annotate(
+        sales_count=Count('id'),
+        revenue=Sum('final_amount'),
+        total_discount=Sum('discount'),
+        **payment_aggregates,
+    ):
+        row['discount'] = row.pop('total_discount')
+        rows[row.pop('day')].update(row)
+
+    for row in outflows.order_by().values(day=TruncDate('created_at')).annotate(
+        outflow_count=Count('id'),
+        units=Sum('quantity'),
+        outflow_value=Sum(F('quantity') * F('unit_price'), output_field=MONEY_FIELD),
+    ):
+        row['quantity'] = row.pop('units')
+        rows[row.pop('day')].update(row)
+
+    summaries = [
+        DailySalesSummary(date=day, **{field: value or 0 for field, value in values.items()})
+        for day, values in rows.items()
+    ]
+
+    with transaction.atomic():
+        existing = DailySalesSummary.objects.all()
+        if start:
+            existing = existing.filter(date__gte=start)
+        existing.delete()
+        DailySalesSummary.objects.bulk_create(summaries, batch_size=1000)
+
+    return len(summaries)
+
+
+def daily_summaries_in(start_date, end_date):
+    """Queryset dos resumos diários entre as datas (inclusive)"""
+    return DailySalesSummary.objects.filter(date__gte=start_date, date__lte=end_date)
+
+
+def daily_summaries(start_date, end_date):
+    """Resumos diários entre as datas (inclusive), indexados por data"""
+    return {summary.date: summary for summary in daily_summaries_in(start_date, end_date)}
+
+
+def sale_item_snapshot(item):
+    """Valores de um item de venda que afetam o cubo de vendas por produto"""
+    return dict(
+        sale_id=item.sale_id,
+        product_id=item.product_id,
+        date=item.sale.created_at.date(),
+        quantity=item.quantity,
+        revenue=item.quantity * _to_decimal(item.unit_price),
+        cost=item.quantity * _to_decimal(item.product.cost_price),
+    )
+
+
+def _sale_item_deltas(snapshot, sign):
+    return dict(
+        units=sign * snapshot['quantity'],
+        revenue=sign * snapshot['revenue'],
+        cost=sign * snapshot['cost'],
+    )
+
+
+def _recount_sales(day, product_id):
+    """
+    Conta de novo, nos itens, as vendas do produto no dia. Ao excluir uma venda
+    os itens são apagados juntos antes dos signals, então "era a última linha
+    do produto na venda" não pode ser decidido item a item.
+    """
+    start_at = datetime.combine(day, time.min)
+    sales = SaleItem.objects.filter(
+        product_id=product_id,
+        sale__created_at__gte=start_at,
+        sale__created_at__lt=start_at + timedelta(days=1),
+    ).order_by().values('product_id').annotate(total=Count('sale', distinct=True)).values('total')
+    ProductDailySales.objects.filter(date=day, product_id=product_id).update(
+        sale_count=Coalesce(Subquery(sales), 0),
+    )
+
+
+def record_sale_item_change(old, new):
+    """Aplica a troca de `old` por `new` (snapshots; qualquer um pode ser None)"""
+    # A contagem de vendas só muda se o item trocou de venda ou de produto
+    line_changed = not (old and new) or (
+        (old['sale_id'], old['product_id']) != (new['sale_id'], new['product_id'])
+    )
+
+    by_key = defaultdict(dict)
+    if old:
+        _merge(by_key[(old['date'], old['product_id'])], _sale_item_deltas(old, -1))
+    if new:
+        _merge(by_key[(new['date'], new['product_id'])], _sale_item_deltas(new, 1))
+
+    for (day, product_id), deltas in by_key.items():
+        _bump(ProductDailySales, dict(date=day, product_id=product_id), deltas)
+        if line_changed:
+            _recount_sales(day, product_id)
+
+
+def record_new_sale_items(items):
+    """
+    Soma no cubo os itens de vendas novas criados com bulk_create (que não
+    dispara signals); `item.sale` e `item.product` já devem estar carregados
+    """
+    by_cell = defaultdict(dict)
+    sales = defaultdict(set)
+    for item in items:
+        cell = (item.sale.created_at.date(), item.product_id)
+        sales[cell].add(item.sale_id)
+        _merge(by_cell[cell], dict(
+            units=item.quantity,
+            revenue=item.quantity * _to_decimal(item.unit_price),
+            cost=item.quantity * _to_decimal(item.product.cost_price),
+        ))
+
+    _bump_many(ProductDailySales, [
+        (dict(date=day, product_id=product_id), dict(deltas, sale_count=len(sales[day, product_id])))
+        for (day, product_id), deltas in by_cell.items()
+    ])
+
+
+def record_new_sales(sales):
+    """Soma nos resumos diários as vendas novas criadas com bulk_create"""
+    by_date = defaultdict(dict)
+    for sale in sales:
+        snapshot = sale_snapshot(sale)
+        _merge(by_date[snapshot['date']], _sale_deltas(snapshot, 1))
+
+    _bump_many(DailySalesSummary, [(dict(date=day), deltas) for day, deltas in by_date.items()])
+
+
+def rebuild_product_daily_sales(start=None):
+    """Recalcula o cubo de vendas por produto a partir de `start` (ou de todo o histórico)"""
+    items = SaleItem.objects.all()
+    if start:
+        items = items.filter(sale__created_at__gte=datetime.combine(start, time.min))
+
+    rows = items.order_by().values(
+        'product_id',
+        day=TruncDate('sale__created_at'),
+    ).annotate(
+        total_units=Sum('quantity'),
+        total_revenue=Sum(F('quantity') * F('unit_price'), output_field=MONEY_FIELD),
+        total_cost=Sum(F('quantity') * F('product__cost_price'), output_field=MONEY_FIELD),
+        total_sales=Count('sale', distinct=True),
+    )
+    cells = [
+        ProductDailySales(
+            date=row['day'],
+            product_id=row['product_id'],
+            units=row['total_units'] or 0,
+            revenue=row['total_revenue'] or 0,
+            cost=row['total_cost'] or 0,
+            sale_count=row['total_sales'],
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        existing = ProductDailySales.objects.all()
+        if start:
+            existing = existing.filter(date__gte=start)
+        existing.delete()
+        ProductDailySales.objects.bulk_create(cells, batch_size=1000)
+
+    return len(cells)
+
+
+def product_daily_sales(start_date, end_date):
+    """Linhas do cubo de vendas por produto entre as datas (inclusive)"""
+    return ProductDailySales.objects.filter(date__gte=start_date, date__lte=end_date)
+
+
+def product_snapshot(product):
+    """Valores de um produto que afetam o valor do estoque"""
+    return dict(
+        category_id=product.category_id,
+        brand_id=product.brand_id,
+        is_active=product.is_active,
+        quantity=product.quantity,
+        cost_price=_to_decimal(product.cost_price),
+        selling_price=_to_decimal(product.selling_price),
+    )
+
+
+def _valuation_key(snapshot):
+    return (snapshot['category_id'], snapshot['brand_id'], snapshot['is_active'])
+
+
+def _valuation_deltas(snapshot, sign):
+    return dict(
+        product_count=sign,
+        quantity=sign * snapshot['quantity'],
+        cost_value=sign * snapshot['quantity'] * snapshot['cost_price'],
+        selling_value=sign * snapshot['quantity'] * snapshot['selling_price'],
+    )
+
+
+def record_product_change(old, new):
+    """Aplica a troca de `old` por `new` (snapshots; qualquer um pode ser None)"""
+    by_key = defaultdict(dict)
+    if old:
+        _merge(by_key[_valuation_key(old)], _valuation_deltas(old, -1))
+    if new:
+        _merge(by_key[_valuation_key(new)], _valuation_deltas(new, 1))
+
+    for (category_id, brand_id, is_active), deltas in by_key.items():
+        _bump(InventoryValuation, dict(category_id=category_id, brand_id=brand_id, is_active=is_active), deltas)
+
+
+def record_stock_changes(changes):
+    """
+    Aplica no valor do estoque as variações de quantidade feitas com update()
+    (sem signals): `changes` é uma lista de (produto, variação)
+    """
+    by_key = defaultdict(dict)
+    for product, delta in changes:
+        snapshot = product_snapshot(product)
+        _merge(by_key[_valuation_key(snapshot)], dict(
+            quantity=delta,
+            cost_value=delta * snapshot['cost_price'],
+            selling_value=delta * snapshot['selling_price'],
+        ))
+
+    _bump_many(InventoryValuation, [
+        (dict(category_id=category_id, brand_id=brand_id, is_active=is_active), deltas)
+        for (category_id, brand_id, is_active), deltas in by_key.items()
+    ])
+
+
+def compute_inventory_valuation():
+    """Valor do estoque calculado do zero, indexado por (categoria, marca, ativo)"""
+    rows = Product.objects.order_by().values('category_id', 'brand_id', 'is_active').annotate(
+        product_count=Count('id'),
+        units=Sum('quantity'),
+        cost_value=Sum(F('quantity') * F('cost_price'), output_field=MONEY_FIELD),
+        selling_value=Sum(F('quantity') * F('selling_price'), output_field=MONEY_FIELD),
+    )
+    return {
+        (row['category_id'], row['brand_id'], row['is_active']): dict(
+            product_count=row['product_count'],
+            quantity=row['units'] or 0,
+            cost_value=row['cost_value'] or 0,
+            selling_value=row['selling_value'] or 0,
+        )
+        for row in rows
+    }
+
+
+def stored_inventory_valuation():
+    """
+    Valor do estoque guardado na tabela de resumo, no mesmo formato. Linhas
+    zeradas (todos os produtos saíram do grupo) são omitidas, como no cálculo.
+    """
+    return {
+        (row['category_id'], row['brand_id'], row['is_active']): {field: row[field] for field in VALUATION_FIELDS}
+        for row in InventoryValuation.objects.values('category_id', 'brand_id', 'is_active', *VALUATION_FIELDS)
+        if any(row[field] for field in VALUATION_FIELDS)
+    }
+
+
+def rebuild_inventory_valuation():
+    valuations = [
+        InventoryValuation(category_id=category_id, brand_id=brand_id, is_active=is_active, **values)
+        for (category_id, brand_id, is_active), values in compute_inventory_valuation().items()
+    ]
+
+    with transaction.atomic():
+        InventoryValuation.objects.all().delete()
+        InventoryValuation.objects.bulk_create(valuations, batch_size=1000)
+
+    return len(valuations)
@@ -0,0 +1,129 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from brands.models import Brand
+from categories.models import Category
+from colors.models import Color
+from customers.models import Customer
+from inflows.models import Inflow
+from outflows.models import Outflow
+from products.models import Product
+from products.stock import stock_changed
+from sales.models import Sale, SaleItem
+from sizes.models import Size
+from . import cache, rfm, rollups
+
+
+# Grupos de dados do cache de métricas afetados pela escrita de cada modelo
+CACHE_DEPENDENCIES = {
+    Product: ['products'],
+    Category: ['products'],
+    Brand: ['products'],
+    Size: ['products'],
+    Color: ['products'],
+    Inflow: ['products'],
+    Outflow: ['products', 'sales'],
+    Sale: ['sales'],
+    SaleItem: ['sales'],
+    Customer: ['customers'],
+}
+
+
+@receiver(pre_save, sender=Sale)
+def remember_sale_snapshot(sender, instance, **kwargs):
+    """Guarda os valores atuais da venda para calcular a diferença no post_save"""
+    instance._rollup_snapshot = None
+    if instance.pk:
+        previous = Sale.objects.filter(pk=instance.pk).first()
+        if previous:
+            instance._rollup_snapshot = rollups.sale_snapshot(previous)
+
+
+@receiver(post_save, sender=Sale)
+def update_daily_sales_on_save(sender, instance, **kwargs):
+    old = getattr(instance, '_rollup_snapshot', None)
+    rollups.record_sale_change(old, rollups.sale_snapshot(instance))
+    _refresh_customer_stats_on_commit(instance.customer_id, old['customer_id'] if old else None)
+
+
+@receiver(post_delete, sender=Sale)
+def update_daily_sales_on_delete(sender, instance, **kwargs):
+    rollups.record_sale_change(rollups.sale_snapshot(instance), None)
+    _refresh_customer_stats_on_commit(instance.customer_id)
+
+
+def _refresh_customer_stats_on_commit(*customer_ids):
+    """Atualiza os totais dos clientes da venda depois que ela é confirmada"""
+    if any(customer_ids):
+        transaction.on_commit(lambda: rfm.refresh_customer_stats(customer_ids))
+
+
+@receiver(pre_save, sender=SaleItem)
+def remember_sale_item_snapshot(sender, instance, **kwargs):
+    """Guarda os valores atuais do item para calcular a diferença no post_save"""
+    instance._rollup_snapshot = None
+    if instance.pk:
+        previous = SaleItem.objects.select_related('sale', 'product').filter(pk=instance.pk).first()
+        if previous:
+            instance._rollup_snapshot = rollups.sale_item_snapshot(previous)
+
+
+@receiver(post_save, sender=SaleItem)
+def update_product_daily_sales_on_save(sender, instance, **kwargs):
+    rollups.record_sale_item_change(
+        getattr(instance, '_rollup_snapshot', None),
+        rollups.sale_item_snapshot(instance),
+    )
+
+
+@receiver(post_delete, sender=SaleItem)
+def update_product_daily_sales_on_delete(sender, instance, **kwargs):
+    rollups.record_sale_item_change(rollups.sale_item_snapshot(instance), None)
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_snapshot(sender, instance, **kwargs):
+    """Guarda os valores atuais do produto para calcular a diferença no post_save"""
+    instance._valuation_snapshot = None
+    if instance.pk:
+        previous = Product.objects.filter(pk=instance.pk).order_by('pk').first()
+        if previous:
+            instance._valuation_snapshot = rollups.product_snapshot(previous)
+
+
+@receiver(post_save, sender=Product)
+def update_inventory_valuation_on_save(sender, instance, **kwargs):
+    rollups.record_product_change(
+        getattr(instance, '_valuation_snapshot', None),
+        rollups.product_snapshot(instance),
+    )
+
+
+@receiver(post_delete, sender=Product)
+def update_inventory_valuation_on_delete(sender, instance, **kwargs):
+    rollups.record_product_change(rollups.product_snapshot(instance), None)
+
+
+@receiver(stock_changed, sender=Product)
+def update_inventory_valuation_on_stock_change(sender, changes, **kwargs):
+    rollups.record_stock_changes(changes)
+    transaction.on_commit(lambda: cache.bump_version('products'))
+
+
+@receiver(post_save, sender=Outflow)
+def update_daily_outflows_on_save(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_outflows([instance])
+
+
+@receiver(post_delete, sender=Outflow)
+def update_daily_outflows_on_delete(sender, instance, **kwargs):
+    rollups.record_outflows([instance], sign=-1)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_metrics_cache(sender, **kwargs):
+    """Invalida as métricas em cache quando a transação da escrita é confirmada"""
+    for namespace in CACHE_DEPENDENCIES.get(sender, []):
+        transaction.on_commit(lambda namespace=namespace: cache.bump_version(namespace))
@@ -1,3 +1,594 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F, Sum
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from brands.models import Brand
+from categories.models import Category
+from customers.models import Customer
+from inflows.models import Inflow
+from outflows.models import Outflow
+from products import stock
+from products.models import Product
+from sales import services
+from sales.models import Sale, SaleItem
+from suppliers.models import Supplier
+from . import benchmarks, cache as metrics_cache, engine, jobs, precompute, rfm, rollups
+from .engine import Period, _sales_in
+from .exports import stream_csv, stream_xlsx
+from .models import (
+    CustomerStats, DailySalesSummary, InventoryValuation, ProductDailySales, ReportJob, ReportSnapshot,
+)
+from .rollups import rebuild_daily_sales, rebuild_product_daily_sales
+
+
+class PeriodRangeTests(TestCase):
+
+    def setUp(self):
+        self.period = Period('custom', date(2026, 1, 1), date(2026, 1, 31))
+        self.seller = User.objects.create(username='vendedor')
+
+    def create_sale(self, created_at):
+        sale = Sale.objects.create(
+            seller=self.seller,
+            total_amount=10,
+            final_amount=10,
+            payment_method='cash',
+        )
+        Sale.objects.filter(pk=sale.pk).update(created_at=created_at)
+        return sale
+
+    def test_range_is_half_open(self):
+        self.assertEqual(self.period.start, datetime(2026, 1, 1))
+        self.assertEqual(self.period.end, datetime(2026, 2, 1))
+
+        first = self.create_sale(datetime(2026, 1, 1, 0, 0))
+        last = self.create_sale(datetime(2026, 1, 31, 23, 59, 59, 999999))
+        self.create_sale(datetime(2025, 12, 31, 23, 59, 59))
+        self.create_sale(datetime(2026, 2, 1, 0, 0))
+
+        self.assertEqual(set(_sales_in(self.period)), {first, last})
+
+
+class ReportIndexTests(TestCase):
+    """Os filtros de período dos relatórios devem usar os índices de created_at"""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Os planos verificados são os do SQLite')
+        self.period = Period('custom', date(2026, 1, 1), date(2026, 1, 31))
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.order_by().explain()
+        self.assertIn(f'INDEX {index_name}', plan)
+
+    def test_sales_in_period(self):
+        self.assertUsesIndex(_sales_in(self.period), 'sales_sale_created_at_idx')
+
+    def test_date_cast_does_not_use_index(self):
+        queryset = Sale.objects.filter(
+            created_at__date__gte=self.period.start_date,
+            created_at__date__lte=self.period.end_date,
+        )
+        self.assertNotIn('sales_sale_created_at_idx', queryset.order_by().explain())
+
+    def test_sale_items_in_period(self):
+        queryset = SaleItem.objects.filter(
+            **self.period.range_filter('sale__created_at'),
+        ).values('product__title')
+        self.assertUsesIndex(queryset, 'sales_sale_created_at_idx')
+        self.assertUsesIndex(queryset, 'sales_item_sale_product_idx')
+
+    def test_outflows_in_period(self):
+        self.assertUsesIndex(
+            Outflow.objects.filter(**self.period.range_filter('created_at')),
+            'outflows_created_at_idx',
+        )
+
+    def test_inflows_in_period(self):
+        self.assertUsesIndex(
+            Inflow.objects.filter(**self.period.range_filter('created_at')),
+            'inflows_created_at_idx',
+        )
+
+    def test_new_customers_in_period(self):
+        self.assertUsesIndex(
+            Customer.objects.filter(**self.period.range_filter('created_at')),
+            'customers_created_at_idx',
+        )
+
+
+class StaleEntryTests(TestCase):
+    """Entrada velha servida enquanto outro processo recalcula"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def hold_lock(self, name):
+        # Outro processo recalculando `name`
+        cache.add(metrics_cache.LOCK_KEY.format(name), True)
+        self.addCleanup(cache.delete, metrics_cache.LOCK_KEY.format(name))
+
+    def test_stale_entry_keeps_the_version_it_was_computed_with(self):
+        first = metrics_cache.get_entry('teste', ['sales'], lambda: 'velho')
+        metrics_cache.bump_version('sales')
+        self.hold_lock('teste')
+
+        stale = metrics_cache.get_entry('teste', ['sales'], lambda: 'novo')
+        self.assertEqual((stale['data'], stale['version']), ('velho', first['version']))
+        self.assertNotEqual(stale['version'], metrics_cache.get_versions(['sales']))
+
+    def test_stale_data_is_not_served_under_the_new_etag(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        for url, name in [
+            (reverse('reporting:distribution_api', args=['category']), 'distribution:category'),
+            (reverse('dashboard_widget', args=['product_metrics']), 'product_metrics'),
+        ]:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+
+                metrics_cache.bump_version('products')
+                self.hold_lock(name)
+                self.assertEqual(self.client.get(url)['ETag'], etag)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+                cache.delete(metrics_cache.LOCK_KEY.format(name))
+                fresh = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(fresh.status_code, 200)
+                self.assertNotEqual(fresh['ETag'], etag)
+
+
+class DailySalesSummaryTests(TestCase):
+
+    FIELDS = [field.name for field in DailySalesSummary._meta.fields if field.name not in ('id', 'updated_at')]
+
+    def setUp(self):
+        self.seller = User.objects.create(username='vendedor')
+        self.products = benchmarks.seed_products(2, 'resumo')
+
+    def summaries(self):
+        return list(DailySalesSummary.objects.order_by('date').values_list(*self.FIELDS))
+
+    def test_rebuild_matches_incremental(self):
+        cart = [dict(product_id=product.id, quantity=2) for product in self.products]
+        services.checkout(self.seller, cart, payment_method='pix')
+        sale = services.checkout(self.seller, cart[:1], discount=5)
+        Outflow.objects.create(product=self.products[1], quantity=3, description='Perda')
+        sale.outflows.first().delete()
+        incremental = self.summaries()
+
+        # Mudar o preço não altera o valor das saídas já registradas
+        self.products[0].selling_price += 100
+        self.products[0].save()
+        self.assertEqual(rebuild_daily_sales(), 1)
+        self.assertEqual(self.summaries(), incremental)
+
+    def test_outflow_value_uses_the_price_at_outflow_time(self):
+        product = self.products[0]
+        old_price = product.selling_price
+        Outflow.objects.create(product=product, quantity=2)
+        product.selling_price = old_price + 10
+        product.save()
+        Outflow.objects.create(product=product, quantity=1)
+        incremental = self.summaries()
+
+        rebuild_daily_sales()
+        self.assertEqual(self.summaries(), incremental)
+        self.assertEqual(DailySalesSummary.objects.get().outflow_value, 3 * old_price + 10)
+
+
+class ProductDailySalesTests(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create(username='vendedor')
+        self.products = benchmarks.seed_products(2, 'cubo-a') + benchmarks.seed_products(2, 'cubo-b')
+        self.today = Period.preset('30').end_date
+        # O cache da engine ficaria com os dados deste teste
+        self.addCleanup(cache.clear)
+
+    def create_sale(self, days_ago):
+        sale = Sale.objects.create(seller=self.seller, total_amount=0, final_amount=0, payment_method='cash')
+        Sale.objects.filter(pk=sale.pk).update(
+            created_at=datetime.combine(self.today - timedelta(days=days_ago), datetime.min.time()),
+        )
+        sale.refresh_from_db()
+        return sale
+
+    def add_item(self, sale, product, quantity, unit_price=20):
+        return SaleItem.objects.create(
+            sale=sale, product=product, quantity=quantity, unit_price=unit_price, total_price=quantity * unit_price,
+        )
+
+    def direct_totals(self, period, field):
+        rows = SaleItem.objects.filter(**period.range_filter('sale__created_at')).values(field).annotate(
+            total_quantity=Sum('quantity'),
+            total_revenue=Sum(F('quantity') * F('unit_price')),
+            total_cost=Sum(F('quantity') * F('product__cost_price')),
+            sales_count=Count('sale', distinct=True),
+        )
+        return {str(row[field]): row for row in rows}
+
+    def assertReportMatchesItems(self):
+        cache.clear()
+        period = Period.preset('30')
+        report = engine.products_report(period)
+
+        expected = self.direct_totals(period, 'product')
+        self.assertEqual(
+            {row['product']: [row[total] for total in engine.PRODUCT_TOTALS] for row in report['top_products']},
+            {key: [row[total] for total in engine.PRODUCT_TOTALS] for key, row in expected.items()},
+        )
+        # Os agrupamentos mostram quantidade e valores
+        totals = ['total_quantity', 'total_revenue', 'total_cost']
+        for breakdown in report['breakdowns']:
+            with self.subTest(breakdown['dimension']):
+                expected = self.direct_totals(period, f"product__{breakdown['dimension']}")
+                self.assertEqual(
+                    {row[breakdown['dimension']]: [row[total] for total in totals] for row in breakdown['rows']},
+                    {key: [row[total] for total in totals] for key, row in expected.items()},
+                )
+
+    def test_cube_follows_item_changes(self):
+        first, second = self.create_sale(3), self.create_sale(0)
+        self.add_item(first, self.products[0], 2)
+        # Duas linhas do mesmo produto na venda contam uma venda
+        self.add_item(first, self.products[0], 1)
+        edited = self.add_item(first, self.products[1], 3)
+        moved = self.add_item(first, self.products[2], 1)
+        removed = self.add_item(second, self.products[3], 4)
+        self.add_item(second, self.products[0], 5)
+        self.assertReportMatchesItems()
+
+        with self.subTest('quantidade e preço'):
+            edited.quantity, edited.unit_price = 6, 15
+            edited.save()
+            self.assertReportMatchesItems()
+        with self.subTest('outro produto'):
+            moved.product = self.products[3]
+            moved.save()
+            self.assertReportMatchesItems()
+        with self.subTest('outra data'):
+            moved.sale = second
+            moved.save()
+            self.assertReportMatchesItems()
+        with self.subTest('exclusão'):
+            removed.delete()
+            self.assertReportMatchesItems()
+        with self.subTest('exclusão da venda'):
+            first.delete()
+            self.assertReportMatchesItems()
+
+        cube = list(ProductDailySales.objects.exclude(units=0).order_by('date', 'product_id').values_list(
+            'date', 'product_id', 'units', 'revenue', 'cost', 'sale_count',
+        ))
+        rebuild_product_daily_sales()
+        self.assertEqual(
+            list(ProductDailySales.objects.order_by('date', 'product_id').values_list(
+                'date', 'product_id', 'units', 'revenue', 'cost', 'sale_count',
+            )),
+            cube,
+        )
+
+
+class InventoryValuationTests(TestCase):
+
+    def setUp(self):
+        self.product = benchmarks.seed_products(1, 'estoque')[0]
+        self.category = Category.objects.create(name='Outra categoria')
+        self.brand = Brand.objects.create(name='Outra marca')
+
+    def assertConsistent(self):
+        self.assertEqual(rollups.stored_inventory_valuation(), rollups.compute_inventory_valuation())
+
+    def test_valuation_follows_every_kind_of_change(self):
+        product = Product.objects.create(
+            title='Camisa', category=self.category, brand=self.product.brand, size=self.product.size,
+            color=self.product.color, cost_price=10, selling_price=25, quantity=7,
+        )
+        self.assertConsistent()
+
+        steps = [
+            ('preço e quantidade', dict(cost_price=12, selling_price=30, quantity=9)),
+            ('inativação', dict(is_active=False)),
+            ('reativação', dict(is_active=True)),
+            ('categoria', dict(category=self.product.category)),
+            ('marca', dict(brand=self.brand)),
+        ]
+        for step, changes in steps:
+            with self.subTest(step):
+                for field, value in changes.items():
+                    setattr(product, field, value)
+                product.save()
+                self.assertConsistent()
+
+        with self.subTest('movimentações de estoque'):
+            stock.decrement([(product, 2)])
+            stock.increment([(product, 5), (self.product, 1)])
+            Inflow.objects.create(supplier=Supplier.objects.create(name='Fornecedor'), product=product, quantity=3)
+            Outflow.objects.create(product=product, quantity=1)
+            services.checkout(User.objects.create(username='vendedor'), [dict(product_id=product.pk, quantity=4)])
+            self.assertConsistent()
+
+        with self.subTest('exclusão'):
+            product = Product.objects.get(pk=product.pk)
+            Outflow.objects.filter(product=product).delete()
+            Inflow.objects.filter(product=product).delete()
+            SaleItem.objects.filter(product=product).delete()
+            product.delete()
+            self.assertConsistent()
+            self.assertEqual(set(rollups.stored_inventory_valuation()), {
+                (self.product.category_id, self.product.brand_id, True),
+            })
+
+    def test_verify_command_reports_and_fixes_drift(self):
+        out = io.StringIO()
+        call_command('verify_inventory_valuation', stdout=out)
+        self.assertIn('VALOR DO ESTOQUE CONSISTENTE!', out.getvalue())
+
+        InventoryValuation.objects.update(quantity=F('quantity') + 1)
+        out = io.StringIO()
+        call_command('verify_inventory_valuation', stdout=out)
+        self.assertIn(f'quantity: esperado {self.product.quantity}, encontrado {self.product.quantity + 1}', out.getvalue())
+        self.assertIn('1 divergência(s) encontrada(s)', out.getvalue())
+        self.assertNotEqual(rollups.stored_inventory_valuation(), rollups.compute_inventory_valuation())
+
+        out, err = io.StringIO(), io.StringIO()
+        version = metrics_cache.get_version('products')
+        call_command('verify_inventory_valuation', '--fix', stdout=out, stderr=err)
+        self.assertIn('VALOR DO ESTOQUE RECONSTRUÍDO!', out.getvalue())
+        self.assertConsistent()
+        self.assertNotEqual(metrics_cache.get_version('products'), version)
+        # Nos testes o cache é o LocMemCache: o comando avisa que não invalida os servidores
+        self.assertIn(metrics_cache.PROCESS_LOCAL_WARNING, err.getvalue())
+
+    def test_rebuild_rollups_invalidates_the_reports(self):
+        versions = {namespace: metrics_cache.get_version(namespace) for namespace in ['sales', 'products']}
+        err = io.StringIO()
+        call_command('rebuild_rollups', stdout=io.StringIO(), stderr=err)
+
+        for namespace, version in versions.items():
+            self.assertNotEqual(metrics_cache.get_version(namespace), version)
+        self.assertIn(metrics_cache.PROCESS_LOCAL_WARNING, err.getvalue())
+
+        with self.settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}}):
+            self.assertFalse(metrics_cache.is_process_local())
+
+
+class CustomerStatsTests(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create(username='vendedor')
+        self.customers = [Customer.objects.create(name=f'Cliente {index}') for index in range(5)]
+
+    def create_sale(self, customer, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Sale.objects.create(
+                seller=self.seller,
+                customer=customer,
+                total_amount=amount,
+                final_amount=amount,
+                payment_method='cash',
+            )
+
+    def test_totals_follow_committed_sales(self):
+        customer = self.customers[0]
+        self.create_sale(customer, 10)
+        sale = self.create_sale(customer, 30)
+
+        stats = CustomerStats.objects.get(customer=customer)
+        self.assertEqual((stats.frequency, stats.monetary), (2, 40))
+        self.assertEqual(stats.last_purchase, sale.created_at)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sale.customer = self.customers[1]
+            sale.save()
+        self.assertEqual(CustomerStats.objects.get(customer=customer).monetary, 10)
+        self.assertEqual(CustomerStats.objects.get(customer=self.customers[1]).monetary, 30)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sale.delete()
+        self.assertFalse(CustomerStats.objects.filter(customer=self.customers[1]).exists())
+
+    def test_rescore_assigns_quintiles(self):
+        for index, customer in enumerate(self.customers):
+            for _ in range(index + 1):
+                self.create_sale(customer, 10 * (index + 1))
+
+        self.assertEqual(rfm.rescore_customers(), 5)
+
+        best = CustomerStats.objects.get(customer=self.customers[-1])
+        worst = CustomerStats.objects.get(customer=self.customers[0])
+        self.assertEqual((best.recency_score, best.frequency_score, best.monetary_score), (5, 5, 5))
+        self.assertEqual((worst.recency_score, worst.frequency_score, worst.monetary_score), (1, 1, 1))
+        self.assertEqual(best.segment, 'champions')
+        self.assertEqual(worst.segment, 'lost')
+
+    def test_top_customers_only_count_sales_in_the_period(self):
+        period = Period('custom', date(2026, 1, 1), date(2026, 1, 31))
+        inside, outside = self.customers[:2]
+        for customer, amount, created_at in [
+            (inside, 10, datetime(2026, 1, 1)),
+            (inside, 20, datetime(2026, 1, 31, 23, 59)),
+            (outside, 500, datetime(2025, 12, 31, 23, 59)),
+            (outside, 5, datetime(2026, 1, 15)),
+            (outside, 700, datetime(2026, 2, 1)),
+        ]:
+            sale = self.create_sale(customer, amount)
+            Sale.objects.filter(pk=sale.pk).update(created_at=created_at)
+
+        top = engine.customers_report(period)['top_customers']
+        self.assertEqual(
+            [(row['id'], row['total_sales'], row['total_spent'], row['last_purchase']) for row in top],
+            [(inside.pk, 2, 30, datetime(2026, 1, 31, 23, 59)), (outside.pk, 1, 5, datetime(2026, 1, 15))],
+        )
+
+    def test_rebuild_matches_incremental(self):
+        for index, customer in enumerate(self.customers[:3]):
+            self.create_sale(customer, 5 + index)
+        incremental = list(CustomerStats.objects.order_by('pk').values_list('pk', *rfm.STATS_FIELDS))
+
+        CustomerStats.objects.all().delete()
+        self.assertEqual(rfm.rebuild_customer_stats(), 3)
+        self.assertEqual(
+            list(CustomerStats.objects.order_by('pk').values_list('pk', *rfm.STATS_FIELDS)),
+            incremental,
+        )
+
+
+class ExportTests(TestCase):
+
+    header = ['Produto', 'Quantidade', 'Data']
+    rows = [
+        ('Camiseta "P"', 3, datetime(2026, 1, 1, 10, 30)),
+        ('Calça <M> & cia', None, date(2026, 1, 2)),
+    ]
+
+    def test_csv(self):
+        content = ''.join(stream_csv(self.header, iter(self.rows)))
+        self.assertEqual(content, (
+            '\ufeffProduto;Quantidade;Data\r\n'
+            '"Camiseta ""P""";3;2026-01-01 10:30:00\r\n'
+            'Calça <M> & cia;;2026-01-02\r\n'
+        ))
+
+    def test_xlsx(self):
+        content = b''.join(stream_xlsx(self.header, iter(self.rows)))
+        workbook = zipfile.ZipFile(io.BytesIO(content))
+        self.assertIsNone(workbook.testzip())
+        sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<c><v>3</v></c>', sheet)
+        self.assertIn('<t>Calça &lt;M&gt; &amp; cia</t>', sheet)
+        self.assertEqual(sheet.count('<row>'), 3)
+
+
+@override_settings(REPORT_JOBS={'IN_PROCESS': False}, MEDIA_ROOT=tempfile.mkdtemp())
+class ReportJobTests(TestCase):
+
+    def test_identical_requests_share_a_job(self):
+        job, created = jobs.enqueue('sales', 'csv', {'period': '30', 'unknown': 'x'})
+        same, same_created = jobs.enqueue('sales', 'csv', {'period': '30'})
+        other, _ = jobs.enqueue('sales', 'csv', {'period': '7'})
+
+        self.assertTrue(created)
+        self.assertFalse(same_created)
+        self.assertEqual(same, job)
+        self.assertNotEqual(other, job)
+
+    def test_job_runs_once_and_keeps_the_result(self):
+        job, _ = jobs.enqueue('stock', 'json', {})
+        jobs.process_job(job.pk)
+        jobs.process_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.DONE)
+        with job.result.open('rb') as result:
+            self.assertEqual(json.load(result)['summary']['total_products'], 0)
+
+        # Um job concluído não impede um novo pedido igual
+        self.assertTrue(jobs.enqueue('stock', 'json', {})[1])
+
+    def test_jobs_are_visible_only_to_who_requested_them(self):
+        owner = User.objects.create_user('dono', password='senha')
+        other = User.objects.create_user('outro', password='senha')
+        staff = User.objects.create_user('gerente', password='senha', is_staff=True)
+        job, _ = jobs.enqueue('stock', 'json', {}, owner)
+        jobs.process_job(job.pk)
+
+        # Pedido igual de outro usuário gera outro job
+        self.assertNotEqual(jobs.enqueue('stock', 'json', {}, other)[0], job)
+
+        urls = [reverse('reporting:job_status', args=[job.pk]), reverse('reporting:job_download', args=[job.pk])]
+        for user, status in [(owner, 200), (other, 404), (staff, 200)]:
+            self.client.force_login(user)
+            for url in urls:
+                with self.subTest(user=user.username, url=url):
+                    self.assertEqual(self.client.get(url).status_code, status)
+
+
+class PrecomputeTests(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create(username='vendedor')
+        self.today = Period.preset('7').end_date
+
+    def create_sale(self, day, amount):
+        sale = Sale.objects.create(
+            seller=self.seller,
+            total_amount=amount,
+            final_amount=amount,
+            payment_method='cash',
+        )
+        Sale.objects.filter(pk=sale.pk).update(created_at=datetime.combine(day, datetime.min.time()))
+        return sale
+
+    def test_closed_days_plus_today_match_the_full_period(self):
+        for days_ago, amount in [(8, 50), (7, 40), (3, 30), (1, 20), (0, 10)]:
+            self.create_sale(self.today - timedelta(days=days_ago), amount)
+        rebuild_daily_sales()
+
+        # Calculado ontem e atualizado hoje: entra ontem, sai o dia 8
+        yesterday = self.today - timedelta(days=1)
+        self.assertEqual(precompute.precompute('sales', '7', 7, engine._sales_partial, yesterday), 'full')
+        self.assertEqual(precompute.precompute('sales', '7', 7, engine._sales_partial, self.today), 'incremental')
+        self.assertEqual(precompute.precompute('sales', '7', 7, engine._sales_partial, self.today), 'skipped')
+
+        period = Period.preset('7')
+        expected = engine._sales_partial(period.start_date, period.end_date)
+        self.assertEqual(engine._partial('sales', period), expected)
+        self.assertEqual(engine._sales_result(expected)['total_revenue'], 100)
+
+    def test_changed_closed_day_discards_the_snapshot(self):
+        sale = self.create_sale(self.today - timedelta(days=3), 30)
+        rebuild_daily_sales()
+        precompute.precompute('sales', '7', 7, engine._sales_partial, self.today)
+
+        sale.final_amount = 45
+        sale.save()
+
+        self.assertIsNone(precompute.load('sales', '7', 7, self.today))
+        self.assertEqual(precompute.precompute('sales', '7', 7, engine._sales_partial, self.today), 'full')
+
+    def test_seller_change_on_a_closed_day_discards_the_snapshot(self):
+        sale = self.create_sale(self.today - timedelta(days=3), 30)
+        rebuild_daily_sales()
+        precompute.precompute('sales', '7', 7, engine._sales_partial, self.today)
+
+        sale.refresh_from_db()
+        sale.seller = User.objects.create(username='outro', first_name='Outra', last_name='Pessoa')
+        sale.save()
+
+        self.assertIsNone(precompute.load('sales', '7', 7, self.today))
+        seller_stats = engine._sales_result(engine._partial('sales', Period.preset('7')))['seller_stats']
+        self.assertEqual([seller['seller__username'] for seller in seller_stats], ['outro'])
+
+    def test_snapshot_is_json_keyed_by_product_id(self):
+        product = benchmarks.seed_products(1, 'snapshot')[0]
+        for days_ago, quantity in [(3, 2), (0, 1)]:
+            sale = self.create_sale(self.today - timedelta(days=days_ago), 10 * quantity)
+            SaleItem.objects.create(sale=sale, product=product, quantity=quantity, unit_price=10, total_price=10 * quantity)
+        rebuild_product_daily_sales()
+        precompute.precompute('products', '7', 7, engine._products_partial, self.today)
+
+        data = ReportSnapshot.objects.get(report='products').data
+        self.assertEqual(list(data['products']), [str(product.pk)])
+        self.assertEqual(data['products'][str(product.pk)]['total_quantity'], 2)
+        self.assertEqual(precompute.load('products', '7', 7, self.today)['products'][str(product.pk)]['total_revenue'], 20)
+
+        # Renomear o produto não separa a parte gravada da venda de hoje
+        product.title = 'Nome novo'
+        product.save()
+        top = engine.products_report(Period.preset('7'))['top_products']
+        self.assertEqual(
+            [(row['product__title'], row['total_quantity'], row['total_revenue']) for row in top],
+            [('Nome novo', 3, 30)],
+        )
@@ -12,7 +12,14 @@ urlpatterns = [
     path('sales/', views.sales_report, name='sales'),
     path('stock/', views.stock_report, name='stock'),
     path('customers/', views.customers_report, name='customers'),
+    path('<str:report>/export/<str:file_format>/', views.export_report, name='export'),
+
+    # Relatórios em segundo plano
+    path('jobs/<int:pk>/', views.report_job_status, name='job_status'),
+    path('jobs/<int:pk>/download/', views.download_report_job, name='job_download'),
+    path('jobs/<str:report>/<str:file_format>/', views.create_report_job, name='create_job'),
     
     # API para estatísticas
     path('api/dashboard-stats/', views.dashboard_stats_api, name='dashboard_stats_api'),
+    path('api/distribution/<str:dimension>/', views.distribution_api, name='distribution_api'),
 ]
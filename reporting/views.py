@@ -1,174 +1,49 @@
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, Q, F, Max
-from django.utils import timezone
-from django.http import JsonResponse
-from datetime import datetime, timedelta
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.utils.formats import number_format
+from django.views.decorators.http import require_GET, require_POST
 
-from sales.models import Sale, SaleItem
-from products.models import Product
-from customers.models import Customer
+from app.conditional import conditional_response
+from app.pagination import KeysetPaginator
+from . import distributions, engine, exports, jobs
+from .models import CustomerStats, ReportJob
+
+
+STOCK_PAGE_SIZE = 50
 
 
 @login_required
 def reports_dashboard(request):
     """Dashboard principal de relatórios"""
-    
-    # Período padrão - últimos 30 dias
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=30)
-    
-    # Filtros do usuário
-    period = request.GET.get('period', '30')
-    if period == '7':
-        start_date = end_date - timedelta(days=7)
-    elif period == '30':
-        start_date = end_date - timedelta(days=30)
-    elif period == '90':
-        start_date = end_date - timedelta(days=90)
-    
-    context = {
-        'period': period,
-        'start_date': start_date,
-        'end_date': end_date,
-    }
-    
-    return render(request, 'reporting/dashboard.html', context)
+    period = engine.Period.from_request(request)
+    return render(request, 'reporting/dashboard.html', period.context())
 
 
 @login_required
 def products_report(request):
     """Relatório de produtos mais vendidos"""
-    
-    # Período
-    period = request.GET.get('period', '30')
-    end_date = timezone.now().date()
-    
-    if period == '7':
-        start_date = end_date - timedelta(days=7)
-    elif period == '30':
-        start_date = end_date - timedelta(days=30)
-    elif period == '90':
-        start_date = end_date - timedelta(days=90)
-    else:
-        start_date = end_date - timedelta(days=30)
-    
-    # Produtos mais vendidos
-    top_products = SaleItem.objects.filter(
-        sale__created_at__date__gte=start_date,
-        sale__created_at__date__lte=end_date
-    ).values(
-        'product__title',
-        'product__size__name',
-        'product__color__name',
-        'product__brand__name'
-    ).annotate(
-        total_quantity=Sum('quantity'),
-        total_revenue=Sum(F('quantity') * F('unit_price')),
-        sales_count=Count('sale', distinct=True)
-    ).order_by('-total_quantity')[:20]
-    
-    # Produtos com baixo estoque
-    low_stock_products = Product.objects.filter(
-        is_active=True,
-        quantity__lte=F('min_stock')
-    ).select_related('brand', 'size', 'color')[:20]
-    
-    # Produtos sem estoque
-    out_of_stock = Product.objects.filter(
-        is_active=True,
-        quantity=0
-    ).select_related('brand', 'size', 'color').count()
-    
+    period = engine.Period.from_request(request)
+
     context = {
-        'period': period,
-        'start_date': start_date,
-        'end_date': end_date,
-        'top_products': top_products,
-        'low_stock_products': low_stock_products,
-        'out_of_stock_count': out_of_stock,
+        **period.context(),
+        **engine.products_report(period),
     }
-    
+
     return render(request, 'reporting/products.html', context)
 
 
 @login_required
 def sales_report(request):
     """Relatório de vendas por período"""
-    
-    # Período
-    period = request.GET.get('period', '30')
-    end_date = timezone.now().date()
-    
-    if period == '7':
-        start_date = end_date - timedelta(days=7)
-    elif period == '30':
-        start_date = end_date - timedelta(days=30)
-    elif period == '90':
-        start_date = end_date - timedelta(days=90)
-    else:
-        start_date = end_date - timedelta(days=30)
-    
-    # Vendas no período
-    sales_period = Sale.objects.filter(
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date
-    )
-    
-    # Totais
-    total_sales = sales_period.count()
-    total_revenue = sales_period.aggregate(
-        total=Sum('final_amount')
-    )['total'] or 0
-    
-    total_discount = sales_period.aggregate(
-        total=Sum('discount')
-    )['total'] or 0
-    
-    # Calcular ticket médio
-    average_ticket = total_revenue / total_sales if total_sales > 0 else 0
-    
-    # Vendas por dia
-    daily_sales = {}
-    for sale in sales_period.values('created_at__date').annotate(
-        count=Count('id'),
-        revenue=Sum('final_amount')
-    ).order_by('created_at__date'):
-        daily_sales[sale['created_at__date']] = {
-            'count': sale['count'],
-            'revenue': sale['revenue'] or 0,
-            'average_ticket': (sale['revenue'] or 0) / sale['count'] if sale['count'] > 0 else 0
-        }
-    
-    # Vendas por forma de pagamento
-    payment_stats = sales_period.values('payment_method').annotate(
-        count=Count('id'),
-        revenue=Sum('final_amount')
-    ).order_by('-count')
-    
-    # Vendas por vendedor
-    seller_stats = sales_period.values(
-        'seller__username',
-        'seller__first_name',
-        'seller__last_name'
-    ).annotate(
-        count=Count('id'),
-        revenue=Sum('final_amount')
-    ).order_by('-revenue')
-    
+    period = engine.Period.from_request(request)
+
     context = {
-        'period': period,
-        'start_date': start_date,
-        'end_date': end_date,
-        'total_sales': total_sales,
-        'total_revenue': total_revenue,
-        'total_discount': total_discount,
-        'average_ticket': average_ticket,
-        'daily_sales': daily_sales,
-        'payment_stats': payment_stats,
-        'seller_stats': seller_stats,
+        **period.context(),
+        **engine.sales_report(period),
     }
-    
+
     return render(request, 'reporting/sales.html', context)
 
 
@@ -181,32 +56,11 @@ def stock_report(request):
     brand_filter = request.GET.get('brand')
     low_stock_only = request.GET.get('low_stock_only')
     
-    # Query base
-    products = Product.objects.filter(is_active=True).select_related(
-        'brand', 'category', 'size', 'color'
-    )
-    
-    # Aplicar filtros
-    if category_filter:
-        products = products.filter(category_id=category_filter)
-    
-    if brand_filter:
-        products = products.filter(brand_id=brand_filter)
-    
-    if low_stock_only:
-        products = products.filter(quantity__lte=F('min_stock'))
-    
-    # Estatísticas
-    total_products = products.count()
-    total_value = products.aggregate(
-        total=Sum(F('quantity') * F('cost_price'))
-    )['total'] or 0
+    products = engine.stock_products(category_filter, brand_filter, low_stock_only)
     
-    low_stock_count = products.filter(quantity__lte=F('min_stock')).count()
-    out_of_stock_count = products.filter(quantity=0).count()
-    
-    # Ordenar produtos
-    products = products.order_by('quantity', 'title')
+    # Página atual (por chave) e totais em uma única agregação, em cache
+    page_obj = KeysetPaginator(products, ['quantity', 'title', 'id'], STOCK_PAGE_SIZE).page_from_request(request)
+    summary = engine.stock_summary(category_filter, brand_filter, low_stock_only)
     
     # Para filtros
     from categories.models import Category
@@ -216,11 +70,9 @@ def stock_report(request):
     brands = Brand.objects.all().order_by('name')
     
     context = {
-        'products': products,
-        'total_products': total_products,
-        'total_value': total_value,
-        'low_stock_count': low_stock_count,
-        'out_of_stock_count': out_of_stock_count,
+        'products': page_obj.object_list,
+        'page_obj': page_obj,
+        **summary,
         'categories': categories,
         'brands': brands,
         'category_filter': category_filter,
@@ -234,98 +86,105 @@ def stock_report(request):
 @login_required
 def customers_report(request):
     """Relatório de clientes"""
-    
-    # Período
-    period = request.GET.get('period', '30')
-    end_date = timezone.now().date()
-    
-    if period == '7':
-        start_date = end_date - timedelta(days=7)
-    elif period == '30':
-        start_date = end_date - timedelta(days=30)
-    elif period == '90':
-        start_date = end_date - timedelta(days=90)
-    else:
-        start_date = end_date - timedelta(days=30)
-    
-    # Clientes mais ativos
-    top_customers = Customer.objects.annotate(
-        total_sales=Count('sale'),
-        total_spent=Sum('sale__final_amount'),
-        last_purchase=Max('sale__created_at')
-    ).filter(
-        total_sales__gt=0
-    ).order_by('-total_spent')[:20]
-    
-    # Clientes novos no período
-    new_customers = Customer.objects.filter(
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date
-    ).count()
-    
-    # Total de clientes
-    total_customers = Customer.objects.count()
-    
+    period = engine.Period.from_request(request)
+
+    segment = request.GET.get('segment')
+    if segment not in dict(CustomerStats.SEGMENTS):
+        segment = None
+
     context = {
-        'period': period,
-        'start_date': start_date,
-        'end_date': end_date,
-        'top_customers': top_customers,
-        'new_customers': new_customers,
-        'total_customers': total_customers,
+        **period.context(),
+        **engine.customers_report(period, segment),
+        'segment': segment,
     }
-    
+
     return render(request, 'reporting/customers.html', context)
 
 
 @login_required
 def dashboard_stats_api(request):
-    """API para estatísticas do dashboard"""
-    
-    # Período
-    period = request.GET.get('period', '30')
-    end_date = timezone.now().date()
-    
-    if period == '7':
-        start_date = end_date - timedelta(days=7)
-    elif period == '30':
-        start_date = end_date - timedelta(days=30)
-    elif period == '90':
-        start_date = end_date - timedelta(days=90)
-    else:
-        start_date = end_date - timedelta(days=30)
-    
-    # Vendas no período
-    sales_period = Sale.objects.filter(
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date
-    )
-    
-    # Total de vendas
-    total_sales = sales_period.count()
-    
-    # Faturamento total
-    total_revenue = sales_period.aggregate(
-        total=Sum('final_amount')
-    )['total'] or 0
-    
-    # Produtos com baixo estoque
-    low_stock_count = Product.objects.filter(
-        is_active=True,
-        quantity__lte=F('min_stock')
-    ).count()
-    
-    # Total de clientes
-    total_customers = Customer.objects.count()
-    
+    """API para estatísticas do dashboard (304 enquanto os dados não mudarem)"""
+    period = engine.Period.from_request(request)
+    entry = engine.dashboard_stats_entry(period)
+    stats = entry['data']
+
     # Formatar dados para resposta
     data = {
-        'total_sales': total_sales,
-        'total_revenue': f"R$ {total_revenue:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.'),
-        'low_stock': low_stock_count,
-        'total_customers': total_customers,
-        'period': period,
-        'period_text': f"{period} dias"
+        'total_sales': stats['total_sales'],
+        'total_revenue': 'R$ ' + number_format(stats['total_revenue'], 2, use_l10n=True, force_grouping=True),
+        'low_stock': stats['low_stock'],
+        'total_customers': stats['total_customers'],
+        'period': period.key,
+        'period_text': f"{period.days} dias" if period.key == engine.CUSTOM_PERIOD else f"{period.key} dias"
     }
-    
-    return JsonResponse(data)
+
+    def respond():
+        response = JsonResponse(data)
+        # O navegador revalida a cada consulta com If-None-Match
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    return conditional_response(request, respond, etag=engine.dashboard_stats_etag(period, entry))
+
+
+@login_required
+def export_report(request, report, file_format):
+    """Exporta um relatório em CSV ou XLSX, enviando as linhas conforme são lidas"""
+    if report not in exports.EXPORTS or file_format not in exports.FORMATS:
+        raise Http404('Exportação não encontrada')
+
+    export = exports.EXPORTS[report](request.GET)
+    response = StreamingHttpResponse(
+        export.stream(file_format),
+        content_type=exports.FORMATS[file_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export.filename(file_format)}"'
+    return response
+
+
+def _job_response(job, status=200):
+    data = jobs.as_dict(job)
+    data['status_url'] = reverse('reporting:job_status', args=[job.pk])
+    data['download_url'] = reverse('reporting:job_download', args=[job.pk]) if job.status == ReportJob.DONE else None
+    return JsonResponse(data, status=status)
+
+
+@login_required
+@require_POST
+def create_report_job(request, report, file_format):
+    """Pede um relatório em segundo plano; pedidos iguais em andamento reaproveitam o mesmo job"""
+    if not jobs.is_supported(report, file_format):
+        raise Http404('Relatório não encontrado')
+
+    job, created = jobs.enqueue(report, file_format, request.POST or request.GET, request.user)
+    return _job_response(job, status=202 if created else 200)
+
+
+@login_required
+@require_GET
+def report_job_status(request, pk):
+    """Situação de um relatório em segundo plano (consultada periodicamente pela tela)"""
+    return _job_response(get_object_or_404(jobs.visible_to(request.user), pk=pk))
+
+
+@login_required
+@require_GET
+def download_report_job(request, pk):
+    job = get_object_or_404(jobs.visible_to(request.user), pk=pk, status=ReportJob.DONE)
+    if not job.result:
+        raise Http404('Arquivo não encontrado')
+    return FileResponse(job.result.open('rb'), as_attachment=True, filename=job.filename)
+
+
+@login_required
+def distribution_api(request, dimension):
+    """API com a distribuição dos produtos por categoria, marca, tamanho ou cor"""
+    if dimension not in distributions.DIMENSIONS:
+        raise Http404('Dimensão não encontrada')
+
+    entry = distributions.get_distribution_entry(dimension)
+    return conditional_response(
+        request,
+        lambda: JsonResponse({'dimension': dimension, 'rows': entry['data']}),
+        etag=f'distribution-{dimension}-{entry["version"]}',
+    )
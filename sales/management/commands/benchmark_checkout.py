@@ -0,0 +1,139 @@
+import random
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.db.models import Sum
+from outflows.models import Outflow
+from products import stock
+from products.models import Product
+from reporting import benchmarks
+from sales import services
+from sales.models import Sale, SaleItem
+
+
+class Command(BaseCommand):
+    help = 'Mede queries e tempo do fechamento da venda rápida para carrinhos de tamanhos crescentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            default=[1, 10, 30, 100],
+            help='Quantidades de itens no carrinho',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Vendas por tamanho de carrinho (o tempo mostrado é a mediana)',
+        )
+        parser.add_argument(
+            '--cashiers',
+            type=int,
+            default=0,
+            help='Mede também a vazão com este número de caixas vendendo os mesmos produtos ao mesmo tempo',
+        )
+        parser.add_argument(
+            '--sales',
+            type=int,
+            default=50,
+            help='Vendas por caixa na medição de vazão',
+        )
+
+    def handle(self, *args, **options):
+        self.measure_basket_sizes(options['sizes'], options['repeat'])
+        if options['cashiers']:
+            self.measure_throughput(options['cashiers'], options['sales'])
+
+        self.stdout.write(
+            self.style.SUCCESS('BENCHMARK FINALIZADO!')
+        )
+
+    def measure_basket_sizes(self, sizes, repeat):
+        # Tudo é desfeito ao final, o banco não é alterado
+        with transaction.atomic():
+            seller = User.objects.create(username='benchmark-checkout')
+            products = benchmarks.seed_products(max(sizes))
+
+            for size in sizes:
+                items = [dict(product_id=product.id, quantity=1) for product in products[:size]]
+
+                runs = [benchmarks.measure(services.checkout, seller, items) for _ in range(repeat)]
+                queries = max(run[1] for run in runs)
+                elapsed = sorted(run[2] for run in runs)[len(runs) // 2]
+                self.stdout.write(
+                    f'checkout itens={size:<6} queries={queries:<3} tempo={elapsed:.1f}ms'
+                )
+
+            transaction.set_rollback(True)
+
+    def measure_throughput(self, cashiers, sales_per_cashier):
+        """
+        Caixas em threads vendendo os mesmos 5 produtos. As threads precisam ver
+        os dados umas das outras, então a massa é gravada e removida ao final.
+        """
+        seller = User.objects.create(username='benchmark-checkout')
+        products = benchmarks.seed_products(5, 'benchmark-concorrencia')
+        # Estoque para todas as vendas: mede a vazão, não as recusas
+        stock.increment([(product, cashiers * sales_per_cashier) for product in products])
+        initial = {product.pk: product.quantity for product in products}
+        results = dict(sold=0, rejected=0, retries=0)
+        lock = threading.Lock()
+
+        def cashier(seed):
+            generator = random.Random(seed)
+            try:
+                for _ in range(sales_per_cashier):
+                    cart = [
+                        dict(product_id=product.id, quantity=1)
+                        for product in generator.sample(products, generator.randint(1, 3))
+                    ]
+                    while True:
+                        try:
+                            services.checkout(seller, cart)
+                            outcome = 'sold'
+                            break
+                        except services.CheckoutError:
+                            outcome = 'rejected'
+                            break
+                        except OperationalError:
+                            with lock:
+                                results['retries'] += 1
+                            time.sleep(generator.uniform(0.001, 0.01))
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=cashier, args=(seed,)) for seed in range(cashiers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        sold = dict(SaleItem.objects.filter(product__in=products).values('product').annotate(
+            total=Sum('quantity'),
+        ).values_list('product', 'total'))
+        lost = sum(
+            abs(initial[product.pk] - sold.get(product.pk, 0) - product.quantity)
+            for product in Product.objects.filter(pk__in=initial)
+        )
+
+        self.stdout.write(
+            f'caixas={cashiers:<4} vendas={results["sold"]:<6} recusadas={results["rejected"]:<5} '
+            f'novas tentativas={results["retries"]:<5} vazão={results["sold"] / elapsed:.0f} vendas/s '
+            f'atualizações perdidas={lost}'
+        )
+
+        # Remove a massa de dados (os signals desfazem os resumos)
+        with transaction.atomic():
+            Outflow.objects.filter(product__in=products).delete()
+            Sale.objects.filter(seller=seller).delete()
+            Product.objects.filter(pk__in=initial).delete()
+            seller.delete()
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-18 17:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_customers_created_at_idx'),
+        ('products', '0003_alter_product_options'),
+        ('sales', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(
+                fields=['created_at'],
+                include=['seller', 'payment_method', 'final_amount', 'discount'],
+                name='sales_sale_created_at_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(
+                fields=['sale', 'product'],
+                include=['quantity', 'unit_price'],
+                name='sales_item_sale_product_idx',
+            ),
+        ),
+    ]
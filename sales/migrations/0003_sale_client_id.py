@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_report_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='client_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='ID no Terminal'),
+        ),
+    ]
@@ -29,6 +29,8 @@ class Sale(models.Model):
     notes = models.TextField(null=True, blank=True, verbose_name='Observações')
     
     # Controle
+    # Gerado pelo terminal nas vendas offline (services.sync_sales); evita registrar a mesma venda duas vezes
+    client_id = models.CharField(max_length=64, unique=True, null=True, blank=True, verbose_name='ID no Terminal')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -36,6 +38,21 @@ class Sale(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Venda'
         verbose_name_plural = 'Vendas'
+        indexes = [
+            # INCLUDE (só no PostgreSQL): relatórios por período sem ler a tabela.
+            # Sem BRIN em created_at: este B-tree já atende os filtros por
+            # período e um segundo índice na coluna só pesaria nas inserções.
+            # No SQLite o check models.W040 avisa que o INCLUDE é ignorado.
+            models.Index(
+                fields=['created_at'],
+                include=['seller', 'payment_method', 'final_amount', 'discount'],
+                name='sales_sale_created_at_idx',
+            ),
+            # Filtros da lista de vendas, já na ordem da paginação (-id)
+            models.Index(fields=['seller', 'id'], name='sales_sale_seller_id_idx'),
+            models.Index(fields=['customer', 'id'], name='sales_sale_customer_id_idx'),
+            models.Index(fields=['payment_method', 'id'], name='sales_sale_payment_id_idx'),
+        ]
 
     def __str__(self):
         return f"Venda #{self.id} - R$ {self.final_amount}"
@@ -51,6 +68,13 @@ class SaleItem(models.Model):
     class Meta:
         verbose_name = 'Item da Venda'
         verbose_name_plural = 'Itens da Venda'
+        indexes = [
+            models.Index(
+                fields=['sale', 'product'],
+                include=['quantity', 'unit_price'],
+                name='sales_item_sale_product_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product} - Qtd: {self.quantity}"
@@ -0,0 +1,365 @@
+"""
+Fechamento da venda rápida e sincronização das vendas offline, em lote.
+
+O número de queries não depende do tamanho do carrinho (nem, na
+sincronização, do número de vendas): os produtos são lidos e travados de uma
+vez, os preços vêm do cadastro, itens e saídas são criados com `bulk_create`
+e o estoque é baixado em um único UPDATE condicional (`products.stock`).
+Operações em lote não disparam signals, então os resumos de relatórios são
+atualizados aqui explicitamente.
+"""
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from customers.models import Customer
+from outflows.models import Outflow
+from products import stock
+from reporting import cache, rfm, rollups
+from .models import Sale, SaleItem
+
+
+# Vendas por transação na sincronização; cada lote trava os produtos uma única vez
+SYNC_CHUNK_SIZE = 100
+
+SYNC_MAX_SALES = 1000
+
+
+class CheckoutError(Exception):
+    """Venda recusada; a mensagem é mostrada ao vendedor"""
+
+
+def _parse_lines(items):
+    """Linhas do carrinho como (product_id, quantidade)"""
+    if not items:
+        raise CheckoutError('Nenhum item na venda')
+
+    lines = []
+    for item in items:
+        try:
+            product_id = int(item['product_id'])
+            quantity = int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise CheckoutError('Item inválido na venda')
+        if quantity <= 0:
+            raise CheckoutError('A quantidade deve ser maior que zero')
+        lines.append((product_id, quantity))
+    return lines
+
+
+def _parse_payment(discount, payment_method):
+    """Desconto (Decimal, não negativo) e forma de pagamento validados"""
+    if payment_method not in dict(Sale.PAYMENT_METHODS):
+        raise CheckoutError('Forma de pagamento inválida')
+    try:
+        discount = Decimal(str(discount or 0))
+    except InvalidOperation:
+        raise CheckoutError('Desconto inválido')
+    if not discount.is_finite() or discount < 0:
+        raise CheckoutError('Desconto inválido')
+    return discount, payment_method
+
+
+def _parse_customer(customer_id):
+    """Id do cliente (int) ou None para venda sem cliente"""
+    if not customer_id:
+        return None
+    try:
+        return int(customer_id)
+    except (TypeError, ValueError):
+        raise CheckoutError('Cliente inválido')
+
+
+def _parse_notes(notes):
+    if notes is None:
+        return ''
+    if not isinstance(notes, str):
+        raise CheckoutError('Observações inválidas')
+    return notes
+
+
+def _check_discount(discount, total_amount):
+    if discount > total_amount:
+        raise CheckoutError('O desconto não pode ser maior que o total da venda')
+
+
+def checkout(seller, items, customer_id=None, discount=0, payment_method='cash', notes=''):
+    """
+    Registra a venda do carrinho `items` ([{'product_id', 'quantity'}, ...])
+    com os preços de venda cadastrados. Retorna a venda ou levanta CheckoutError.
+    """
+    lines = _parse_lines(items)
+    discount, payment_method = _parse_payment(discount, payment_method)
+    customer_id = _parse_customer(customer_id)
+    notes = _parse_notes(notes)
+
+    with transaction.atomic():
+        customer = None
+        if customer_id:
+            customer = Customer.objects.filter(pk=customer_id).first()
+            if customer is None:
+                raise CheckoutError('Cliente não encontrado')
+
+        quantities = Counter()
+        for product_id, quantity in lines:
+            quantities[product_id] += quantity
+
+        # Travados em ordem de id: vendas simultâneas dos mesmos produtos não se bloqueiam em ciclo
+        products = stock.lock(quantities)
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if product is None:
+                raise CheckoutError('Produto não encontrado')
+            if quantity > product.quantity:
+                raise CheckoutError(f'Estoque insuficiente para {product.title}. Disponível: {product.quantity}')
+
+        total_amount = sum(quantity * products[product_id].selling_price for product_id, quantity in lines)
+        _check_discount(discount, total_amount)
+        sale = Sale.objects.create(
+            seller=seller,
+            customer=customer,
+            discount=discount,
+            payment_method=payment_method,
+            notes=notes,
+            total_amount=total_amount,
+            final_amount=total_amount - discount,
+        )
+
+        sale_items = SaleItem.objects.bulk_create([
+            SaleItem(
+                sale=sale,
+                product=products[product_id],
+                quantity=quantity,
+                unit_price=products[product_id].selling_price,
+                total_price=quantity * products[product_id].selling_price,
+            )
+            for product_id, quantity in lines
+        ])
+
+        customer_name = customer.name if customer else 'N/A'
+        outflows = Outflow.objects.bulk_create([
+            Outflow(
+                product=item.product,
+                quantity=item.quantity,
+                unit_price=item.unit_price,
+                description=f"Venda #{sale.id} - {item.product.title} - Cliente: {customer_name}",
+                sale=sale,
+            )
+            for item in sale_items
+        ])
+
+        try:
+            stock.decrement([(products[product_id], quantity) for product_id, quantity in quantities.items()])
+        except stock.InsufficientStock as error:
+            raise CheckoutError(str(error))
+
+        # O que os signals de SaleItem e Outflow fariam item a item
+        rollups.record_new_sale_items(sale_items)
+        rollups.record_outflows(outflows)
+
+    return sale
+
+
+def _parse_order(order):
+    """Venda offline validada: client_id, linhas, desconto, pagamento e horário"""
+    if not isinstance(order, dict):
+        raise CheckoutError('Venda inválida')
+    client_id = order.get('client_id')
+    if not isinstance(client_id, str) or not 0 < len(client_id) <= 64:
+        raise CheckoutError('client_id inválido')
+
+    discount, payment_method = _parse_payment(order.get('discount'), order.get('payment_method', 'cash'))
+
+    sold_at = order.get('sold_at')
+    if sold_at:
+        sold_at = parse_datetime(sold_at) if isinstance(sold_at, str) else None
+        if sold_at is None:
+            raise CheckoutError('Data da venda inválida')
+        if timezone.is_aware(sold_at):
+            sold_at = timezone.make_naive(sold_at)
+        # Relógio do terminal adiantado: vale o horário do servidor
+        sold_at = min(sold_at, datetime.now())
+
+    return dict(
+        client_id=client_id,
+        lines=_parse_lines(order.get('items')),
+        customer_id=_parse_customer(order.get('customer_id')),
+        discount=discount,
+        payment_method=payment_method,
+        notes=_parse_notes(order.get('notes')),
+        sold_at=sold_at,
+    )
+
+
+def _client_id(order):
+    return order.get('client_id') if isinstance(order, dict) else None
+
+
+def _result(client_id, status, sale=None, error=None):
+    return dict(client_id=client_id, status=status, sale_id=sale.pk if sale else None, error=error)
+
+
+def _backdate(model, objects):
+    """Grava o horário informado pelo terminal (auto_now_add ignora o valor do objeto)"""
+    objects = [(obj, sold_at) for obj, sold_at in objects if sold_at]
+    if not objects:
+        return
+    model.objects.filter(pk__in=[obj.pk for obj, _ in objects]).update(created_at=Case(
+        *[When(pk=obj.pk, then=Value(sold_at)) for obj, sold_at in objects],
+    ))
+    for obj, sold_at in objects:
+        obj.created_at = sold_at
+
+
+def _sync_chunk(seller, orders):
+    results = [None] * len(orders)
+    parsed = []
+    for index, order in enumerate(orders):
+        try:
+            parsed.append((index, _parse_order(order)))
+        except CheckoutError as error:
+            results[index] = _result(_client_id(order), 'rejected', error=str(error))
+
+    with transaction.atomic():
+        existing = {sale.client_id: sale for sale in Sale.objects.filter(
+            client_id__in=[order['client_id'] for _, order in parsed],
+        ).only('pk', 'client_id')}
+        customers = dict(Customer.objects.filter(
+            pk__in={order['customer_id'] for _, order in parsed if order['customer_id']},
+        ).values_list('pk', 'name'))
+        products = stock.lock({product_id for _, order in parsed for product_id, _ in order['lines']})
+        # Estoque ainda disponível para as próximas vendas do lote
+        available = {product_id: product.quantity for product_id, product in products.items()}
+
+        accepted = []
+        repeated = []
+        for index, order in parsed:
+            client_id = order['client_id']
+            if client_id in existing:
+                results[index] = _result(client_id, 'duplicate', existing[client_id])
+                continue
+            if any(sale.client_id == client_id for _, sale, _ in accepted):
+                repeated.append(index)
+                continue
+
+            quantities = Counter()
+            for product_id, quantity in order['lines']:
+                quantities[product_id] += quantity
+            try:
+                if order['customer_id'] and order['customer_id'] not in customers:
+                    raise CheckoutError('Cliente não encontrado')
+                for product_id, quantity in quantities.items():
+                    if product_id not in products:
+                        raise CheckoutError('Produto não encontrado')
+                    if quantity > available[product_id]:
+                        raise CheckoutError(
+                            f'Estoque insuficiente para {products[product_id].title}. Disponível: {available[product_id]}'
+                        )
+                total_amount = sum(quantity * products[product_id].selling_price for product_id, quantity in order['lines'])
+                _check_discount(order['discount'], total_amount)
+            except CheckoutError as error:
+                results[index] = _result(client_id, 'rejected', error=str(error))
+                continue
+
+            for product_id, quantity in quantities.items():
+                available[product_id] -= quantity
+            sale = Sale(
+                client_id=client_id,
+                seller=seller,
+                customer_id=order['customer_id'],
+                discount=order['discount'],
+                payment_method=order['payment_method'],
+                notes=order['notes'],
+                total_amount=total_amount,
+                final_amount=total_amount - order['discount'],
+            )
+            accepted.append((index, sale, order))
+
+        if accepted:
+            _record_synced_sales(accepted, products, customers)
+
+    for index, sale, _ in accepted:
+        results[index] = _result(sale.client_id, 'created', sale)
+    for index in repeated:
+        client_id = orders[index]['client_id']
+        sale = next(sale for _, sale, _ in accepted if sale.client_id == client_id)
+        results[index] = _result(client_id, 'duplicate', sale)
+    return results
+
+
+def _record_synced_sales(accepted, products, customers):
+    """Grava as vendas aceitas de um lote: vendas, itens, saídas, estoque e resumos"""
+    sales = Sale.objects.bulk_create([sale for _, sale, _ in accepted])
+    _backdate(Sale, [(sale, order['sold_at']) for (_, _, order), sale in zip(accepted, sales)])
+
+    sale_items = SaleItem.objects.bulk_create([
+        SaleItem(
+            sale=sale,
+            product=products[product_id],
+            quantity=quantity,
+            unit_price=products[product_id].selling_price,
+            total_price=quantity * products[product_id].selling_price,
+        )
+        for sale, (_, _, order) in zip(sales, accepted)
+        for product_id, quantity in order['lines']
+    ])
+
+    outflows = Outflow.objects.bulk_create([
+        Outflow(
+            product=item.product,
+            quantity=item.quantity,
+            unit_price=item.unit_price,
+            description=(
+                f"Venda #{item.sale.id} - {item.product.title} - "
+                f"Cliente: {customers.get(item.sale.customer_id, 'N/A')}"
+            ),
+            sale=item.sale,
+        )
+        for item in sale_items
+    ])
+    sold_at = {sale.pk: order['sold_at'] for (_, _, order), sale in zip(accepted, sales)}
+    _backdate(Outflow, [(outflow, sold_at[outflow.sale_id]) for outflow in outflows])
+
+    # Já conferido com os produtos travados: uma única baixa para o lote inteiro
+    stock.decrement([(item.product, item.quantity) for item in sale_items])
+
+    rollups.record_new_sales(sales)
+    rollups.record_new_sale_items(sale_items)
+    rollups.record_outflows(outflows)
+
+    customer_ids = [sale.customer_id for sale in sales]
+    transaction.on_commit(lambda: rfm.refresh_customer_stats(customer_ids))
+    transaction.on_commit(lambda: cache.bump_version('sales'))
+
+
+def sync_sales(seller, orders, chunk_size=SYNC_CHUNK_SIZE):
+    """
+    Registra as vendas feitas offline por um terminal. Cada venda traz um
+    `client_id` gerado pelo terminal; vendas já recebidas são informadas como
+    'duplicate', então o terminal pode reenviar a fila inteira sem risco.
+
+    Retorna um resultado por venda, na ordem recebida:
+    {'client_id', 'status': 'created' | 'duplicate' | 'rejected', 'sale_id', 'error'}
+    """
+    results = []
+    for start in range(0, len(orders), chunk_size):
+        chunk = orders[start:start + chunk_size]
+        try:
+            results.extend(_sync_chunk(seller, chunk))
+        except IntegrityError:
+            # Outra requisição gravou algum client_id do lote ao mesmo tempo:
+            # o lote foi desfeito e, refeito, as vendas já gravadas viram 'duplicate'
+            try:
+                results.extend(_sync_chunk(seller, chunk))
+            except IntegrityError:
+                # Novo conflito: nada do lote foi gravado e o terminal reenvia depois
+                results.extend(
+                    _result(_client_id(order), 'rejected', error='Conflito ao gravar a venda, reenvie')
+                    for order in chunk
+                )
+    return results
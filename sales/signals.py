@@ -31,6 +31,7 @@ def process_sale_outflows(sale):
         Outflow.objects.create(
             product=item.product,
             quantity=item.quantity,
+            unit_price=item.unit_price,
             description=f"Venda #{sale.id} - {item.product.title} - Cliente: {sale.customer.name if sale.customer else 'N/A'}",
             sale=sale
         )
@@ -1,3 +1,400 @@
-from django.test import TestCase
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import IntegrityError, OperationalError, connection, connections
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from app.pagination import estimate_count
+from customers.models import Customer
+from outflows.models import Outflow
+from reporting import benchmarks, rollups
+from products.models import Product
+from reporting.models import DailySalesSummary, ProductDailySales
+from . import services
+from .models import Sale, SaleItem
+
+
+class CheckoutTests(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create(username='vendedor')
+        self.products = benchmarks.seed_products(30, 'checkout')
+
+    def cart(self, size):
+        return [dict(product_id=product.id, quantity=2) for product in self.products[:size]]
+
+    def test_query_count_does_not_grow_with_the_cart(self):
+        services.checkout(self.seller, self.cart(1))
+
+        with CaptureQueriesContext(connection) as small:
+            services.checkout(self.seller, self.cart(2))
+        with CaptureQueriesContext(connection) as large:
+            services.checkout(self.seller, self.cart(30))
+        self.assertEqual(len(large), len(small))
+        self.assertLessEqual(len(large), 19)
+
+    def test_stock_items_and_rollups(self):
+        product = self.products[0]
+        sale = services.checkout(self.seller, self.cart(3) + [dict(product_id=product.id, quantity=1)], discount='5')
+
+        self.assertEqual(sale.total_amount, product.selling_price + sum(
+            2 * other.selling_price for other in self.products[:3]
+        ))
+        self.assertEqual(sale.final_amount, sale.total_amount - 5)
+        self.assertEqual(sale.items.count(), 4)
+        self.assertEqual(Outflow.objects.filter(sale=sale).count(), 4)
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 100 - 3)
+
+        cube = list(ProductDailySales.objects.order_by('product_id').values_list('product_id', 'units', 'sale_count'))
+        valuation = rollups.stored_inventory_valuation()
+        rollups.rebuild_product_daily_sales()
+        self.assertEqual(
+            list(ProductDailySales.objects.order_by('product_id').values_list('product_id', 'units', 'sale_count')),
+            cube,
+        )
+        self.assertEqual(rollups.compute_inventory_valuation(), valuation)
+
+    def test_rejected_cart_writes_nothing(self):
+        cart = self.cart(2) + [dict(product_id=self.products[2].id, quantity=10_000)]
+
+        with self.assertRaisesMessage(services.CheckoutError, 'Estoque insuficiente'):
+            services.checkout(self.seller, cart)
+        self.assertFalse(Sale.objects.exists())
+        self.assertFalse(Outflow.objects.exists())
+
+    def test_invalid_discount_or_payment_method(self):
+        invalid = [
+            dict(discount='abc'),
+            dict(discount={'valor': 1}),
+            dict(discount='NaN'),
+            dict(discount='-1'),
+            dict(discount='1000000'),
+            dict(payment_method='dinheiro'),
+            dict(customer_id='abc'),
+            dict(customer_id=999999),
+            dict(notes=123),
+            dict(notes=['a']),
+        ]
+        for kwargs in invalid:
+            with self.subTest(**kwargs), self.assertRaises(services.CheckoutError):
+                services.checkout(self.seller, self.cart(1), **kwargs)
+        self.assertFalse(Sale.objects.exists())
+
+        # Mesmas regras nas vendas offline
+        results = services.sync_sales(self.seller, [
+            dict(client_id=f'invalida-{number}', items=self.cart(1), **kwargs)
+            for number, kwargs in enumerate(invalid)
+        ])
+        self.assertEqual({result['status'] for result in results}, {'rejected'})
+
+    def test_quick_sale_view_rejects_invalid_input(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        url = reverse('sales:process_quick_sale')
+        for data in [
+            dict(items=self.cart(1), discount='abc'),
+            dict(items=self.cart(1), payment_method='dinheiro'),
+            dict(items=self.cart(1), customer_id=999999),
+            ['nao', 'e', 'venda'],
+        ]:
+            with self.subTest(data=data):
+                response = self.client.post(url, data, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+
+        response = self.client.post(url, dict(items=self.cart(1)), content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(Sale.objects.get().payment_method, 'cash')
+
+    def test_customer_name_goes_to_the_outflows(self):
+        customer = Customer.objects.create(name='Maria')
+        sale = services.checkout(self.seller, self.cart(2), customer_id=str(customer.pk))
+
+        self.assertEqual(sale.customer, customer)
+        for outflow in Outflow.objects.filter(sale=sale):
+            self.assertTrue(outflow.description.endswith('Cliente: Maria'))
+
+
+class SaleSyncTests(TestCase):
+
+    def setUp(self):
+        self.seller = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.products = benchmarks.seed_products(5, 'offline')
+
+    def orders(self, count, prefix='terminal-1'):
+        return [
+            dict(
+                client_id=f'{prefix}-{number}',
+                items=[dict(product_id=self.products[number % 5].id, quantity=1)],
+                payment_method='pix',
+            )
+            for number in range(count)
+        ]
+
+    def rollups(self):
+        return (
+            list(DailySalesSummary.objects.order_by('date').values_list('date', 'sales_count', 'revenue', 'quantity')),
+            list(ProductDailySales.objects.order_by('date', 'product_id').values_list('product_id', 'units', 'sale_count')),
+        )
+
+    def test_resending_the_queue_reports_duplicates(self):
+        first = services.sync_sales(self.seller, self.orders(12), chunk_size=5)
+        again = services.sync_sales(self.seller, self.orders(12), chunk_size=5)
+
+        self.assertEqual({result['status'] for result in first}, {'created'})
+        self.assertEqual({result['status'] for result in again}, {'duplicate'})
+        self.assertEqual([result['sale_id'] for result in again], [result['sale_id'] for result in first])
+        self.assertEqual(Sale.objects.count(), 12)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).quantity, 100 - 3)
+
+    def test_each_sale_gets_its_own_result(self):
+        orders = self.orders(2) + [
+            dict(client_id='terminal-1-0', items=[dict(product_id=self.products[0].id, quantity=1)]),
+            dict(client_id='sem-estoque', items=[dict(product_id=self.products[1].id, quantity=self.products[1].quantity)]),
+            dict(client_id='sem-itens', items=[]),
+            dict(items=[dict(product_id=self.products[2].id, quantity=1)]),
+        ]
+        results = services.sync_sales(self.seller, orders)
+
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['created', 'created', 'duplicate', 'rejected', 'rejected', 'rejected'],
+        )
+        self.assertEqual(results[2]['sale_id'], results[0]['sale_id'])
+        # A segunda venda do lote já baixou 1 unidade do produto
+        self.assertIn(f'Disponível: {self.products[1].quantity - 1}', results[3]['error'])
+        self.assertEqual(Sale.objects.count(), 2)
+
+    def test_chunk_that_keeps_conflicting_is_rejected(self):
+        sync_chunk = services._sync_chunk
+        calls = []
+
+        def conflicting(seller, orders):
+            calls.append(orders)
+            if len(calls) <= 2:
+                raise IntegrityError('client_id duplicado')
+            return sync_chunk(seller, orders)
+
+        with mock.patch.object(services, '_sync_chunk', conflicting):
+            results = services.sync_sales(self.seller, self.orders(4), chunk_size=2)
+
+        self.assertEqual([result['status'] for result in results], ['rejected', 'rejected', 'created', 'created'])
+        self.assertEqual(results[0]['client_id'], 'terminal-1-0')
+        self.assertEqual(Sale.objects.count(), 2)
+
+        # O terminal reenvia a fila: as rejeitadas são gravadas, as outras são 'duplicate'
+        again = services.sync_sales(self.seller, self.orders(4), chunk_size=2)
+        self.assertEqual([result['status'] for result in again], ['created', 'created', 'duplicate', 'duplicate'])
+
+    def test_offline_sales_land_on_the_day_they_were_made(self):
+        yesterday = datetime.now() - timedelta(days=1)
+        orders = self.orders(3)
+        orders[0]['sold_at'] = yesterday.isoformat()
+        services.sync_sales(self.seller, orders)
+
+        sale = Sale.objects.get(client_id='terminal-1-0')
+        self.assertEqual(sale.created_at, yesterday)
+        self.assertEqual(Outflow.objects.get(sale=sale).created_at, yesterday)
+
+        stored = self.rollups()
+        rollups.rebuild_daily_sales()
+        rollups.rebuild_product_daily_sales()
+        self.assertEqual(self.rollups(), stored)
+        self.assertEqual(DailySalesSummary.objects.get(date=yesterday.date()).sales_count, 1)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        # Cria as linhas de resumo do dia
+        services.sync_sales(self.seller, self.orders(5, 'inicial'))
+
+        with CaptureQueriesContext(connection) as small:
+            services.sync_sales(self.seller, self.orders(5, 'pequeno'))
+        with CaptureQueriesContext(connection) as large:
+            services.sync_sales(self.seller, self.orders(80, 'grande'))
+        self.assertEqual(len(large), len(small))
+
+    def test_api(self):
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        url = reverse('sales:sale-sync-api-view')
+
+        response = client.post(url, {'sales': self.orders(3)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['created'] * 3)
+        self.assertEqual(client.post(url, {'sales': []}, format='json').status_code, 400)
+
+
+class ReportIndexMigrationTests(SimpleTestCase):
+    """SQL das migrações de índices no PostgreSQL (alias `prod`), só gerado, sem conexão"""
+
+    MIGRATIONS = [
+        ('sales', '0002_report_indexes'),
+        ('outflows', '0003_outflow_outflows_created_at_idx'),
+        ('inflows', '0002_inflow_inflows_created_at_idx'),
+    ]
+
+    def migration_sql(self, alias, app_label, name):
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        migration = loader.get_migration(app_label, name)
+        state = loader.project_state((app_label, name), at_end=False)
+        with connections[alias].schema_editor(collect_sql=True, atomic=False) as editor:
+            for operation in migration.operations:
+                new_state = state.clone()
+                operation.state_forwards(app_label, new_state)
+                operation.database_forwards(app_label, editor, state, new_state)
+                state = new_state
+        return editor.collected_sql
+
+    def test_postgres_indexes_include_report_columns(self):
+        sql = []
+        for app_label, name in self.MIGRATIONS:
+            sql += self.migration_sql('prod', app_label, name)
+        self.assertEqual(sql, [
+            'CREATE INDEX "sales_sale_created_at_idx" ON "sales_sale" ("created_at") '
+            'INCLUDE ("seller_id", "payment_method", "final_amount", "discount");',
+            'CREATE INDEX "sales_item_sale_product_idx" ON "sales_saleitem" ("sale_id", "product_id") '
+            'INCLUDE ("quantity", "unit_price");',
+            'CREATE INDEX "outflows_created_at_idx" ON "outflows_outflow" ("created_at") '
+            'INCLUDE ("product_id", "quantity");',
+            'CREATE INDEX "inflows_created_at_idx" ON "inflows_inflow" ("created_at");',
+        ])
+
+
+class SaleListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.other = User.objects.create(username='outro')
+        products = benchmarks.seed_products(3, 'lista')
+        cls.customers = benchmarks.seed_customers(2)
+        cls.sales = benchmarks.seed_sales(120, products, cls.customers, cls.user)
+        Sale.objects.filter(pk=cls.sales[0].pk).update(seller=cls.other, created_at=datetime(2020, 1, 15, 10))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def ids(self, params):
+        """Ids de todas as páginas, seguindo os links de próxima página"""
+        ids = []
+        response = self.client.get(reverse('sales:sale_list'), params)
+        while True:
+            page = response.context['page_obj']
+            ids += [sale.id for sale in page]
+            if not page.has_next:
+                return ids, response.context
+            response = self.client.get(f"{reverse('sales:sale_list')}?{page.next_query}")
+
+    def test_pages_cover_all_sales_newest_first(self):
+        ids, context = self.ids({})
+        self.assertEqual(ids, sorted((sale.id for sale in self.sales), reverse=True))
+        self.assertEqual((context['total_count'], context['total_exact']), (120, True))
+
+    def test_filters(self):
+        expected = {
+            (('seller', self.other.id),): [self.sales[0].id],
+            (('date_from', '2020-01-01'), ('date_to', '2020-01-31')): [self.sales[0].id],
+            (('sale_id', f'#{self.sales[5].id}'),): [self.sales[5].id],
+            (('payment_method', 'pix'), ('customer', self.customers[0].id)): sorted(
+                (sale.id for sale in self.sales if sale.payment_method == 'pix' and sale.customer_id == self.customers[0].id),
+                reverse=True,
+            ),
+        }
+        for params, sale_ids in expected.items():
+            with self.subTest(params=params):
+                ids, context = self.ids(dict(params))
+                self.assertEqual(ids, sale_ids)
+                self.assertEqual(context['total_count'], len(sale_ids))
+
+    def test_invalid_filters_are_ignored(self):
+        ids, _ = self.ids({'seller': 'x', 'date_from': '2020-13-40', 'payment_method': 'cheque'})
+        self.assertEqual(len(ids), 120)
+
+        for value in ['²', '١٢', '9' * 30]:
+            with self.subTest(value=value):
+                ids, _ = self.ids({'sale_id': value, 'seller': value, 'customer': value})
+                self.assertEqual(len(ids), 120)
+
+    def test_large_totals_are_not_counted_exactly(self):
+        self.assertEqual(estimate_count(Sale.objects.all(), limit=50), (None, False))
+        self.assertEqual(estimate_count(Sale.objects.filter(seller=self.other), limit=50), (1, True))
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Vários caixas vendendo os mesmos produtos ao mesmo tempo"""
+
+    cashiers = 16
+    sales_per_cashier = 8
+    initial_stock = 150
+    # Segundos que uma venda pode esperar o banco bloqueado antes de desistir
+    lock_timeout = 30
+
+    def setUp(self):
+        self.seller = User.objects.create(username='vendedor')
+        self.products = benchmarks.seed_products(4, 'concorrencia')
+        Product.objects.update(quantity=self.initial_stock)
+        # update() não passa pelos signals: recalcula o valor do estoque
+        rollups.rebuild_inventory_valuation()
+
+    def cashier(self, seed, results):
+        generator = random.Random(seed)
+        try:
+            for _ in range(self.sales_per_cashier):
+                cart = [
+                    dict(product_id=product.id, quantity=generator.randint(1, 5))
+                    for product in generator.sample(self.products, generator.randint(1, 3))
+                ]
+                deadline = time.monotonic() + self.lock_timeout
+                while time.monotonic() < deadline:
+                    try:
+                        services.checkout(self.seller, cart)
+                        outcome = 'sold'
+                        break
+                    except services.CheckoutError:
+                        outcome = 'rejected'
+                        break
+                    except OperationalError:
+                        # SQLite aceita um único escritor por vez: tenta de novo
+                        time.sleep(generator.uniform(0.001, 0.01))
+                else:
+                    # Bloqueio que não se resolve: falha o teste em vez de travar
+                    outcome = 'locked'
+                with self.lock:
+                    results[outcome] += 1
+        finally:
+            connection.close()
+
+    def test_no_lost_updates_or_overselling(self):
+        results = dict(sold=0, rejected=0, locked=0)
+        self.lock = threading.Lock()
+        threads = [
+            threading.Thread(target=self.cashier, args=(seed, results), daemon=True)
+            for seed in range(self.cashiers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=120)
+            self.assertFalse(thread.is_alive(), 'caixa travado')
+
+        self.assertEqual(results['locked'], 0, 'vendas desistiram com o banco bloqueado')
+        self.assertEqual(results['sold'] + results['rejected'], self.cashiers * self.sales_per_cashier)
+        self.assertEqual(Sale.objects.count(), results['sold'])
+        self.assertGreater(results['rejected'], 0, 'a demanda deve superar o estoque')
+
+        for product in Product.objects.all():
+            sold = SaleItem.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+            out = Outflow.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+            self.assertEqual(product.quantity, self.initial_stock - sold)
+            self.assertEqual(out, sold)
+            self.assertGreaterEqual(product.quantity, 0)
+
+        self.assertEqual(rollups.stored_inventory_valuation(), rollups.compute_inventory_valuation())
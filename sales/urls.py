@@ -12,6 +12,9 @@ urlpatterns = [
     # Venda rápida (interface principal)
     path('quick/', views.quick_sale, name='quick_sale'),
     path('quick/process/', views.process_quick_sale, name='process_quick_sale'),
+
+    # Sincronização das vendas offline dos terminais
+    path('api/v1/sync/', views.SaleSyncAPIView.as_view(), name='sale-sync-api-view'),
     
     # APIs para busca
     path('api/products/', views.product_search_api, name='product_search_api'),
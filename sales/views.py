@@ -5,37 +5,97 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.db.models import Q
-from django.db import transaction
 from django.views.decorators.http import require_http_methods
+from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import datetime, time, timedelta
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 import json
+import re
 
-from .models import Sale, SaleItem
+from app.pagination import EXACT_COUNT_LIMIT, KeysetPaginator, estimate_count
+from idempotency.decorators import idempotent
+from . import services
+from .models import Sale
 from .forms import SaleForm, SaleItemForm, QuickSaleForm, CustomerQuickForm
+from products import barcodes, search
 from products.models import Product
 from customers.models import Customer
 
 
+SALE_PAGE_SIZE = 50
+
+
+def _parse_date(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _filter_sales(sales, params):
+    """Aplica os filtros da lista de vendas; retorna (vendas, filtros válidos)"""
+    filters = {}
+
+    # Período: atalhos ou intervalo de datas, comparando o datetime com o início
+    # do dia (sem __date) para usar o índice
+    today = timezone.now().date()
+    date_filter = params.get('date_filter')
+    date_from = _parse_date(params.get('date_from'))
+    date_to = _parse_date(params.get('date_to'))
+    if date_filter == 'today':
+        date_from = today
+    elif date_filter == 'week':
+        date_from = today - timedelta(days=7)
+    else:
+        date_filter = None
+    if date_from:
+        sales = sales.filter(created_at__gte=datetime.combine(date_from, time.min))
+    if date_to:
+        sales = sales.filter(created_at__lt=datetime.combine(date_to + timedelta(days=1), time.min))
+    filters.update(date_filter=date_filter, date_from=date_from, date_to=date_to)
+
+    for name, field in [('sale_id', 'pk'), ('seller', 'seller_id'), ('customer', 'customer_id')]:
+        value = params.get(name, '').strip().lstrip('#')
+        # Só dígitos ASCII e até 18 deles: cabe num inteiro de 64 bits
+        filters[name] = int(value) if re.fullmatch(r'[0-9]{1,18}', value) else None
+        if filters[name] is not None:
+            sales = sales.filter(**{field: filters[name]})
+
+    payment_method = params.get('payment_method')
+    filters['payment_method'] = payment_method if payment_method in dict(Sale.PAYMENT_METHODS) else None
+    if filters['payment_method']:
+        sales = sales.filter(payment_method=payment_method)
+
+    return sales, filters
+
+
 @login_required
 def sale_list(request):
-    """Lista de vendas"""
-    sales = Sale.objects.all().select_related('customer', 'seller').order_by('-id')
-    
-    # Filtro por período
-    date_filter = request.GET.get('date_filter')
-    if date_filter:
-        if date_filter == 'today':
-            from django.utils import timezone
-            today = timezone.now().date()
-            sales = sales.filter(created_at__date=today)
-        elif date_filter == 'week':
-            from django.utils import timezone
-            from datetime import timedelta
-            week_ago = timezone.now().date() - timedelta(days=7)
-            sales = sales.filter(created_at__date__gte=week_ago)
-    
+    """Lista de vendas, paginada por chave (id decrescente)"""
+    sales, filters = _filter_sales(Sale.objects.all(), request.GET)
+
+    page_obj = KeysetPaginator(
+        sales.select_related('customer', 'seller'), ['-id'], SALE_PAGE_SIZE,
+    ).page_from_request(request)
+    total_count, total_exact = estimate_count(sales)
+
     context = {
-        'sales': sales,
-        'date_filter': date_filter,
+        'sales': page_obj.object_list,
+        'page_obj': page_obj,
+        'total_count': total_count,
+        'total_exact': total_exact,
+        'count_limit': EXACT_COUNT_LIMIT,
+        'sellers': User.objects.filter(is_active=True).order_by('username'),
+        'payment_methods': Sale.PAYMENT_METHODS,
+        'customer_name': (
+            Customer.objects.filter(pk=filters['customer']).values_list('name', flat=True).first()
+            if filters['customer'] else None
+        ),
+        **filters,
     }
     return render(request, 'sales/sale_list.html', context)
 
@@ -71,75 +131,56 @@ def quick_sale(request):
 
 @login_required
 @require_http_methods(["POST"])
+@idempotent
 def process_quick_sale(request):
     """Processa uma venda rápida"""
     try:
         data = json.loads(request.body)
-        items = data.get('items', [])
-        customer_id = data.get('customer_id')
-        discount = float(data.get('discount', 0))
-        payment_method = data.get('payment_method', 'dinheiro')
-        notes = data.get('notes', '')
-        
-        if not items:
-            return JsonResponse({'success': False, 'error': 'Nenhum item na venda'})
-        
-        with transaction.atomic():
-            # Criar a venda
-            sale = Sale.objects.create(
-                seller=request.user,
-                customer_id=customer_id if customer_id else None,
-                discount=discount,
-                payment_method=payment_method,
-                notes=notes,
-                total_amount=0,  # Será atualizado depois
-                final_amount=0   # Será atualizado depois
-            )
-            
-            # Adicionar itens e atualizar estoque
-            total_amount = 0
-            for item_data in items:
-                product = get_object_or_404(Product, id=item_data['product_id'])
-                quantity = int(item_data['quantity'])
-                unit_price = float(item_data['unit_price'])
-                
-                # Verificar estoque
-                if quantity > product.quantity:
-                    return JsonResponse({
-                        'success': False, 
-                        'error': f'Estoque insuficiente para {product.title}. Disponível: {product.quantity}'
-                    })
-                
-                # Criar item da venda
-                sale_item = SaleItem.objects.create(
-                    sale=sale,
-                    product=product,
-                    quantity=quantity,
-                    unit_price=unit_price
-                )
-                
-                # Calcular total do item
-                sale_item.total_price = quantity * unit_price
-                sale_item.save()
-                
-                # O estoque será reduzido automaticamente via signal do Outflow
-                
-                total_amount += quantity * unit_price
-            
-            # Atualizar total da venda
-            sale.total_amount = total_amount
-            sale.final_amount = total_amount - discount
-            sale.save()
-            
-            return JsonResponse({
-                'success': True, 
-                'sale_id': sale.id,
-                'total': sale.final_amount,
-                'message': f'Venda #{sale.id} realizada com sucesso!'
-            })
-            
+        if not isinstance(data, dict):
+            raise services.CheckoutError('Dados da venda inválidos')
+
+        # Os preços são os do cadastro; o unit_price enviado pela tela é ignorado
+        sale = services.checkout(
+            seller=request.user,
+            items=data.get('items', []),
+            customer_id=data.get('customer_id'),
+            discount=data.get('discount', 0),
+            payment_method=data.get('payment_method', 'cash'),
+            notes=data.get('notes', ''),
+        )
+
+        return JsonResponse({
+            'success': True,
+            'sale_id': sale.id,
+            'total': float(sale.final_amount),
+            'message': f'Venda #{sale.id} realizada com sucesso!'
+        })
+
+    except (services.CheckoutError, ValueError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
+        # 500: a venda não é guardada como resposta idempotente e pode ser reenviada
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+class SaleSyncAPIView(APIView):
+    """
+    Recebe de uma vez as vendas feitas offline por um terminal (JWT, permissão
+    de adicionar vendas): {"sales": [{"client_id", "items", ...}, ...]}
+    """
+    queryset = Sale.objects.all()
+
+    def post(self, request):
+        orders = request.data.get('sales') if isinstance(request.data, dict) else None
+        if not isinstance(orders, list) or not orders:
+            return Response({'detail': 'Informe a lista "sales"'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(orders) > services.SYNC_MAX_SALES:
+            return Response(
+                {'detail': f'Envie no máximo {services.SYNC_MAX_SALES} vendas por requisição'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response({'results': services.sync_sales(request.user, orders)})
 
 
 @login_required
@@ -150,29 +191,33 @@ def product_search_api(request):
     if len(query) < 2:
         return JsonResponse({'products': []})
     
-    # Buscar por código de barras, SKU ou nome
-    products = Product.objects.filter(
-        Q(barcode__icontains=query) |
-        Q(sku__icontains=query) |
-        Q(title__icontains=query),
-        is_active=True,
-        quantity__gt=0
-    ).select_related('brand', 'size', 'color')[:10]
+    # Código lido pelo scanner: resolvido pelo cache, sem ir ao banco
+    product = barcodes.lookup(query)
+    if product:
+        products = [product] if product['is_active'] and product['quantity'] > 0 else []
+    else:
+        products = [
+            barcodes.summary(product)
+            for product in search.first_by_title(
+                Product.objects.filter(is_active=True, quantity__gt=0),
+                query,
+            ).select_related('brand', 'size', 'color')[:10]
+        ]
     
     product_list = []
     for product in products:
         product_list.append({
-            'id': product.id,
-            'title': product.title,
-            'brand': product.brand.name if product.brand else '',
-            'size': product.size.name if product.size else '',
-            'color': product.color.name if product.color else '',
-            'barcode': product.barcode or '',
-            'sku': product.sku or '',
-            'selling_price': float(product.selling_price),
-            'quantity': product.quantity,
-            'display_name': f"{product.title} - {product.size} - {product.color}",
-            'stock_info': f"Estoque: {product.quantity}"
+            'id': product['id'],
+            'title': product['title'],
+            'brand': product['brand'],
+            'size': product['size'],
+            'color': product['color'],
+            'barcode': product['barcode'],
+            'sku': product['sku'],
+            'selling_price': float(product['selling_price']),
+            'quantity': product['quantity'],
+            'display_name': product['display_name'],
+            'stock_info': f"Estoque: {product['quantity']}"
         })
     
     return JsonResponse({'products': product_list})